@@ -0,0 +1,50 @@
+"""Access to a large .dat file: struct.iter_unpack of the whole file vs. memory-mapped DatReader.
+
+Run from the repository root: python -m benchmarks.bench_dat_reader
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from dat_utils.reader import open_dat
+from dat_utils.records import HEADER_STRUCT, get_record_dtype, get_record_struct
+
+
+def write_file(path, sensors_number, number, stage_length):
+    records = np.zeros(number, dtype=get_record_dtype(sensors_number))
+    records["time_next"] = np.arange(number) / 10
+    records["us"] = np.random.default_rng(0).uniform(0, 5, (number, sensors_number))
+    records["stage_num"] = np.arange(number) // stage_length
+    with open(path, "wb") as fd:
+        fd.write(HEADER_STRUCT.pack(sensors_number))
+        records.tofile(fd)
+
+
+def main(number=1000000, sensors_number=12):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "run.dat")
+        write_file(path, sensors_number, number, stage_length=600)
+        print(f"{number} records, {os.path.getsize(path) / 2 ** 20:.0f} MiB")
+        stage_num = number // 600 // 2
+
+        start = time.perf_counter()
+        record_struct = get_record_struct(sensors_number)
+        with open(path, "rb") as fd:
+            fd.read(HEADER_STRUCT.size)
+            us = [record[1 + 3] for record in record_struct.iter_unpack(fd.read()) if record[-2 - sensors_number] == stage_num]
+        print(f"struct, one sensor of one stage: {time.perf_counter() - start:9.4f} s, {len(us)} values")
+
+        start = time.perf_counter()
+        with open_dat(path) as reader:
+            opened = time.perf_counter()
+            rows = reader.get_stage_slice(stage_num)
+            us = np.array(reader.get_column("us", [3], rows))
+            print(f"mmap open:                       {opened - start:9.4f} s")
+            print(f"mmap, one sensor of one stage:   {time.perf_counter() - start:9.4f} s, {len(us)} values")
+            del us
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Throughput of .dat saving: struct.pack + write per tick vs. batched DatWriter.
+
+Run from the repository root: python -m benchmarks.bench_dat_writer
+"""
+import tempfile
+import time
+
+import numpy as np
+
+from dat_utils.records import HEADER_STRUCT, get_record_struct
+from dat_utils.writer import DatWriter, FlushPolicy
+from tests.test_one_tick_binary_saving import make_ticks
+
+
+def write_by_struct(fd, ticks, sensor_resistances, batch):
+    bin_write_struct = get_record_struct(len(ticks[0].rs))
+    fd.write(HEADER_STRUCT.pack(len(ticks[0].rs)))
+    for one_tick_data, resistances in zip(ticks, sensor_resistances):
+        fd.write(
+            bin_write_struct.pack(
+                one_tick_data.time_next,
+                *one_tick_data.us,
+                *one_tick_data.rs,
+                *resistances,
+                *one_tick_data.temperatures,
+                one_tick_data.gas_state,
+                one_tick_data.stage_num,
+                one_tick_data.stage_type,
+                *one_tick_data.sensor_states,
+            )
+        )
+
+
+def write_by_batches(fd, ticks, sensor_resistances, batch):
+    writer = DatWriter(fd, FlushPolicy())
+    for start in range(0, len(ticks), batch):
+        writer.write_ticks(ticks[start:start + batch], sensor_resistances[start:start + batch])
+    writer.flush()
+
+
+def main(number=50000):
+    rng = np.random.default_rng(0)
+    ticks = make_ticks(12, number, rng, stage_length=600)
+    sensor_resistances = [tuple(rng.uniform(1e3, 1e9, 12)) for _ in ticks]
+    # 100 Hz drained every 20 ms gives batches of 2 ticks, slow consumer gets bigger batches
+    for batch in (2, 10, 100):
+        for method in (write_by_struct, write_by_batches):
+            with tempfile.TemporaryFile() as fd:
+                start = time.perf_counter()
+                method(fd, ticks, sensor_resistances, batch)
+                elapsed = time.perf_counter() - start
+            print(f"batch {batch:4}, {method.__name__:17}: {number / elapsed:9.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Micro-benchmark of answer frame decoding: per-sensor loop vs. vectorized decode_answer.
+
+Run from the repository root: python -m benchmarks.bench_frame_decoding
+"""
+import timeit
+
+import numpy as np
+
+from sensor_system import MS4, MS12
+from tests.test_ms_frames import decode_answer_by_loop, random_answer
+
+
+def main(number=20000):
+    rng = np.random.default_rng(0)
+    for ms_class in (MS4, MS12):
+        ms = ms_class()
+        recieved = random_answer(ms.sensors_number, rng)
+        loop_time = timeit.timeit(lambda: decode_answer_by_loop(ms, recieved), number=number)
+        vector_time = timeit.timeit(lambda: ms.decode_answer(recieved), number=number)
+        print(f"{ms_class.__name__}: loop {loop_time / number * 1e6:8.2f} us/frame, "
+              f"vectorized {vector_time / number * 1e6:8.2f} us/frame, "
+              f"speedup {loop_time / vector_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Benchmark of U/R frame forming: bytes concatenation via reduce vs. reusable frame buffer.
+
+Run from the repository root: python -m benchmarks.bench_frame_encoding
+"""
+import timeit
+
+import numpy as np
+
+from sensor_system import MS_ABC, MS4, MS12
+from tests.test_ms_frames import form_message_by_reduce
+
+
+def main(number=20000):
+    rng = np.random.default_rng(0)
+    sensor_types_list = [MS_ABC.SEND_CSS_1_4]
+    for ms_class in (MS4, MS12):
+        ms = ms_class()
+        values_array = rng.uniform(0, 5, ms.sensors_number)
+        for values, input_name in ((tuple(values_array), "tuple"), (values_array, "ndarray")):
+            for request_type, name in ((MS_ABC.REQUEST_U, "U"), (MS_ABC.REQUEST_R, "R")):
+                run(ms, values, request_type, f"{ms_class.__name__} {name} {input_name}", sensor_types_list, number)
+
+
+def run(ms, values, request_type, name, sensor_types_list, number):
+    reduce_time = timeit.timeit(
+        lambda: form_message_by_reduce(ms, values, request_type, sensor_types_list), number=number)
+    buffer_time = timeit.timeit(
+        lambda: ms._form_message(values, request_type, sensor_types_list), number=number)
+    print(f"{name:18s}: reduce {number / reduce_time:10.0f} frames/s, "
+          f"buffer {number / buffer_time:10.0f} frames/s, "
+          f"speedup {reduce_time / buffer_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
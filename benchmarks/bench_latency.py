@@ -0,0 +1,26 @@
+"""Cost of latency instrumentation per tick: stamping all points and recording the histograms,
+compared with the 10 ms tick period of 100 Hz acquisition.
+
+Run from the repository root: python -m benchmarks.bench_latency
+"""
+import timeit
+
+from operation_utils import latency
+from operation_utils.latency import LatencyRecorder
+
+
+def main(period=0.01):
+    recorder = LatencyRecorder()
+
+    def one_tick():
+        stamps = latency.new_stamps()
+        for point in range(latency.ANSWER, latency.POINTS_NUMBER):
+            latency.mark(stamps, point)
+        recorder.record(stamps)
+
+    tick_time = min(timeit.repeat(one_tick, number=20000, repeat=3)) / 20000
+    print(f"{tick_time * 1e6:.2f} us/tick, {tick_time / period * 100:.3f}% of {period * 1e3:.0f} ms tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""LiveHistory of 24 channels (12 sensors, sensor and heater resistances): cost of append per tick
+and of a plot view of any time range of a long run.
+
+Run from the repository root: python -m benchmarks.bench_live_history
+"""
+import time
+import timeit
+
+import numpy as np
+
+from operation_utils.live_history import LiveHistory
+
+
+def main(number=1000000, channels=24, frequency=100, memory_budget=64 * 2 ** 20):
+    values = np.random.default_rng(0).uniform(1e3, 1e9, (4096, channels))
+    history = LiveHistory(channels, memory_budget)
+    start = time.perf_counter()
+    for index in range(number):
+        history.append(index / frequency, values[index % 4096])
+    elapsed = time.perf_counter() - start
+    print(f"{number} ticks ({number / frequency / 3600:.1f} h at {frequency} Hz): "
+          f"append {elapsed / number * 1e6:.2f} us/tick, "
+          f"{history.get_memory_bytes() / 2 ** 20:.0f} MiB in memory, {history.samples.spilled} sample blocks spilled")
+    duration = number / frequency
+    for window in (duration, 3600, 60):
+        view_start = duration / 3 - window / 2 if window < duration else 0
+        elapsed = min(timeit.repeat(lambda: history.get_view(view_start, view_start + window, 4000), number=5, repeat=3)) / 5
+        print(f"view of {window:8.0f} s: {elapsed * 1e3:6.2f} ms, {len(history.get_view(view_start, view_start + window, 4000)[0])} points")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
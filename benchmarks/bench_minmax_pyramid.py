@@ -0,0 +1,40 @@
+"""Plot data of a time window of a large .dat file: all records of the window vs. MinMaxPyramid level.
+
+Run from the repository root: python -m benchmarks.bench_minmax_pyramid
+"""
+import os
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+from benchmarks.bench_dat_reader import write_file
+from dat_utils.pyramid import MinMaxPyramid
+from dat_utils.reader import open_dat
+
+
+def main(number=2000000, sensors_number=12, max_points=4000):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "run.dat")
+        write_file(path, sensors_number, number, stage_length=600)
+        with open_dat(path) as reader:
+            start = time.perf_counter()
+            MinMaxPyramid.open_cached(path, reader)
+            print(f"{number} records, build and save: {time.perf_counter() - start:.2f} s")
+            start = time.perf_counter()
+            pyramid = MinMaxPyramid.open_cached(path, reader)
+            print(f"open cached: {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+            duration = float(reader.time[-1])
+            for fraction in (1, 0.1, 0.001):
+                rows = reader.get_time_slice(duration * (0.5 - fraction / 2), duration * (0.5 + fraction / 2))
+                all_records = min(timeit.repeat(lambda: np.array(reader.sensor_resistances[rows]), number=1, repeat=3))
+                decimated = min(timeit.repeat(lambda: pyramid.get_view(reader, rows, max_points), number=1, repeat=3))
+                print(f"window {fraction:6.1%}: all records {all_records * 1e3:8.2f} ms, "
+                      f"pyramid {decimated * 1e3:6.2f} ms, {len(pyramid.get_view(reader, rows, max_points)[0])} points")
+            del pyramid
+
+
+if __name__ == "__main__":
+    main()
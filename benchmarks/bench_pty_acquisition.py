@@ -0,0 +1,48 @@
+"""End-to-end acquisition benchmark against the pty emulator: sequential vs. pipelined requests.
+
+Run from the repository root: python -m benchmarks.bench_pty_acquisition
+"""
+import time
+
+from sensor_system import MS_Uni
+from sensor_system_utils.pipeline import PipelinedMS
+from sensor_system_utils.pty_emulator import MSPtyEmulator
+
+
+def sequential(ms: MS_Uni, values, number):
+    for _ in range(number):
+        ms.full_request(values)
+
+
+def pipelined(ms: MS_Uni, values, number):
+    pipeline = PipelinedMS(ms)
+    try:
+        previous = pipeline.submit(values)
+        for _ in range(number - 1):
+            seq = pipeline.submit(values)
+            pipeline.result(previous)
+            previous = seq
+        pipeline.result(previous)
+    finally:
+        pipeline.close()
+
+
+def main(number=1000):
+    for sensor_number in (4, 12):
+        for latency in (0.0, 0.002):
+            with MSPtyEmulator(sensor_number, latency=latency, seed=0) as emulator:
+                ms = MS_Uni(sensor_number, emulator.port, 100)
+                values = [1.0] * sensor_number
+                try:
+                    for method in (sequential, pipelined):
+                        start = time.perf_counter()
+                        method(ms, values, number)
+                        elapsed = time.perf_counter() - start
+                        print(f"MS{sensor_number}, latency {latency * 1e3:.0f} ms, {method.__name__:10}: "
+                              f"{number / elapsed:8.0f} requests/s")
+                finally:
+                    ms.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Latency from QueuesHolder.put to the consumer: 20 ms polling loop vs. blocking QueueConsumer.
+
+The consumer callback stands for QueueRunner processing and the plot signal.
+Run from the repository root: python -m benchmarks.bench_queue_latency
+"""
+import threading
+import time
+
+import numpy as np
+
+from operation_utils.queue_consumer import QueueConsumer
+from operation_utils.queues_holder import QueuesHolder
+
+
+class PollingConsumer:
+    """Loop which was used by QueueRunner and CycleCollector before"""
+
+    def __init__(self, queue, process_batch):
+        self.queue = queue
+        self.process_batch = process_batch
+        self.stopped = False
+        self.wakeups = 0
+        self.thread = threading.Thread(target=self.cycle)
+
+    def start(self):
+        self.thread.start()
+
+    def cycle(self):
+        while not self.stopped:
+            time.sleep(0.02)
+            self.wakeups += 1
+            while not self.queue.empty():
+                self.process_batch([self.queue.get()])
+
+    def stop(self):
+        self.stopped = True
+
+    def join(self):
+        self.thread.join()
+
+
+def measure(consumer_class, frequency=100, duration=3.0):
+    queues_holder = QueuesHolder()
+    queue = queues_holder.add_new_queue()
+    latencies = []
+
+    def process_batch(batch):
+        now = time.perf_counter()
+        latencies.extend(now - put_time for put_time in batch)
+
+    consumer = consumer_class(queue, process_batch)
+    consumer.start()
+    start = time.perf_counter()
+    for tick in range(int(frequency * duration)):
+        deadline = start + tick / frequency
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+        queues_holder.put(time.perf_counter())
+    consumer.stop()
+    consumer.join()
+    latencies = np.array(latencies) * 1e3
+    return latencies
+
+
+def main():
+    for consumer_class in (PollingConsumer, QueueConsumer):
+        latencies = measure(consumer_class)
+        print(f"{consumer_class.__name__:15}: {latencies.shape[0]} ticks, latency mean {latencies.mean():7.3f} ms, "
+              f"p99 {np.percentile(latencies, 99):7.3f} ms, max {latencies.max():7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Per tick cost of holding plot history for 12 sensors: shifting arrays by one vs. RingBuffer.
+
+Run from the repository root: python -m benchmarks.bench_ring_buffer
+"""
+import timeit
+
+import numpy as np
+
+from operation_utils.ring_buffer import RingBuffer
+
+
+def main(sensor_number=12):
+    sample = np.random.default_rng(0).uniform(1e3, 1e9, 1 + 2 * sensor_number)
+    for number_of_dots in (1200, 36000, 360000):
+        shifted = np.empty((1 + 2 * sensor_number, number_of_dots))
+
+        def shift():
+            shifted[:, :-1] = shifted[:, 1:]
+            shifted[:, -1] = sample
+
+        buffer = RingBuffer(number_of_dots, 1 + 2 * sensor_number)
+        number = max(200, 2000000 // number_of_dots)
+        shift_time = min(timeit.repeat(shift, number=number, repeat=3)) / number
+        ring_time = min(timeit.repeat(lambda: buffer.append(sample), number=20000, repeat=3)) / 20000
+        print(f"{number_of_dots:7} dots: shift {shift_time * 1e6:9.2f} us/tick, ring buffer {ring_time * 1e6:6.2f} us/tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Micro-benchmark of temperature to voltage setpoint conversion for 12 sensors:
+interp1d per sensor vs. TemperatureToVoltageConverter per tick and for the whole timeline.
+
+Run from the repository root: python -m benchmarks.bench_setpoint_conversion
+"""
+import timeit
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+from measurement_utils.vectorized_converters import TemperatureToVoltageConverter
+from tests.test_vectorized_converters import random_voltage_calibrations
+
+
+def main(ticks=2000):
+    rng = np.random.default_rng(0)
+    calibrations = random_voltage_calibrations(rng)
+    funcs = [(lambda x: 0) if calibration is None else interp1d(*calibration, kind="cubic") for calibration in calibrations]
+    converter = TemperatureToVoltageConverter(calibrations)
+    temperatures = np.column_stack([
+        np.zeros(ticks) if calibration is None else rng.uniform(calibration[0][0], calibration[0][-1], ticks)
+        for calibration in calibrations
+    ])
+
+    def by_interp1d():
+        for tick_temperatures in temperatures:
+            tuple(func(t) for t, func in zip(tick_temperatures, funcs))
+
+    def by_tick():
+        for tick_temperatures in temperatures:
+            converter.convert(tick_temperatures)
+
+    def by_timeline():
+        converter.convert(temperatures)
+
+    error = np.max(np.abs(converter.convert(temperatures) - np.column_stack(
+        [np.vectorize(func)(column) for func, column in zip(funcs, temperatures.T)])))
+    print(f"max deviation from interp1d: {error:.3e} V")
+    for name, func in (("interp1d", by_interp1d), ("vectorized per tick", by_tick),
+                       (f"vectorized timeline of {ticks}", by_timeline)):
+        elapsed = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name:28s} {elapsed / ticks * 1e6:8.2f} us/tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Micro-benchmark of request forming on the tick hot path for 12 sensors:
+live conversion and encoding vs. row of precomputed SetpointSchedule, plus time of the prepare phase.
+
+Run from the repository root: python -m benchmarks.bench_setpoint_schedule
+"""
+import time
+import timeit
+
+import numpy as np
+
+from measurement_utils.vectorized_converters import TemperatureToVoltageConverter
+from operation_utils.program_generator import ProgramGenerator
+from operation_utils.setpoint_schedule import SetpointSchedule
+from sensor_system import MS_ABC, MS_Uni
+
+PROGRAM = {
+    "settings": {"frequency": 10},
+    "program": [
+        {"type": "cyclic", "repeat": 2000,
+         "temperatures": {"time": [0, 10, 20], "temperature": [300, 550, 300]},
+         "gas_states": [{"state": 1, "number": 1}]},
+    ],
+}
+
+
+def main():
+    ms = MS_Uni(12, None, 100)
+    sensor_types_list = [MS_ABC.SEND_CSS_1_4]
+    calibration_temperatures = np.linspace(20, 700, 400)
+    converter = TemperatureToVoltageConverter([(calibration_temperatures, 0.5 + calibration_temperatures / 200)] * 12)
+    compiled = ProgramGenerator(PROGRAM).compile()
+
+    start = time.perf_counter()
+    schedule = SetpointSchedule.prepare(compiled, converter, MS_ABC.REQUEST_U, 12)
+    frames = schedule.encode(ms, sensor_types_list)
+    print(f"prepare of {len(compiled)} ticks: {time.perf_counter() - start:.3f} s, "
+          f"{(schedule.setpoints.nbytes + frames.nbytes) / 2 ** 20:.1f} MiB")
+
+    temperatures = compiled.temperatures
+    number = 20000
+
+    def live(index=[0]):
+        index[0] = (index[0] + 1) % len(compiled)
+        ms.form_request(converter.convert(temperatures[index[0], :12]), MS_ABC.REQUEST_U, sensor_types_list)
+
+    def scheduled(index=[0]):
+        index[0] = (index[0] + 1) % len(compiled)
+        schedule.setpoints[index[0]]
+        frames[index[0]].tobytes()
+
+    for name, func in (("live conversion", live), ("precomputed schedule", scheduled)):
+        elapsed = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:22s} {elapsed / number * 1e6:8.2f} us/tick")
+
+
+if __name__ == "__main__":
+    main()
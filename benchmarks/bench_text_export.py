@@ -0,0 +1,40 @@
+"""Throughput of .dat to text conversion: record by record struct + csv vs. block formatting of export_text.
+The second file has two sensors out of range, their resistance is the sentinel in every record.
+
+Run from the repository root: python -m benchmarks.bench_text_export
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_dat_reader import write_file
+from dat_utils.records import HEADER_STRUCT, get_record_dtype
+from dat_utils.text_export import export_text
+from measurement_utils.vectorized_converters import OUT_OF_RANGE_RESISTANCE
+from tests.test_text_export import convert_by_struct
+
+
+def main(number=200000, sensors_number=12):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "run.dat")
+        write_file(path, sensors_number, number, stage_length=600)
+        size = os.path.getsize(path) / 2 ** 20
+        print(f"{number} records, {size:.0f} MiB")
+        for title in ("normal values", "sentinel values"):
+            if title == "sentinel values":
+                records = np.memmap(path, dtype=get_record_dtype(sensors_number), mode="r+", offset=HEADER_STRUCT.size)
+                records["sensor_resistances"][:, :2] = OUT_OF_RANGE_RESISTANCE
+                records.flush()
+                del records
+            print(title)
+            for name, method in (("struct + csv", convert_by_struct), ("export_text", export_text)):
+                start = time.perf_counter()
+                method(path, os.path.join(folder, "run.txt"), (True,) * 12, (True,) * 9)
+                elapsed = time.perf_counter() - start
+                print(f"  {name:13s}: {size / elapsed:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
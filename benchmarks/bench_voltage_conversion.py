@@ -0,0 +1,50 @@
+"""Micro-benchmark of voltage to resistance conversion for 12 sensors x 3 modes:
+per-sensor closures vs. VoltageToResistanceConverter per tick and per batches of ticks of
+several sizes, up to FAST_PATH_MAX_TICKS ticks are converted sensor by sensor.
+
+Run from the repository root: python -m benchmarks.bench_voltage_conversion
+"""
+import timeit
+
+import numpy as np
+
+from measurement_utils.vectorized_converters import VoltageToResistanceConverter
+from tests.test_vectorized_converters import MODES_NUMBER, SENSORS_NUMBER, get_closures, random_coefficients
+
+
+def main(ticks=2000, batch=100):
+    rng = np.random.default_rng(0)
+    coefficients = random_coefficients(rng)
+    closures = get_closures(coefficients)
+    converter = VoltageToResistanceConverter.from_coefficients(coefficients, MODES_NUMBER)
+    us = rng.uniform(0, 5, (ticks, SENSORS_NUMBER)).astype(np.float32)
+    modes = rng.integers(1, MODES_NUMBER + 1, (ticks, SENSORS_NUMBER))
+
+    def by_closures():
+        for tick_us, tick_modes in zip(us, modes):
+            tuple(sensor_closures[mode](u) for sensor_closures, u, mode in zip(closures, tick_us, tick_modes))
+
+    def by_tick():
+        for tick_us, tick_modes in zip(us, modes):
+            converter.convert(tick_us, tick_modes)
+
+    def by_batch():
+        for start in range(0, ticks, batch):
+            converter.convert(us[start:start + batch], modes[start:start + batch])
+
+    def by_batches_of(size):
+        def convert():
+            for start in range(0, ticks, size):
+                converter.convert(us[start:start + size], modes[start:start + size])
+        return convert
+
+    # consumer of the live path converts a batch of one or a few ticks
+    for name, func in (("closures", by_closures), ("vectorized per tick", by_tick),
+                       *((f"vectorized per {size} ticks", by_batches_of(size)) for size in (1, 2, 4, 8, 16)),
+                       (f"vectorized per {batch} ticks", by_batch)):
+        elapsed = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name:28s} {elapsed / ticks * 1e6:8.2f} us/tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from PySide2 import QtWidgets
 from PySide2.QtGui import QPixmap, QColor
 from PySide2.QtCore import Slot, Qt, Signal
 from sensor_system import MS_Uni, MS_ABC
+from sensor_system_utils.device_manager import DeviceUnavailableException
 from misc import TypeCheckLineEdit, clear_layout, CssCheckBoxes
 import time
 import configparser
@@ -108,10 +109,6 @@ class CalibrationWidget(QtWidgets.QWidget):
         self.stopped = True
         if self.thread:
             self.thread.join()
-            self.full_request_until_result((0,) * self.sensor_number)
-        if self.ms:
-            self.ms.close()
-        self.ms = None
 
     def get_average_massive(
         self, voltage: float, steps_per_measurement: int, sleep_time: float
@@ -142,19 +139,21 @@ class CalibrationWidget(QtWidgets.QWidget):
     @Slot()
     def get_r0(self):
         try:
-            self.ms = self.parent_py.settings_widget.get_new_ms()
-            r0_voltage = self.r0_voltage.get_value()
-            steps_per_measurement = 10
-            averaging_massive = self.get_average_massive(
-                r0_voltage, steps_per_measurement, 2.0
-            )
+            with self.settings.lease_ms() as ms:
+                if ms is None:
+                    return
+                self.ms = ms
+                r0_voltage = self.r0_voltage.get_value()
+                steps_per_measurement = 10
+                averaging_massive = self.get_average_massive(
+                    r0_voltage, steps_per_measurement, 2.0
+                )
 
-            self.per_sensor.set_r0s(
-                self.calculate_masked_mean(averaging_massive))
-        except MS_ABC.MSException:
-            raise
+                self.per_sensor.set_r0s(
+                    self.calculate_masked_mean(averaging_massive))
+        except DeviceUnavailableException as e:
+            QtWidgets.QMessageBox.warning(self, "Get R0", str(e))
         finally:
-            self.ms.close()
             self.ms = None
             self.recalc_signal_handler()
 
@@ -162,8 +161,19 @@ class CalibrationWidget(QtWidgets.QWidget):
         if self.ms:
             return
 
-        self.ms = self.settings.get_new_ms()
-
+        try:
+            with self.settings.lease_ms() as ms:
+                if ms is None:
+                    return
+                self.ms = ms
+                try:
+                    self.calibration_loop()
+                finally:
+                    self.ms = None
+        except DeviceUnavailableException as e:
+            logger.error(f"Calibration is not started: {e}")
+
+    def calibration_loop(self):
         (
             initial_voltage,
             steps_per_measurement,
@@ -188,6 +198,7 @@ class CalibrationWidget(QtWidgets.QWidget):
         for idx, voltage_dot in enumerate(voltage_row):
             if self.stopped:
                 self.last_idx = idx
+                self.full_request_until_result((0,) * self.sensor_number)
                 return
             logger.debug(f"{idx} {voltage_dot}")
             try:
@@ -209,16 +220,12 @@ class CalibrationWidget(QtWidgets.QWidget):
             except MS_ABC.MSException:
                 self.last_idx = idx
                 self.stopped = True
-                self.ms.close()
-                self.ms = None
                 return
             except KeyboardInterrupt:
                 break
         self.full_request_until_result((0,) * self.sensor_number)
         self.stopped = True
         self.last_idx = all_steps
-        self.ms.close()
-        self.ms = None
 
     def full_request_until_result(self, values):
         sensor_types_list = [
@@ -1,64 +1,28 @@
 from PySide2 import QtWidgets, QtCore
-import struct
+from PySide2.QtCore import Signal
 import pathlib
-import csv
 from collections import OrderedDict
-import itertools
-import typing
-
-column_markers = tuple("U Rn Rs T gs sn st sts".split())
-column_names = ("Voltages",
-                "Heater resistance",
-                "Sensor resistance",
-                "Temperature",
-                "Gas state",
-                "Stage number",
-                "Stage type",
-                "Mode number")
-
-def filter_by_array(list_to_filter, flags):
-    return tuple(element for element, flag in zip(list_to_filter, flags) if flag)
-
-
-def form_header(chosen_sensors: typing.Tuple[bool], chosen):
-    chosen_sensors_idxes = tuple(idx for idx, sensor_bool in zip(range(1, 13), chosen_sensors) if sensor_bool)
-    header_comment = (("Time,s",),
-                      (f"U{idx},V" for idx in chosen_sensors_idxes),
-                      (f"Rn{idx},Ohm" for idx in chosen_sensors_idxes),
-                      (f"Rs{idx},Ohm" for idx in chosen_sensors_idxes),
-                      (f"T{idx},C" for idx in chosen_sensors_idxes),
-                      ("gas_state",),
-                      ("stage_num",),
-                      ("stage_type",),
-                      (f"State{idx}" for idx in chosen_sensors_idxes)
-                      )
-    header = (("Time",),
-              (f"U{idx}" for idx in chosen_sensors_idxes),
-              (f"Rn{idx}" for idx in chosen_sensors_idxes),
-              (f"Rs{idx}" for idx in chosen_sensors_idxes),
-              (f"T{idx}" for idx in chosen_sensors_idxes),
-              ("gas_state",),
-              ("stage_num",),
-              ("stage_type",),
-              (f"State{idx}" for idx in chosen_sensors_idxes)
-              )
-    header = itertools.chain(*(val for ch, val in zip(chosen, header) if ch))
-    header_comment = itertools.chain(*(val for ch, val in zip(chosen, header_comment) if ch))
-    return header_comment, header
-
-def format_float(value):
-    if isinstance(value, float):
-        return f"{value:10.4f}"
-    elif isinstance(value, int):
-        return f"{value:4d}"
+
+from dat_utils.batch_export import BatchExporter
+from dat_utils.text_export import column_markers, column_names
 
 
 class ConverterWidget(QtWidgets.QWidget):
+    progress_signal = Signal(object, int, int)
+    file_finished_signal = Signal(object)
+    finished_signal = Signal()
+
     def __init__(self, global_settings, *args, **kwargs):
         super().__init__(*args, f=QtCore.Qt.Tool, **kwargs)
         self.setWindowTitle("Converter")
 
         self.global_settings = global_settings
+        self.exporter = None
+        # progress of converted files as fraction of records
+        self.files_progress = dict()
+        self.progress_signal.connect(self.progress_callback)
+        self.file_finished_signal.connect(self.file_finished_callback)
+        self.finished_signal.connect(self.finished_callback)
 
         self._init_ui()
 
@@ -103,10 +67,24 @@ class ConverterWidget(QtWidgets.QWidget):
             sensors_layout.addWidget(checkbox)
 
 
+        buttons_layout = QtWidgets.QHBoxLayout()
+        main_layout.addLayout(buttons_layout)
         self.convert_button = QtWidgets.QPushButton("Convert")
-        main_layout.addWidget(self.convert_button)
-        main_layout.addStretch()
+        self.convert_folder_button = QtWidgets.QPushButton("Convert folder")
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        buttons_layout.addWidget(self.convert_button)
+        buttons_layout.addWidget(self.convert_folder_button)
+        buttons_layout.addWidget(self.cancel_button)
         self.convert_button.clicked.connect(self.convert_callback)
+        self.convert_folder_button.clicked.connect(self.convert_folder_callback)
+        self.cancel_button.clicked.connect(self.cancel_callback)
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        main_layout.addWidget(self.progress_bar)
+        self.results_list = QtWidgets.QListWidget()
+        main_layout.addWidget(self.results_list)
 
     def openfile_callback(self):
         filename, filter = QtWidgets.QFileDialog.getOpenFileName(
@@ -114,7 +92,7 @@ class ConverterWidget(QtWidgets.QWidget):
         if filename:
             self.filepath_lineedit.setText(filename)
 
-    def convert_callback(self):
+    def get_chosen(self):
         checked_boxes = " ".join((marker for marker, checkbox in self.checkboxes.items() if checkbox.isChecked()))
         self.global_settings.setValue("converter_chosen_lines", checked_boxes)
         sensors_chosen = " ".join((str(idx) for idx, checkbox in enumerate(self.sensors) if checkbox.isChecked()))
@@ -122,34 +100,64 @@ class ConverterWidget(QtWidgets.QWidget):
 
         chosen_parameters = (True, ) + tuple(checkbox.isChecked() for checkbox in self.checkboxes.values())
         chosen_sensors = tuple(checkbox.isChecked() for checkbox in self.sensors)
+        return chosen_sensors, chosen_parameters
 
-        orig_file = pathlib.Path(self.filepath_lineedit.text())
-        out_file = orig_file.with_suffix(".txt")
-        with orig_file.open("rb") as fd:
-            with out_file.open("w") as fd_out:
-                csvwriter = csv.writer(fd_out, delimiter="\t")
-                sensors_number, *_ = struct.unpack("<B", fd.read(1))
-                chosen_sensors = chosen_sensors[:sensors_number]
-                header_comment, header = form_header(chosen_sensors, chosen_parameters)
-                csvwriter.writerow(header_comment)
-                csvwriter.writerow(header)
-                bin_write_struct = struct.Struct("<f" + sensors_number * 4 * "f" + "BIH" + sensors_number * "B")
-                chunk = fd.read(bin_write_struct.size)
-                while chunk:
-                    values = bin_write_struct.unpack(chunk)
-                    possible = (values[0:1],  # time
-                                filter_by_array(values[1:1 + sensors_number], chosen_sensors),  # us
-                                filter_by_array(values[1 + sensors_number: 1 + 2 * sensors_number], chosen_sensors),  # rs
-                                filter_by_array(values[1 + 2 * sensors_number: 1 + 3 * sensors_number], chosen_sensors),  # sr
-                                filter_by_array(values[1 + 3 * sensors_number: 1 + 4 * sensors_number], chosen_sensors),  # temperatures
-                                values[1 + 4 * sensors_number: 1 + 4 * sensors_number + 1],  # gas_state
-                                values[1 + 1 + 4 * sensors_number: 1 + 2 + 4 * sensors_number],  # stage_num
-                                values[1 + 2 + 4 * sensors_number: 1 + 3 + 4 * sensors_number],  # stage_type
-                                filter_by_array(values[1 + 3 + 4 * sensors_number: 1 + 3 + 5 * sensors_number], chosen_sensors),  # sensor_states
-                                )
-                    row_to_write = map(format_float, tuple(itertools.chain(*(val for ch, val in zip(chosen_parameters, possible) if ch))))
-                    csvwriter.writerow(row_to_write)
-                    chunk = fd.read(bin_write_struct.size)
+    def convert_callback(self):
+        self.start_conversion([pathlib.Path(self.filepath_lineedit.text())])
+
+    def convert_folder_callback(self):
+        folder = QtWidgets.QFileDialog.getExistingDirectory(
+            self, "Open folder with result files", self.global_settings.value("converter_folder", "./tests"))
+        if folder:
+            self.global_settings.setValue("converter_folder", folder)
+            self.start_conversion(BatchExporter.find_sources(folder))
+
+    def start_conversion(self, sources):
+        if self.exporter is not None:
+            return
+        chosen_sensors, chosen_parameters = self.get_chosen()
+        self.files_progress = {source: 0.0 for source in sources}
+        self.progress_bar.setValue(0)
+        self.results_list.clear()
+        self.set_running(True)
+        self.exporter = BatchExporter(sources, chosen_sensors, chosen_parameters, self.progress_signal,
+                                      self.file_finished_signal, self.finished_signal)
+        self.exporter.start()
+
+    def cancel_callback(self):
+        if self.exporter is not None:
+            self.exporter.cancel()
+
+    def set_running(self, running):
+        self.convert_button.setEnabled(not running)
+        self.convert_folder_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def update_progress_bar(self):
+        if self.files_progress:
+            self.progress_bar.setValue(int(1000 * sum(self.files_progress.values()) / len(self.files_progress)))
+
+    def progress_callback(self, source, done, total):
+        if source in self.files_progress and total:
+            self.files_progress[source] = done / total
+            self.update_progress_bar()
+
+    def file_finished_callback(self, result):
+        self.files_progress[result.source] = 1.0
+        self.update_progress_bar()
+        if result.cancelled:
+            text = f"{result.source.name}: cancelled"
+        elif result.error is not None:
+            text = f"{result.source.name}: {result.error}"
+        else:
+            text = f"{result.source.name}: {result.records_number} records -> {result.target.name}"
+        self.results_list.addItem(text)
+
+    def finished_callback(self):
+        self.exporter = None
+        self.set_running(False)
+        if not self.files_progress:
+            self.results_list.addItem("No .dat files found")
 
     def toggle_visibility(self):
         self.setVisible(not self.isVisible())
@@ -0,0 +1,128 @@
+import concurrent.futures
+import dataclasses
+import multiprocessing
+import os
+import pathlib
+import threading
+import traceback
+import typing
+import logging
+
+from .text_export import ConversionCancelled, export_text
+
+logger = logging.getLogger(__name__)
+
+# Queue and event of the batch, given to worker processes when they are started
+_messages_queue = None
+_cancel_event = None
+
+
+@dataclasses.dataclass(frozen=True)
+class ExportResult:
+    source: pathlib.Path
+    target: typing.Optional[pathlib.Path] = None
+    records_number: int = 0
+    error: typing.Optional[str] = None
+    cancelled: bool = False
+
+
+def _init_worker(messages_queue, cancel_event):
+    global _messages_queue, _cancel_event
+    _messages_queue = messages_queue
+    _cancel_event = cancel_event
+
+
+def _export_file(source: pathlib.Path, chosen_sensors, chosen):
+    """Puts progress and then the result to the queue, so the result comes after all progress of the file"""
+    target = source.with_suffix(".txt")
+    try:
+        records_number = export_text(
+            source, target, chosen_sensors, chosen,
+            progress=lambda done, total: _messages_queue.put((source, done, total)),
+            cancel_event=_cancel_event,
+        )
+    except ConversionCancelled:
+        result = ExportResult(source, cancelled=True)
+    except Exception as e:
+        logger.error(f"{source}: {traceback.format_exc()}")
+        result = ExportResult(source, error=f"{type(e).__name__}: {e}")
+    else:
+        result = ExportResult(source, target, records_number)
+    _messages_queue.put(result)
+
+
+class BatchExporter:
+    """Converts .dat files to text on a pool of processes, several files are converted at once.
+
+    progress_signal gets (source, converted records, total records) of every file,
+    file_finished_signal gets ExportResult of every file, error of one file doesn't stop the others.
+    finished_signal is emitted when all files are done. cancel() stops the running conversions
+    at the next block and skips the queued files, they are reported as cancelled."""
+
+    def __init__(
+        self,
+        sources: typing.Sequence[typing.Union[str, pathlib.Path]],
+        chosen_sensors: typing.Sequence[bool],
+        chosen: typing.Sequence[bool],
+        progress_signal,
+        file_finished_signal,
+        finished_signal,
+        workers: typing.Optional[int] = None,
+    ):
+        self.sources = [pathlib.Path(source) for source in sources]
+        self.chosen_sensors = tuple(chosen_sensors)
+        self.chosen = tuple(chosen)
+        self.progress_signal = progress_signal
+        self.file_finished_signal = file_finished_signal
+        self.finished_signal = finished_signal
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.sources)))
+        # forked copy of GUI process with running threads may hang, workers are spawned
+        self.context = multiprocessing.get_context("spawn")
+        self.messages_queue = self.context.Queue()
+        self.cancel_event = self.context.Event()
+        self.executor = None
+        self.results: typing.List[ExportResult] = []
+        self.monitor_thread = None
+
+    @staticmethod
+    def find_sources(folder: typing.Union[str, pathlib.Path]) -> typing.List[pathlib.Path]:
+        return sorted(pathlib.Path(folder).glob("*.dat"))
+
+    def start(self):
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            self.workers, self.context, initializer=_init_worker, initargs=(self.messages_queue, self.cancel_event)
+        )
+        self.monitor_thread = threading.Thread(target=self.monitor, daemon=True)
+        self.monitor_thread.start()
+        for source in self.sources:
+            future = self.executor.submit(_export_file, source, self.chosen_sensors, self.chosen)
+            future.add_done_callback(lambda future, source=source: self.file_finished(source, future))
+
+    def file_finished(self, source: pathlib.Path, future: concurrent.futures.Future):
+        """Reports files which workers couldn't report"""
+        if future.cancelled():
+            self.messages_queue.put(ExportResult(source, cancelled=True))
+        elif future.exception() is not None:
+            # worker process died
+            self.messages_queue.put(ExportResult(source, error=f"{type(future.exception()).__name__}: {future.exception()}"))
+
+    def monitor(self):
+        """Emits progress and results of the workers on its own thread, ends when all files are finished"""
+        while len(self.results) < len(self.sources):
+            item = self.messages_queue.get()
+            if isinstance(item, ExportResult):
+                self.results.append(item)
+                self.file_finished_signal.emit(item)
+            else:
+                self.progress_signal.emit(*item)
+        self.executor.shutdown(wait=True)
+        self.finished_signal.emit()
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def join(self):
+        if self.monitor_thread is not None:
+            self.monitor_thread.join()
@@ -0,0 +1,307 @@
+"""
+.dat v2 container, all numbers are little-endian:
+
+    MAGIC | header length "<I" | header (JSON)
+    chunk * N
+    chunks index | stages index | trailer
+
+chunk: CHUNK_STRUCT (CHUNK_MAGIC, ticks, compression) | column sizes "<I" * fields | columns
+
+Columns are the fields of v1 record dtype (records.get_record_dtype), every field is stored as
+a contiguous array of the chunk ticks and compressed separately, so a column is read without
+the others. Chunks index keeps offset, tick range, time range and stage range of every chunk,
+stages index keeps the first tick of every run of a stage. Indexes are written on close, file
+without trailer (program was not finished) is indexed by scanning chunk headers.
+"""
+import json
+import pathlib
+import struct
+import typing
+import zlib
+import logging
+
+import numpy as np
+
+from .records import get_record_dtype
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+logger = logging.getLogger(__name__)
+
+VERSION = 2
+MAGIC = b"\x89DAT\r\n\x1a\n"
+HEADER_LENGTH_STRUCT = struct.Struct("<I")
+CHUNK_MAGIC = b"CHNK"
+CHUNK_STRUCT = struct.Struct("<4sIB")
+TRAILER_MAGIC = b"DATINDEX"
+# chunks index offset, chunks count, stages index offset, stages count, magic
+TRAILER_STRUCT = struct.Struct("<QIQI8s")
+
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+CHUNK_INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("first_tick", "<u8"),
+    ("ticks", "<u4"),
+    ("compression", "u1"),
+    ("time_start", "<f4"),
+    ("time_stop", "<f4"),
+    ("stage_first", "<u4"),
+    ("stage_last", "<u4"),
+])
+
+STAGE_INDEX_DTYPE = np.dtype([
+    ("stage_num", "<u4"),
+    ("stage_type", "<u2"),
+    ("first_tick", "<u8"),
+    ("time_start", "<f4"),
+])
+
+
+def get_available_compressions() -> typing.List[str]:
+    available = ["none", "zlib"]
+    if zstandard is not None:
+        available.append("zstd")
+    if lz4 is not None:
+        available.append("lz4")
+    return available
+
+
+def compress(data: bytes, compression: int) -> bytes:
+    if compression == COMPRESSIONS["none"]:
+        return data
+    elif compression == COMPRESSIONS["zlib"]:
+        return zlib.compress(data, 1)
+    elif compression == COMPRESSIONS["zstd"]:
+        return zstandard.ZstdCompressor().compress(data)
+    elif compression == COMPRESSIONS["lz4"]:
+        return lz4.frame.compress(data)
+    raise ValueError(f"Unknown compression {compression}")
+
+
+def decompress(data: bytes, compression: int) -> bytes:
+    if compression == COMPRESSIONS["none"]:
+        return data
+    elif compression == COMPRESSIONS["zlib"]:
+        return zlib.decompress(data)
+    elif compression == COMPRESSIONS["zstd"]:
+        if zstandard is None:
+            raise ValueError("zstandard package is needed to read this file")
+        return zstandard.ZstdDecompressor().decompress(data)
+    elif compression == COMPRESSIONS["lz4"]:
+        if lz4 is None:
+            raise ValueError("lz4 package is needed to read this file")
+        return lz4.frame.decompress(data)
+    raise ValueError(f"Unknown compression {compression}")
+
+
+def read_format_version(fd: typing.BinaryIO) -> int:
+    """Version of .dat file by its first bytes, position of fd is restored"""
+    position = fd.tell()
+    magic = fd.read(len(MAGIC))
+    fd.seek(position)
+    return VERSION if magic == MAGIC else 1
+
+
+def pack_header(sensors_number: int, compression: str, chunk_ticks: int, metadata: dict) -> bytes:
+    header = dict(metadata)
+    header.update(
+        version=VERSION,
+        sensors_number=sensors_number,
+        fields=list(get_record_dtype(sensors_number).names),
+        compression=compression,
+        chunk_ticks=chunk_ticks,
+    )
+    header_bytes = json.dumps(header).encode("utf-8")
+    return MAGIC + HEADER_LENGTH_STRUCT.pack(len(header_bytes)) + header_bytes
+
+
+def pack_chunk(records: np.ndarray, compression: int) -> bytes:
+    columns = [compress(np.ascontiguousarray(records[name]).tobytes(), compression) for name in records.dtype.names]
+    return b"".join((
+        CHUNK_STRUCT.pack(CHUNK_MAGIC, len(records), compression),
+        struct.pack(f"<{len(columns)}I", *map(len, columns)),
+        *columns,
+    ))
+
+
+def pack_index(chunks: np.ndarray, stages: np.ndarray, index_offset: int) -> bytes:
+    stages_offset = index_offset + chunks.nbytes
+    trailer = TRAILER_STRUCT.pack(index_offset, len(chunks), stages_offset, len(stages), TRAILER_MAGIC)
+    return chunks.tobytes() + stages.tobytes() + trailer
+
+
+def get_stage_runs(records: np.ndarray, first_tick: int, last_stage_num: typing.Optional[int]) -> list:
+    """Rows of stages index for stages starting in records, stage continued from the previous
+    chunk is not repeated"""
+    stage_nums = records["stage_num"]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(stage_nums)) + 1))
+    if last_stage_num is not None and stage_nums[0] == last_stage_num:
+        starts = starts[1:]
+    return [
+        (stage_nums[start], records["stage_type"][start], first_tick + start, records["time_next"][start])
+        for start in starts
+    ]
+
+
+class ChunkedDatReader:
+    """Reads .dat v2 file. Ticks are selected by tick range, stage or time window, only the
+    chunks which hold them are read and only the requested fields are decompressed."""
+
+    def __init__(self, path: typing.Union[str, pathlib.Path]):
+        self.fd = open(path, "rb")
+        try:
+            if self.fd.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not .dat v{VERSION} file")
+            header_length, = HEADER_LENGTH_STRUCT.unpack(self.fd.read(HEADER_LENGTH_STRUCT.size))
+            self.metadata = json.loads(self.fd.read(header_length).decode("utf-8"))
+            if self.metadata.get("version") != VERSION:
+                raise ValueError(f"Unsupported .dat version {self.metadata.get('version')}")
+            self.sensors_number = self.metadata["sensors_number"]
+            self.dtype = get_record_dtype(self.sensors_number)
+            self.data_offset = self.fd.tell()
+            index = self._read_index()
+            self.recovered = index is None
+            if self.recovered:
+                logger.warning(f"{path} has no index, it is rebuilt by scanning chunks")
+                index = self._scan_chunks()
+        except Exception:
+            self.fd.close()
+            raise
+        self.chunks, self.stages = index
+
+    def __len__(self):
+        return int(self.chunks["ticks"].sum())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.fd.close()
+
+    def _read_index(self) -> typing.Optional[typing.Tuple[np.ndarray, np.ndarray]]:
+        file_size = self.fd.seek(0, 2)
+        if file_size - self.data_offset < TRAILER_STRUCT.size:
+            return None
+        self.fd.seek(file_size - TRAILER_STRUCT.size)
+        chunks_offset, chunks_count, stages_offset, stages_count, magic = TRAILER_STRUCT.unpack(
+            self.fd.read(TRAILER_STRUCT.size)
+        )
+        if magic != TRAILER_MAGIC:
+            return None
+        self.fd.seek(chunks_offset)
+        chunks = np.frombuffer(self.fd.read(chunks_count * CHUNK_INDEX_DTYPE.itemsize), CHUNK_INDEX_DTYPE)
+        self.fd.seek(stages_offset)
+        stages = np.frombuffer(self.fd.read(stages_count * STAGE_INDEX_DTYPE.itemsize), STAGE_INDEX_DTYPE)
+        return chunks, stages
+
+    def _scan_chunks(self) -> typing.Tuple[np.ndarray, np.ndarray]:
+        file_size = self.fd.seek(0, 2)
+        offset = self.data_offset
+        chunks, stages = [], []
+        first_tick = 0
+        while True:
+            chunk_header = self._read_chunk_header(offset, file_size)
+            if chunk_header is None:
+                break
+            ticks, compression, column_offsets, column_sizes = chunk_header
+            records = self._read_columns(ticks, compression, column_offsets, column_sizes,
+                                         ("time_next", "stage_num", "stage_type"))
+            chunks.append((offset, first_tick, ticks, compression, records["time_next"][0], records["time_next"][-1],
+                           records["stage_num"][0], records["stage_num"][-1]))
+            stages.extend(get_stage_runs(records, first_tick, stages[-1][0] if stages else None))
+            first_tick += ticks
+            offset = column_offsets[-1] + column_sizes[-1]
+        return np.array(chunks, dtype=CHUNK_INDEX_DTYPE), np.array(stages, dtype=STAGE_INDEX_DTYPE)
+
+    def _read_chunk_header(self, offset: int, file_size: typing.Optional[int] = None):
+        """Returns ticks, compression, offsets and sizes of columns, None if there is no whole chunk at offset"""
+        fields_number = len(self.dtype.names)
+        header_size = CHUNK_STRUCT.size + 4 * fields_number
+        if file_size is not None and offset + header_size > file_size:
+            return None
+        self.fd.seek(offset)
+        header = self.fd.read(header_size)
+        if len(header) < header_size:
+            return None
+        magic, ticks, compression = CHUNK_STRUCT.unpack_from(header)
+        if magic != CHUNK_MAGIC or ticks == 0:
+            return None
+        column_sizes = np.frombuffer(header, "<u4", fields_number, CHUNK_STRUCT.size).astype(np.int64)
+        column_offsets = offset + header_size + np.concatenate(([0], np.cumsum(column_sizes)[:-1]))
+        if file_size is not None and column_offsets[-1] + column_sizes[-1] > file_size:
+            return None
+        return ticks, compression, column_offsets, column_sizes
+
+    def _read_columns(self, ticks, compression, column_offsets, column_sizes, fields) -> np.ndarray:
+        records = np.empty(ticks, dtype=self.get_dtype(fields))
+        for name in records.dtype.names:
+            field_index = self.dtype.names.index(name)
+            self.fd.seek(column_offsets[field_index])
+            data = decompress(self.fd.read(column_sizes[field_index]), compression)
+            field_dtype = self.dtype[name]
+            records[name] = np.frombuffer(data, field_dtype.base).reshape((ticks,) + field_dtype.shape)
+        return records
+
+    def get_dtype(self, fields: typing.Optional[typing.Sequence[str]] = None) -> np.dtype:
+        if fields is None:
+            return self.dtype
+        return np.dtype([(name, self.dtype[name]) for name in fields])
+
+    def read_chunk(self, chunk_index: int, fields: typing.Optional[typing.Sequence[str]] = None) -> np.ndarray:
+        ticks, compression, column_offsets, column_sizes = self._read_chunk_header(int(self.chunks["offset"][chunk_index]))
+        return self._read_columns(ticks, compression, column_offsets, column_sizes, self.get_dtype(fields).names)
+
+    def iter_chunks(self, fields: typing.Optional[typing.Sequence[str]] = None) -> typing.Iterator[np.ndarray]:
+        for chunk_index in range(len(self.chunks)):
+            yield self.read_chunk(chunk_index, fields)
+
+    def read(self, start: int = 0, stop: typing.Optional[int] = None,
+             fields: typing.Optional[typing.Sequence[str]] = None) -> np.ndarray:
+        """Ticks with indexes in [start, stop)"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return np.empty(0, dtype=self.get_dtype(fields))
+        first_ticks = self.chunks["first_tick"]
+        first_chunk = np.searchsorted(first_ticks, start, "right") - 1
+        last_chunk = np.searchsorted(first_ticks, stop, "left")
+        records = np.concatenate([self.read_chunk(chunk_index, fields) for chunk_index in range(first_chunk, last_chunk)])
+        offset = int(first_ticks[first_chunk])
+        return records[start - offset:stop - offset]
+
+    def read_stage(self, stage_num: int, fields: typing.Optional[typing.Sequence[str]] = None) -> np.ndarray:
+        """All ticks of the stage, stage repeated in cycles gives all its runs"""
+        stops = np.append(self.stages["first_tick"][1:], len(self))
+        runs = [(int(start), int(stop)) for start, stop, num in zip(self.stages["first_tick"], stops, self.stages["stage_num"])
+                if num == stage_num]
+        if not runs:
+            return np.empty(0, dtype=self.get_dtype(fields))
+        return np.concatenate([self.read(start, stop, fields) for start, stop in runs])
+
+    def read_time(self, time_start: float, time_stop: float,
+                  fields: typing.Optional[typing.Sequence[str]] = None) -> np.ndarray:
+        """Ticks with time_next in [time_start, time_stop)"""
+        first_chunk = np.searchsorted(self.chunks["time_stop"], time_start, "left")
+        last_chunk = np.searchsorted(self.chunks["time_start"], time_stop, "left")
+        blocks = []
+        for chunk_index in range(first_chunk, last_chunk):
+            records = self.read_chunk(chunk_index, fields)
+            if "time_next" in records.dtype.names:
+                times = records["time_next"]
+            else:
+                times = self.read_chunk(chunk_index, ("time_next",))["time_next"]
+            blocks.append(records[(times >= time_start) & (times < time_stop)])
+        if not blocks:
+            return np.empty(0, dtype=self.get_dtype(fields))
+        return np.concatenate(blocks)
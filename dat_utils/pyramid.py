@@ -0,0 +1,142 @@
+import json
+import os
+import pathlib
+import typing
+import logging
+
+import numpy as np
+
+from .reader import DatReader
+
+logger = logging.getLogger(__name__)
+
+PYRAMID_SUFFIX = ".pyramid.npy"
+PYRAMID_META_SUFFIX = ".pyramid.json"
+
+
+def get_bucket_dtype(sensors_number: int) -> np.dtype:
+    return np.dtype([("time", "<f4"), ("min", "<f4", (sensors_number,)), ("max", "<f4", (sensors_number,))])
+
+
+def reduce_buckets(values: np.ndarray, bucket_size: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Min and max of every bucket_size rows, the last bucket may be shorter. NaN values are skipped"""
+    whole = len(values) // bucket_size * bucket_size
+    parts = [values[:whole].reshape(-1, bucket_size, values.shape[1])]
+    if whole < len(values):
+        parts.append(values[whole:][None])
+    mins = np.concatenate([np.fmin.reduce(part, axis=1) for part in parts])
+    maxs = np.concatenate([np.fmax.reduce(part, axis=1) for part in parts])
+    return mins, maxs
+
+
+class MinMaxPyramid:
+    """Min and max of one column of .dat file by buckets of growing size.
+
+    Level k holds buckets of bucket_sizes[k] records, so plot of any time window is drawn from
+    the level with about max_points buckets in the window, and its envelope is the same as of
+    all records. Small windows are read from the file itself."""
+
+    def __init__(self, levels: typing.List[np.ndarray], bucket_sizes: typing.List[int], column: str):
+        self.levels = levels
+        self.bucket_sizes = bucket_sizes
+        self.column = column
+
+    @classmethod
+    def build(
+        cls,
+        reader: DatReader,
+        column: str = "sensor_resistances",
+        first_bucket: int = 16,
+        factor: int = 4,
+        min_buckets: int = 1024,
+        chunk_rows: int = 1 << 20,
+        progress: typing.Optional[typing.Callable[[int, int], None]] = None,
+    ) -> "MinMaxPyramid":
+        """progress gets (read records, all records) after every block of the file"""
+        # the file is read once by blocks, records of not finished bucket are carried to the next block
+        first_level = np.empty(-(-len(reader) // first_bucket), dtype=get_bucket_dtype(reader.sensors_number))
+        filled = 0
+        done = 0
+        carried_times, carried_values = None, None
+        for times, values in reader.iter_blocks(column, max(chunk_rows // first_bucket, 1) * first_bucket):
+            done += len(times)
+            if carried_times is not None:
+                times = np.concatenate((carried_times, times))
+                values = np.concatenate((carried_values, values))
+            whole = len(times) // first_bucket * first_bucket
+            if done == len(reader):
+                # the last bucket may be shorter
+                whole = len(times)
+            buckets = first_level[filled:filled + -(-whole // first_bucket)]
+            buckets["min"], buckets["max"] = reduce_buckets(np.ascontiguousarray(values[:whole]), first_bucket)
+            buckets["time"] = times[:whole:first_bucket]
+            filled += len(buckets)
+            carried_times, carried_values = times[whole:], values[whole:]
+            if progress is not None:
+                progress(done, len(reader))
+
+        levels, bucket_sizes = [first_level], [first_bucket]
+        while len(levels[-1]) > min_buckets:
+            previous = levels[-1]
+            level = np.empty(-(-len(previous) // factor), dtype=previous.dtype)
+            level["min"] = reduce_buckets(previous["min"], factor)[0]
+            level["max"] = reduce_buckets(previous["max"], factor)[1]
+            level["time"] = previous["time"][::factor]
+            levels.append(level)
+            bucket_sizes.append(bucket_sizes[-1] * factor)
+        return cls(levels, bucket_sizes, column)
+
+    @classmethod
+    def open_cached(cls, path: typing.Union[str, pathlib.Path], reader: DatReader,
+                    column: str = "sensor_resistances",
+                    progress: typing.Optional[typing.Callable[[int, int], None]] = None) -> "MinMaxPyramid":
+        """Pyramid saved next to .dat file, it is built and saved if the file was changed since"""
+        path = pathlib.Path(path)
+        data_path = path.with_name(path.name + PYRAMID_SUFFIX)
+        meta_path = path.with_name(path.name + PYRAMID_META_SUFFIX)
+        stat = os.stat(path)
+        source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "column": column}
+        try:
+            with open(meta_path) as fd:
+                meta = json.load(fd)
+            if meta["source"] == source:
+                data = np.load(data_path, mmap_mode="r")
+                offsets = np.cumsum([0] + meta["level_sizes"])
+                levels = [data[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+                return cls(levels, meta["bucket_sizes"], column)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        pyramid = cls.build(reader, column, progress=progress)
+        try:
+            np.save(data_path, np.concatenate(pyramid.levels))
+            with open(meta_path, "w") as fd:
+                json.dump({"source": source, "bucket_sizes": pyramid.bucket_sizes,
+                           "level_sizes": [len(level) for level in pyramid.levels]}, fd)
+        except OSError as e:
+            logger.warning(f"Pyramid of {path} isn't saved: {e}")
+        return pyramid
+
+    def get_level(self, rows_number: int, max_points: int) -> typing.Optional[int]:
+        """The finest level with at most max_points values in rows_number records, None for records themselves"""
+        if rows_number <= max_points:
+            return None
+        for level, bucket_size in enumerate(self.bucket_sizes):
+            # every bucket gives min and max
+            if 2 * -(-rows_number // bucket_size) <= max_points:
+                return level
+        return len(self.levels) - 1
+
+    def get_view(self, reader: DatReader, rows: slice, max_points: int = 4000) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Times and (points, sensors) values of records in rows, decimated to about max_points.
+        Min and max of bucket are given at its time one after another, so the envelope is kept"""
+        start, stop, _ = rows.indices(len(reader))
+        level = self.get_level(stop - start, max_points)
+        if level is None:
+            rows = slice(start, stop)
+            return np.array(reader.get_column("time", rows=rows)), np.array(reader.get_column(self.column, rows=rows))
+        bucket_size = self.bucket_sizes[level]
+        buckets = self.levels[level][start // bucket_size:-(-stop // bucket_size)]
+        times = np.repeat(buckets["time"], 2)
+        values = np.stack((buckets["min"], buckets["max"]), axis=1).reshape(-1, buckets["min"].shape[1])
+        return times, values
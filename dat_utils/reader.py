@@ -0,0 +1,205 @@
+import bisect
+import os
+import pathlib
+import typing
+import logging
+
+import numpy as np
+
+from . import container
+from .records import HEADER_STRUCT, get_record_dtype
+
+logger = logging.getLogger(__name__)
+
+# Column names of the reader and fields of the record
+COLUMNS = {
+    "time": "time_next",
+    "us": "us",
+    "rs": "rs",
+    "sensor_resistances": "sensor_resistances",
+    "temperatures": "temperatures",
+    "gas_state": "gas_state",
+    "stage_num": "stage_num",
+    "stage_type": "stage_type",
+    "sensor_states": "sensor_states",
+}
+
+SensorsSelection = typing.Optional[typing.Union[slice, typing.Sequence[int]]]
+
+
+class DatReader:
+    """Gives columns of .dat file as views of the record array.
+
+    v1 file is memory-mapped, opening doesn't read the records and columns are views without
+    copying. Incomplete record at the end of file (program crashed) is ignored.
+    Stages and time windows are found by binary search, as ProgramRunner writes ticks with
+    non-decreasing time and stage number."""
+
+    def __init__(self, records: np.ndarray, sensors_number: int, version: int = 1, metadata: typing.Optional[dict] = None):
+        self.records = records
+        self.sensors_number = sensors_number
+        self.version = version
+        self.metadata = {} if metadata is None else metadata
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        mmap = getattr(self.records, "_mmap", None)
+        self.records = self.records[:0]
+        if mmap is not None:
+            try:
+                mmap.close()
+            except BufferError:
+                # views of the records are still used, map is closed when they are collected
+                pass
+
+    def get_column(self, name: str, sensors: SensorsSelection = None, rows: slice = slice(None)) -> np.ndarray:
+        """Column of the records. Slices of rows and sensors give views, list of sensors copies
+        only the selected values."""
+        column = self.records[COLUMNS[name]][rows]
+        if sensors is not None:
+            if column.ndim == 1:
+                raise ValueError(f"Column {name} has no sensors")
+            column = column[:, sensors]
+        return column
+
+    @property
+    def time(self) -> np.ndarray:
+        return self.get_column("time")
+
+    @property
+    def us(self) -> np.ndarray:
+        return self.get_column("us")
+
+    @property
+    def rs(self) -> np.ndarray:
+        return self.get_column("rs")
+
+    @property
+    def sensor_resistances(self) -> np.ndarray:
+        return self.get_column("sensor_resistances")
+
+    @property
+    def temperatures(self) -> np.ndarray:
+        return self.get_column("temperatures")
+
+    @property
+    def gas_state(self) -> np.ndarray:
+        return self.get_column("gas_state")
+
+    @property
+    def stage_num(self) -> np.ndarray:
+        return self.get_column("stage_num")
+
+    @property
+    def stage_type(self) -> np.ndarray:
+        return self.get_column("stage_type")
+
+    @property
+    def sensor_states(self) -> np.ndarray:
+        return self.get_column("sensor_states")
+
+    def get_time_bounds(self) -> typing.Tuple[float, float]:
+        """Time of the first and the last record"""
+        times = self.time
+        return float(times[0]), float(times[-1])
+
+    def iter_blocks(self, name: str, block_rows: int = 1 << 20) -> typing.Iterator[typing.Tuple[np.ndarray, np.ndarray]]:
+        """Time and the column by blocks of rows, the file is read once"""
+        for start in range(0, len(self), block_rows):
+            rows = slice(start, start + block_rows)
+            yield self.get_column("time", rows=rows), self.get_column(name, rows=rows)
+
+    def get_stage_slice(self, stage_num: int) -> slice:
+        stage_nums = self.stage_num
+        return slice(bisect.bisect_left(stage_nums, stage_num), bisect.bisect_right(stage_nums, stage_num))
+
+    def get_time_slice(self, time_start: float, time_stop: float) -> slice:
+        """Rows with time in [time_start, time_stop)"""
+        times = self.time
+        return slice(bisect.bisect_left(times, time_start), bisect.bisect_left(times, time_stop))
+
+    def get_stages(self) -> typing.List[typing.Tuple[int, slice]]:
+        """Stage numbers with their rows, found by one binary search per stage"""
+        stage_nums = self.stage_num
+        stages = []
+        start = 0
+        while start < len(stage_nums):
+            stage_num = int(stage_nums[start])
+            stop = bisect.bisect_right(stage_nums, stage_num, start)
+            stages.append((stage_num, slice(start, stop)))
+            start = stop
+        return stages
+
+
+class ChunkedColumnsReader(DatReader):
+    """DatReader of .dat v2 file. Nothing is read on opening, columns of rows are read from
+    the chunks which hold them, time slices are found by the chunks index.
+    Columns are copies, reading the whole column reads all chunks."""
+
+    def __init__(self, chunked_reader: container.ChunkedDatReader):
+        super().__init__(np.empty(0, dtype=chunked_reader.dtype), chunked_reader.sensors_number,
+                         container.VERSION, chunked_reader.metadata)
+        self.chunked_reader = chunked_reader
+        self.records_number = len(chunked_reader)
+
+    def __len__(self):
+        return self.records_number
+
+    def close(self):
+        self.chunked_reader.close()
+
+    def get_column(self, name: str, sensors: SensorsSelection = None, rows: slice = slice(None)) -> np.ndarray:
+        start, stop, step = rows.indices(len(self))
+        column = self.chunked_reader.read(start, stop, (COLUMNS[name],))[COLUMNS[name]][::step]
+        if sensors is not None:
+            if column.ndim == 1:
+                raise ValueError(f"Column {name} has no sensors")
+            column = column[:, sensors]
+        return column
+
+    def get_time_bounds(self) -> typing.Tuple[float, float]:
+        chunks = self.chunked_reader.chunks
+        return float(chunks["time_start"][0]), float(chunks["time_stop"][-1])
+
+    def find_time(self, time: float) -> int:
+        """Index of the first record with time not less than the given one"""
+        chunks = self.chunked_reader.chunks
+        chunk_index = int(np.searchsorted(chunks["time_stop"], time, "left"))
+        if chunk_index == len(chunks):
+            return len(self)
+        times = self.chunked_reader.read_chunk(chunk_index, ("time_next",))["time_next"]
+        return int(chunks["first_tick"][chunk_index]) + bisect.bisect_left(times, time)
+
+    def get_time_slice(self, time_start: float, time_stop: float) -> slice:
+        return slice(self.find_time(time_start), self.find_time(time_stop))
+
+    def iter_blocks(self, name: str, block_rows: int = 1 << 20) -> typing.Iterator[typing.Tuple[np.ndarray, np.ndarray]]:
+        """Blocks are chunks of the file"""
+        for records in self.chunked_reader.iter_chunks(("time_next", COLUMNS[name])):
+            yield records["time_next"], records[COLUMNS[name]]
+
+
+def open_dat(path: typing.Union[str, pathlib.Path]) -> DatReader:
+    """Opens .dat file of any version"""
+    with open(path, "rb") as fd:
+        version = container.read_format_version(fd)
+        if version == container.VERSION:
+            return ChunkedColumnsReader(container.ChunkedDatReader(path))
+        header = fd.read(HEADER_STRUCT.size)
+    if not header:
+        raise ValueError(f"{path} is empty")
+    sensors_number, = HEADER_STRUCT.unpack(header)
+    dtype = get_record_dtype(sensors_number)
+    records_number = (os.path.getsize(path) - HEADER_STRUCT.size) // dtype.itemsize
+    if records_number == 0:
+        return DatReader(np.empty(0, dtype=dtype), sensors_number)
+    records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_STRUCT.size, shape=(records_number,))
+    return DatReader(records, sensors_number)
@@ -0,0 +1,31 @@
+import struct
+import typing
+import numpy as np
+
+# .dat v1: one byte with number of sensors, then records packed as
+# "<f" + n * 4 * "f" + "BIH" + n * "B"
+HEADER_STRUCT = struct.Struct("<B")
+
+
+def get_record_dtype(sensors_number: int) -> np.dtype:
+    """Record of .dat v1 file, byte-identical to the struct used by QueueRunner"""
+    return np.dtype([
+        ("time_next", "<f4"),
+        ("us", "<f4", (sensors_number,)),
+        ("rs", "<f4", (sensors_number,)),
+        ("sensor_resistances", "<f4", (sensors_number,)),
+        ("temperatures", "<f4", (sensors_number,)),
+        ("gas_state", "u1"),
+        ("stage_num", "<u4"),
+        ("stage_type", "<u2"),
+        ("sensor_states", "u1", (sensors_number,)),
+    ])
+
+
+def get_record_struct(sensors_number: int) -> struct.Struct:
+    return struct.Struct("<f" + sensors_number * 4 * "f" + "BIH" + sensors_number * "B")
+
+
+def read_header(fd: typing.BinaryIO) -> int:
+    sensors_number, *_ = HEADER_STRUCT.unpack(fd.read(HEADER_STRUCT.size))
+    return sensors_number
@@ -0,0 +1,243 @@
+import csv
+import itertools
+import logging
+import pathlib
+import time
+import typing
+
+import numpy as np
+
+from . import container
+from .reader import open_dat
+
+logger = logging.getLogger(__name__)
+
+column_markers = tuple("U Rn Rs T gs sn st sts".split())
+column_names = ("Voltages",
+                "Heater resistance",
+                "Sensor resistance",
+                "Temperature",
+                "Gas state",
+                "Stage number",
+                "Stage type",
+                "Mode number")
+
+# Record fields in the order of header groups, the first is time
+FIELDS = ("time_next", "us", "rs", "sensor_resistances", "temperatures",
+          "gas_state", "stage_num", "stage_type", "sensor_states")
+SENSOR_FIELDS = ("us", "rs", "sensor_resistances", "temperatures", "sensor_states")
+FLOAT_FIELDS = ("time_next", "us", "rs", "sensor_resistances", "temperatures")
+# csv.writer ends rows by \r\n
+LINE_TERMINATOR = "\r\n"
+BLOCK_TICKS = 16384
+POWERS_OF_TEN = 10 ** np.arange(1, 19, dtype=np.int64)
+# Larger values and NaN are formatted by str formatting
+MAX_RENDERED = 1e14
+# Chars of numbers 0000..9999, group of digits is column
+DIGIT_GROUPS = np.frombuffer("".join(f"{i:04d}" for i in range(10000)).encode(), np.uint8).reshape(10000, 4).T.copy()
+
+
+def form_header(chosen_sensors: typing.Tuple[bool], chosen):
+    chosen_sensors_idxes = tuple(idx for idx, sensor_bool in zip(range(1, 13), chosen_sensors) if sensor_bool)
+    header_comment = (("Time,s",),
+                      (f"U{idx},V" for idx in chosen_sensors_idxes),
+                      (f"Rn{idx},Ohm" for idx in chosen_sensors_idxes),
+                      (f"Rs{idx},Ohm" for idx in chosen_sensors_idxes),
+                      (f"T{idx},C" for idx in chosen_sensors_idxes),
+                      ("gas_state",),
+                      ("stage_num",),
+                      ("stage_type",),
+                      (f"State{idx}" for idx in chosen_sensors_idxes)
+                      )
+    header = (("Time",),
+              (f"U{idx}" for idx in chosen_sensors_idxes),
+              (f"Rn{idx}" for idx in chosen_sensors_idxes),
+              (f"Rs{idx}" for idx in chosen_sensors_idxes),
+              (f"T{idx}" for idx in chosen_sensors_idxes),
+              ("gas_state",),
+              ("stage_num",),
+              ("stage_type",),
+              (f"State{idx}" for idx in chosen_sensors_idxes)
+              )
+    header = itertools.chain(*(val for ch, val in zip(chosen, header) if ch))
+    header_comment = itertools.chain(*(val for ch, val in zip(chosen, header_comment) if ch))
+    return header_comment, header
+
+
+def format_float(value):
+    if isinstance(value, float):
+        return f"{value:10.4f}"
+    elif isinstance(value, int):
+        return f"{value:4d}"
+
+
+def get_columns(chosen_sensors: typing.Sequence[bool], chosen: typing.Sequence[bool]) -> typing.List[tuple]:
+    """Chosen fields with indexes of chosen sensors, None for fields without sensors"""
+    sensors = [idx for idx, sensor_bool in enumerate(chosen_sensors) if sensor_bool]
+    return [(field, sensors if field in SENSOR_FIELDS else None) for field, ch in zip(FIELDS, chosen) if ch]
+
+
+def get_row_template(columns: typing.Sequence[tuple]) -> str:
+    formats = []
+    for field, sensors in columns:
+        formats.extend(("%10.4f" if field in FLOAT_FIELDS else "%4d",) * (1 if sensors is None else len(sensors)))
+    return "\t".join(formats) + LINE_TERMINATOR
+
+
+def render_fixed(values: np.ndarray, decimals: int, min_width: int) -> np.ndarray:
+    """Bytes of values printed like f"{value:{min_width}.{decimals}f}", each field starts by tab.
+    Returns (rows, columns * (width + 1)) array, unused places are 0.
+    Digits are rendered for finite values below MAX_RENDERED, decimals <= 4. Other values
+    (NaN, inf, out of range resistance) are formatted by str formatting"""
+    rows, columns = values.shape
+    values = values.ravel()
+    special = ~(np.abs(values) < MAX_RENDERED)
+    special_indexes = np.flatnonzero(special)
+    special_texts = []
+    if len(special_indexes):
+        # the same sentinel value usually fills the column, every distinct value is formatted once
+        special_values, special_inverse = np.unique(values[special_indexes], return_inverse=True)
+        special_texts = [f"{value:{min_width}.{decimals}f}" for value in special_values.tolist()]
+        values = np.where(special, 0.0, values)
+    # float32 values scaled by 10 ** 4 are exact in float64, so rint rounds half to even like str formatting
+    scaled = np.abs(np.rint(values * 10.0 ** decimals)).astype(np.int64)
+    digits = np.maximum(np.searchsorted(POWERS_OF_TEN, scaled, "right") + 1, decimals + 1).astype(np.uint8)
+    dot = int(decimals > 0)
+    sign_position = digits + np.uint8(dot)
+    negative = np.signbit(values)
+    widths = np.maximum(sign_position + negative, np.uint8(min_width))
+    width = max(int(widths.max()), max(map(len, special_texts), default=0))
+
+    # field is column of chars, so the operations below run along values
+    chars = np.empty((width + 1, len(values)), dtype=np.uint8)
+    chars[0] = ord("\t")
+    end = width + 1
+    if decimals:
+        scaled, fraction = np.divmod(scaled, 10 ** decimals)
+        chars[end - decimals:end] = DIGIT_GROUPS.take(fraction, axis=1)[4 - decimals:]
+        chars[end - decimals - 1] = ord(".")
+        end -= decimals + 1
+    while end > 1:
+        scaled, group = np.divmod(scaled, 10000)
+        start = max(end - 4, 1)
+        chars[start:end] = DIGIT_GROUPS.take(group, axis=1)[4 - (end - start):]
+        end = start
+    positions = np.arange(width - 1, -1, -1, dtype=np.uint8)[:, None]
+    field = chars[1:]
+    np.copyto(field, np.uint8(ord(" ")), where=positions >= sign_position)
+    np.copyto(field, np.uint8(ord("-")), where=(positions == sign_position) & negative)
+    np.copyto(field, np.uint8(0), where=positions >= widths)
+    if special_texts:
+        texts = np.array([text.rjust(width, "\0") for text in special_texts], dtype=f"S{width}")
+        field[:, special_indexes] = texts.view(np.uint8).reshape(len(texts), width)[special_inverse.ravel()].T
+    return chars.T.reshape(rows, columns * (width + 1))
+
+
+def format_block(records: np.ndarray, columns: typing.Sequence[tuple], row_template: str) -> str:
+    """Text rows of records, the same as format_float gives for every value.
+    Integer fields fit float64 exactly, so values are taken to one array"""
+    values = np.empty((len(records), row_template.count("%")))
+    column_index = 0
+    floats_number = 0
+    for field, sensors in columns:
+        if sensors is None:
+            values[:, column_index] = records[field]
+            column_index += 1
+        else:
+            values[:, column_index:column_index + len(sensors)] = records[field][:, sensors]
+            column_index += len(sensors)
+        if field in FLOAT_FIELDS:
+            floats_number = column_index
+    if not len(values):
+        return ""
+
+    # float fields go before integer ones. Columns with values which are not rendered are wider,
+    # they are rendered apart, so other columns keep the usual width
+    wide = ~(np.abs(values[:, :floats_number]) < MAX_RENDERED).any(axis=0)
+    bounds = [0, *(np.flatnonzero(wide[1:] != wide[:-1]) + 1).tolist(), floats_number]
+    blocks = [render_fixed(values[:, start:stop], 4, 10) for start, stop in zip(bounds[:-1], bounds[1:])]
+    if floats_number < values.shape[1]:
+        blocks.append(render_fixed(values[:, floats_number:], 0, 4))
+    blocks.append(np.broadcast_to(np.frombuffer(LINE_TERMINATOR.encode(), np.uint8), (len(values), len(LINE_TERMINATOR))))
+    text = np.concatenate(blocks, axis=1)
+    text[:, 0] = 0
+    text = text.ravel()
+    return text[text != 0].tobytes().decode("ascii")
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+def export_text(
+    source: typing.Union[str, pathlib.Path],
+    target: typing.Optional[typing.Union[str, pathlib.Path]] = None,
+    chosen_sensors: typing.Sequence[bool] = (True,) * 12,
+    chosen: typing.Sequence[bool] = (True,) * 9,
+    block_ticks: int = BLOCK_TICKS,
+    progress: typing.Optional[typing.Callable[[int, int], None]] = None,
+    cancel_event=None,
+) -> int:
+    """Converts .dat file of any version to tab separated text, returns number of records.
+    chosen are flags of header groups starting from time, target is source with .txt suffix by default.
+    progress gets converted and total numbers of records after every block. When cancel_event is set,
+    ConversionCancelled is raised at the next block; unfinished target is removed on any error"""
+    source = pathlib.Path(source)
+    target = source.with_suffix(".txt") if target is None else pathlib.Path(target)
+    with source.open("rb") as fd:
+        version = container.read_format_version(fd)
+    if version == container.VERSION:
+        reader = container.ChunkedDatReader(source)
+    else:
+        reader = open_dat(source)
+    with reader:
+        sensors_number = reader.sensors_number
+        records_total = len(reader)
+        chosen_sensors = tuple(chosen_sensors)[:sensors_number]
+        columns = get_columns(chosen_sensors, chosen)
+        fields = [field for field, _ in columns]
+        if version == container.VERSION:
+            blocks = reader.iter_chunks(fields)
+        else:
+            blocks = (reader.records[start:start + block_ticks] for start in range(0, len(reader), block_ticks))
+        try:
+            with target.open("w") as fd_out:
+                csvwriter = csv.writer(fd_out, delimiter="\t")
+                header_comment, header = form_header(chosen_sensors, chosen)
+                csvwriter.writerow(header_comment)
+                csvwriter.writerow(header)
+                row_template = get_row_template(columns)
+                records_number = 0
+                for block in blocks:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ConversionCancelled(f"Conversion of {source} is cancelled")
+                    fd_out.write(format_block(block, columns, row_template))
+                    records_number += len(block)
+                    if progress is not None:
+                        progress(records_number, records_total)
+        except BaseException:
+            try:
+                target.unlink()
+            except OSError:
+                pass
+            raise
+    return records_number
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Converts .dat files to text files next to them")
+    parser.add_argument("files", nargs="+", type=pathlib.Path)
+    parser.add_argument("--columns", nargs="*", choices=column_markers, default=column_markers,
+                        help="columns besides time, all by default")
+    parser.add_argument("--sensors", nargs="*", type=int, choices=range(1, 13), default=range(1, 13),
+                        help="sensor numbers starting from 1, all by default")
+    args = parser.parse_args()
+    chosen = (True,) + tuple(marker in args.columns for marker in column_markers)
+    chosen_sensors = tuple(idx in args.sensors for idx in range(1, 13))
+    for path in args.files:
+        start = time.perf_counter()
+        records_number = export_text(path, None, chosen_sensors, chosen)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {records_number} records, {path.stat().st_size / 2 ** 20 / elapsed:.1f} MB/s")
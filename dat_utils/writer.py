@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+import os
+import typing
+import time
+import numpy as np
+import logging
+
+from program_dataclasses.operation_classes import MSOneTickClass
+from . import container
+from .records import HEADER_STRUCT, get_record_dtype
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FlushPolicy:
+    """When buffered records are written to the file"""
+    max_bytes: int = 64 * 1024
+    max_delay: float = 1.0
+    fsync_on_stage_change: bool = True
+
+
+class DatWriter:
+    """Writes ticks to .dat v1 file by batches.
+
+    Ticks are packed column by column into a preallocated structured array and written in one
+    call when the flush policy says so. Header is written with the first tick."""
+
+    def __init__(self, fd: typing.BinaryIO, policy: typing.Optional[FlushPolicy] = None):
+        self.fd = fd
+        self.policy = FlushPolicy() if policy is None else policy
+        self.buffer: typing.Optional[np.ndarray] = None
+        self.buffered = 0
+        self.first_buffered_time = None
+        self.last_stage_num = None
+
+    def _init_buffer(self, sensors_number: int):
+        dtype = get_record_dtype(sensors_number)
+        self.buffer = np.zeros(self._get_buffer_length(dtype), dtype=dtype)
+        self._write_header(sensors_number)
+
+    def _get_buffer_length(self, dtype: np.dtype) -> int:
+        return max(1, self.policy.max_bytes // dtype.itemsize)
+
+    def _write_header(self, sensors_number: int):
+        self.fd.write(HEADER_STRUCT.pack(sensors_number))
+
+    def _write_records(self, records: np.ndarray):
+        self.fd.write(records.tobytes())
+
+    def write_ticks(self, ticks: typing.Sequence[MSOneTickClass], sensor_resistances: typing.Sequence[typing.Sequence[float]]):
+        if not ticks:
+            return
+        if self.buffer is None:
+            self._init_buffer(len(ticks[0].rs))
+        start = 0
+        while start < len(ticks):
+            stop = min(len(ticks), start + self.buffer.shape[0] - self.buffered)
+            self._pack(ticks[start:stop], sensor_resistances[start:stop])
+            start = stop
+            if self.buffered == self.buffer.shape[0]:
+                self.flush()
+        stage_num = ticks[-1].stage_num
+        stage_changed = self.last_stage_num is not None and stage_num != self.last_stage_num
+        self.last_stage_num = stage_num
+        if stage_changed and self.policy.fsync_on_stage_change:
+            self.flush(fsync=True)
+        else:
+            self.poll()
+
+    def _pack(self, ticks: typing.Sequence[MSOneTickClass], sensor_resistances: typing.Sequence[typing.Sequence[float]]):
+        if self.buffered == 0:
+            self.first_buffered_time = time.monotonic()
+        rows = self.buffer[self.buffered:self.buffered + len(ticks)]
+        rows["time_next"] = [tick.time_next for tick in ticks]
+        rows["us"] = np.stack([tick.us for tick in ticks])
+        rows["rs"] = np.stack([tick.rs for tick in ticks])
+        rows["sensor_resistances"] = np.array(sensor_resistances)
+        rows["temperatures"] = np.array([tick.temperatures for tick in ticks])
+        rows["gas_state"] = [tick.gas_state for tick in ticks]
+        rows["stage_num"] = [tick.stage_num for tick in ticks]
+        rows["stage_type"] = [tick.stage_type for tick in ticks]
+        rows["sensor_states"] = np.array([tick.sensor_states for tick in ticks])
+        self.buffered += len(ticks)
+
+    def poll(self):
+        """Flushes buffered records which are waiting longer than the policy allows"""
+        if self.buffered and time.monotonic() - self.first_buffered_time >= self.policy.max_delay:
+            self.flush()
+
+    def flush(self, fsync: bool = False):
+        if self.buffered:
+            self._write_records(self.buffer[:self.buffered])
+            self.buffered = 0
+        self.fd.flush()
+        if fsync:
+            os.fsync(self.fd.fileno())
+
+    def close(self):
+        self.flush(fsync=True)
+        self.fd.close()
+
+
+class ChunkedDatWriter(DatWriter):
+    """Writes ticks to .dat v2 file, see dat_utils.container.
+
+    Every chunk has chunk_ticks records, only the last one may be shorter. Records flushed by the
+    policy before their chunk is full are appended after the last chunk as uncompressed tail
+    chunks, which are found by scanning if the program crashes. Full chunk is compressed and
+    written over the tail. Index is written on close."""
+
+    def __init__(
+        self,
+        fd: typing.BinaryIO,
+        policy: typing.Optional[FlushPolicy] = None,
+        metadata: typing.Optional[dict] = None,
+        compression: str = "zlib",
+        chunk_ticks: int = 4096,
+    ):
+        super().__init__(fd, policy)
+        if compression not in container.get_available_compressions():
+            raise ValueError(f"Compression {compression} is not available")
+        self.metadata = {} if metadata is None else metadata
+        self.compression = compression
+        self.chunk_ticks = chunk_ticks
+        # end of the last full chunk, tail chunks are after it
+        self.position = 0
+        self.tail_bytes = 0
+        self.tail_ticks = 0
+        self.written_ticks = 0
+        self.chunks = []
+        self.stages = []
+
+    def _get_buffer_length(self, dtype: np.dtype) -> int:
+        return self.chunk_ticks
+
+    def _write(self, data: bytes):
+        self.fd.write(data)
+        self.position += len(data)
+
+    def _write_header(self, sensors_number: int):
+        self._write(container.pack_header(sensors_number, self.compression, self.chunk_ticks, self.metadata))
+
+    def _write_records(self, records: np.ndarray):
+        """Writes compressed chunk over the tail"""
+        compression = container.COMPRESSIONS[self.compression]
+        self.chunks.append((
+            self.position, self.written_ticks, len(records), compression,
+            records["time_next"][0], records["time_next"][-1], records["stage_num"][0], records["stage_num"][-1],
+        ))
+        self.stages.extend(container.get_stage_runs(records, self.written_ticks, self.stages[-1][0] if self.stages else None))
+        self.fd.seek(self.position)
+        self._write(container.pack_chunk(records, compression))
+        if self.tail_bytes:
+            self.fd.truncate()
+        self.written_ticks += len(records)
+        self.tail_bytes = 0
+        self.tail_ticks = 0
+
+    def _write_tail(self):
+        tail = container.pack_chunk(self.buffer[self.tail_ticks:self.buffered], container.COMPRESSIONS["none"])
+        self.fd.seek(self.position + self.tail_bytes)
+        self.fd.write(tail)
+        self.tail_bytes += len(tail)
+        self.tail_ticks = self.buffered
+
+    def _pack(self, ticks: typing.Sequence[MSOneTickClass], sensor_resistances: typing.Sequence[typing.Sequence[float]]):
+        if self.buffered and self.buffered == self.tail_ticks:
+            # delay of the policy is counted from the first record which isn't in the file
+            self.first_buffered_time = time.monotonic()
+        super()._pack(ticks, sensor_resistances)
+
+    def poll(self):
+        if self.buffered > self.tail_ticks and time.monotonic() - self.first_buffered_time >= self.policy.max_delay:
+            self.flush()
+
+    def flush(self, fsync: bool = False):
+        if self.buffer is not None and self.buffered == self.buffer.shape[0]:
+            self._write_records(self.buffer)
+            self.buffered = 0
+        elif self.buffered > self.tail_ticks:
+            self._write_tail()
+        self.fd.flush()
+        if fsync:
+            os.fsync(self.fd.fileno())
+
+    def close(self):
+        if self.buffer is not None:
+            if self.buffered:
+                self._write_records(self.buffer[:self.buffered])
+                self.buffered = 0
+            self._write(container.pack_index(
+                np.array(self.chunks, dtype=container.CHUNK_INDEX_DTYPE),
+                np.array(self.stages, dtype=container.STAGE_INDEX_DTYPE),
+                self.position,
+            ))
+        self.flush(fsync=True)
+        self.fd.close()
@@ -1,4 +1,6 @@
+import contextlib
 import logging
+import typing
 
 from PySide2 import QtCore, QtWidgets
 
@@ -13,6 +15,7 @@ from database.sensor_number_widget import SensorNumberDatabaseWidget
 from database.heater_resistance_converter_widget import HeaterResistanceConverterWidget
 from database.models import Machine, SensorPosition
 from sensor_system import MS_Uni
+from sensor_system_utils.device_manager import MSDeviceManager
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +37,7 @@ class EquipmentSettings(QtWidgets.QWidget):
         self.setWindowTitle("Settings")
         self.global_settings = global_settings
         self.running_program = False
+        self.ms_manager = MSDeviceManager()
         self.start_program_signal.connect(self.process_start_program_signal)
 
         self.machine_name_widget = DatabaseLeaderComboboxWidget(Machine, "name")
@@ -108,16 +112,22 @@ class EquipmentSettings(QtWidgets.QWidget):
     def get_multirange(self) -> bool:
         return self.multirange_widget.get_value()
 
-    def get_new_ms(self):
-        if not self.running_program:
-            number_of_sensors = self.sensor_number_widget.get_value()
-            serial_port = self.comport_widget.get_value()
-            heater_resistance_converter = self.heater_resistance_converter_widget.get_value()
-            logger.debug(f"New MS device created on port {serial_port} with {number_of_sensors} sensors and converter value: {heater_resistance_converter}")
-            return MS_Uni(number_of_sensors, serial_port, heater_resistance_converter)
-        else:
-            logger.debug("No device created because program is running")
-            return None
+    @contextlib.contextmanager
+    def lease_ms(self, for_program=False, port=None) -> typing.Iterator[typing.Optional[MS_Uni]]:
+        """Gives exclusive access to the opened device. Yields None while program is running,
+        unless the lease is taken by the program itself. Port of the machine is used by default,
+        another port is given for additional devices of the same type.
+        GUI callers don't wait for a busy device, DeviceUnavailableException is raised at once."""
+        if self.running_program and not for_program:
+            logger.debug("No device leased because program is running")
+            yield None
+            return
+        number_of_sensors = self.sensor_number_widget.get_value()
+        serial_port = self.comport_widget.get_value() if port is None else port
+        heater_resistance_converter = self.heater_resistance_converter_widget.get_value()
+        timeout = None if for_program else 0
+        with self.ms_manager.lease(serial_port, number_of_sensors, heater_resistance_converter, timeout) as ms:
+            yield ms
 
     def get_r4_data(self):
         r4_data = self.modes_widget.get_data()
@@ -134,6 +144,7 @@ class EquipmentSettings(QtWidgets.QWidget):
         self.multirange_widget.save_to_database()
         self.modes_widget.save_to_database()
         self.heater_resistance_converter_widget.save_to_database()
+        self.ms_manager.close_all()
 
         self.redraw_signal.emit()
         self.calibration_redraw_signal.emit()
@@ -30,6 +30,7 @@ class MyMainWindow(QtWidgets.QMainWindow):
 
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
         self.gasstate_widget.save_to_settings()
+        self.settings_widget.ms_manager.close_all()
         return super().closeEvent(event)
     
     @QtCore.Slot(str)
@@ -1,6 +1,6 @@
 import logging
 import pathlib
-from typing import Optional, TYPE_CHECKING, List, Tuple
+from typing import Optional, TYPE_CHECKING, List, Tuple, Union
 
 import numpy as np
 from PySide2 import QtWidgets, QtCore
@@ -11,11 +11,18 @@ from misc import (
     CssCheckBoxes,
 )
 from sensor_system import MS_ABC
+from sensor_system_utils.device_manager import DeviceUnavailableException
 
 if TYPE_CHECKING:
     from main_window import MyMainWindow
 
 from measurement_utils.sensor_position_widget import SensorPositionWidget
+from measurement_utils.vectorized_converters import (
+    ResistanceToTemperatureConverter,
+    TemperatureToResistanceConverter,
+    TemperatureToVoltageConverter,
+    VoltageToResistanceConverter,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -167,6 +174,18 @@ class MeasurementWidget(QtWidgets.QWidget):
                 widget.get_voltage_for_temperature_func() for widget in self.widgets
             ]
 
+    def get_setpoint_converter(
+        self, type_
+    ) -> Union[TemperatureToResistanceConverter, TemperatureToVoltageConverter]:
+        if type_ == "R":
+            return TemperatureToResistanceConverter.from_coefficients(
+                [widget.get_temperature_for_resistance_coefficients() for widget in self.widgets]
+            )
+        elif type_ == "V":
+            return TemperatureToVoltageConverter(
+                [widget.get_voltage_for_temperature_calibration() for widget in self.widgets]
+            )
+
     def get_voltage_to_resistance_funcs(self):
         return tuple(
             widget.get_voltage_to_resistance_funcs() for widget in self.widgets
@@ -177,6 +196,19 @@ class MeasurementWidget(QtWidgets.QWidget):
             widget.get_temperature_for_resistance_func() for widget in self.widgets
         )
 
+    def get_voltage_to_resistance_converter(self) -> VoltageToResistanceConverter:
+        coefficients = [widget.get_voltage_to_resistance_coefficients() for widget in self.widgets]
+        modes_number = max((max(sensor_coefficients) for sensor_coefficients in coefficients), default=1)
+        return VoltageToResistanceConverter.from_coefficients(coefficients, modes_number)
+
+    def get_heater_resistance_to_heater_temperature_converter(self) -> ResistanceToTemperatureConverter:
+        return ResistanceToTemperatureConverter.from_coefficients(
+            [widget.get_temperature_for_resistance_coefficients() for widget in self.widgets]
+        )
+
+    def get_calibration_ids(self) -> List[List[int]]:
+        return [widget.get_calibration_ids() for widget in self.widgets]
+
     def get_multirange_status(self) -> int:
         return self.multirange_state
 
@@ -204,57 +236,43 @@ class MeasurementWidget(QtWidgets.QWidget):
             else:
                 values.append(value)
 
-        if self.multirange_state:
-            current_states = self.get_r4_resistance_modes()
-            logger.debug(f"{values}, {current_states}")
-            try:
-                ms = self.settings_widget.get_new_ms()
-            except:
-                mess_box = QtWidgets.QMessageBox()
-                mess_box.setText("Port doesn't exist")
-                mess_box.exec_()
-            else:
-                if ms is None:
-                    mess_box = QtWidgets.QMessageBox()
-                    mess_box.setText("Can't create MS device")
-                    mess_box.exec_()
-                    return
-                ms.send_measurement_range(current_states)
-                sensor_types_list = self.get_sensor_types_list()
-                us, rs = ms.full_request(
-                    values,
-                    request_type=MS_ABC.REQUEST_U,
-                    sensor_types_list=sensor_types_list,
-                )
-                for widget, u, r, mode in zip(self.widgets, us, rs, current_states):
-                    funcs = widget.get_voltage_to_resistance_funcs()
-                    logger.debug(str(funcs))
-                    sr = funcs[mode](u)
-                    widget.set_labels(u, r, sr, mode, 0)
-        else:
-            try:
-                ms = self.settings_widget.get_new_ms()
-            except:
-                mess_box = QtWidgets.QMessageBox()
-                mess_box.setText("Port doesn't exist")
-                mess_box.exec_()
-            else:
+        try:
+            with self.settings_widget.lease_ms() as ms:
                 if ms is None:
                     mess_box = QtWidgets.QMessageBox()
                     mess_box.setText("Can't create MS device")
                     mess_box.exec_()
                     return
                 sensor_types_list = self.get_sensor_types_list()
-                us, rs = ms.full_request(
-                    values,
-                    request_type=MS_ABC.REQUEST_U,
-                    sensor_types_list=sensor_types_list,
-                )
-                for widget, u, r in zip(self.widgets, us, rs):
-                    func = widget.get_voltage_to_resistance_funcs()
-                    logger.debug(str(func))
-                    sr = func(u)
-                    widget.set_labels(u, r, sr, 0, 0)
+                if self.multirange_state:
+                    current_states = self.get_r4_resistance_modes()
+                    logger.debug(f"{values}, {current_states}")
+                    ms.send_measurement_range(current_states)
+                    us, rs = ms.full_request(
+                        values,
+                        request_type=MS_ABC.REQUEST_U,
+                        sensor_types_list=sensor_types_list,
+                    )
+                    for widget, u, r, mode in zip(self.widgets, us, rs, current_states):
+                        funcs = widget.get_voltage_to_resistance_funcs()
+                        logger.debug(str(funcs))
+                        sr = funcs[mode](u)
+                        widget.set_labels(u, r, sr, mode, 0)
+                else:
+                    us, rs = ms.full_request(
+                        values,
+                        request_type=MS_ABC.REQUEST_U,
+                        sensor_types_list=sensor_types_list,
+                    )
+                    for widget, u, r in zip(self.widgets, us, rs):
+                        func = widget.get_voltage_to_resistance_funcs()
+                        logger.debug(str(func))
+                        sr = func(u)
+                        widget.set_labels(u, r, sr, 0, 0)
+        except DeviceUnavailableException as e:
+            mess_box = QtWidgets.QMessageBox()
+            mess_box.setText(str(e))
+            mess_box.exec_()
 
     def get_r4_resistance_modes(self) -> List[int]:
         if self.widgets:
@@ -1,5 +1,5 @@
 import logging
-from typing import Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple
 
 import numpy as np
 from PySide2 import QtWidgets, QtCore, QtGui
@@ -12,6 +12,7 @@ from misc import (
     find_index_of_last_non_repeatative_element,
 )
 from database.models import SensorPosition, fn, Machine
+from measurement_utils.vectorized_converters import BridgeCoefficients, make_voltage_to_resistance_func
 
 logger = logging.getLogger(__name__)
 
@@ -262,7 +263,9 @@ class SensorPositionWidget(QtWidgets.QGroupBox):
                 )
                 logger.debug(str(e))
                 self.func_T_to_U = lambda x: 0
+                self.voltage_calibration = None
             else:
+                self.voltage_calibration = (self.temperatures, self.voltages)
                 logger.debug(
                     f"Calibration T_to_U successful for {self.sensor_num} {self.machine_name} sensor"
                 )
@@ -277,7 +280,9 @@ class SensorPositionWidget(QtWidgets.QGroupBox):
                 )
                 self.func_T_to_R = lambda x: 0
                 self.func_R_to_T = lambda x: 0
+                self.temperature_regression = None
             else:
+                self.temperature_regression = (res.intercept, res.slope)
                 self.func_T_to_R = lambda x: res.intercept + res.slope * x
                 self.func_R_to_T = lambda y: (y - res.intercept) / res.slope 
                 logger.debug(
@@ -311,86 +316,74 @@ class SensorPositionWidget(QtWidgets.QGroupBox):
             return lambda x: 0
         return self.func_R_to_T
 
+    def get_temperature_for_resistance_coefficients(self) -> Optional[Tuple[float, float]]:
+        """(intercept, slope) of R(T) line, None if the sensor is not calibrated or not working"""
+        if not (self.temperatures_loaded and self.working_sensor.isChecked()):
+            return None
+        return self.temperature_regression
+
+    def get_voltage_for_temperature_calibration(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(temperatures, voltages) of T_to_U calibration, None if the sensor is not calibrated or not working"""
+        if not (self.temperatures_loaded and self.working_sensor.isChecked()):
+            return None
+        return self.voltage_calibration
+
     def get_voltage_for_temperature_func(self):
         if not (self.temperatures_loaded and self.working_sensor.isChecked()):
             return lambda x: 0
         return self.func_T_to_U
 
+    def get_voltage_to_resistance_coefficients(self) -> Dict[int, Optional[BridgeCoefficients]]:
+        """(rs_u1, rs_u2, r4) for every mode, None for not calibrated mode,
+        the only mode of not multirange sensor is 1"""
+        if not (self.resistances_convertors_loaded and self.working_sensor.isChecked()):
+            logger.debug("Not calibrated")
+            if self.multirange:
+                return {self.r4_to_int[r4_str]: None for r4_str in self.r4_str_values}
+            return {1: None}
+        if self.multirange:
+            coefficients = {}
+            r4s = tuple(
+                sensor_position.r4 for sensor_position in self.sensor_positions
+            )
+            for r4_str in self.r4_str_values:
+                if r4_str in r4s:
+                    sensor_position, *_ = [
+                        sensor_position
+                        for sensor_position in self.sensor_positions
+                        if sensor_position.r4 == r4_str
+                    ]
+                    rs_u1 = float(sensor_position.rs_u1)
+                    rs_u2 = float(sensor_position.rs_u2)
+                    r4 = self.r4_to_float[sensor_position.r4]
+                    logger.debug(f"R4 is calibrated {r4_str} {r4s} {rs_u1} {rs_u2}")
+                    coefficients[self.r4_to_int[r4_str]] = (rs_u1, rs_u2, r4)
+                else:
+                    logger.debug(f"R4 not in set of calibrated {r4_str} {r4s}")
+                    coefficients[self.r4_to_int[r4_str]] = None
+            return coefficients
+        sensor_position = self.sensor_positions[0]
+        try:
+            r4 = float(sensor_position.r4)
+        except ValueError:
+            logger.warn("R4 is not calibrated")
+            return {1: None}
+        return {1: (float(sensor_position.rs_u1), float(sensor_position.rs_u2), r4)}
+
+    def get_calibration_ids(self) -> List[int]:
+        """Database ids of the sensor positions used for conversion"""
+        if not self.resistances_convertors_loaded:
+            return []
+        return [sensor_position.id for sensor_position in self.sensor_positions]
+
     def get_voltage_to_resistance_funcs(self):
+        funcs_dict = {
+            mode: (lambda u: u) if coefficients is None else make_voltage_to_resistance_func(*coefficients)
+            for mode, coefficients in self.get_voltage_to_resistance_coefficients().items()
+        }
         if self.multirange:
-            funcs_dict = {}
-            if self.resistances_convertors_loaded and self.working_sensor.isChecked():
-                r4s = tuple(
-                    sensor_position.r4 for sensor_position in self.sensor_positions
-                )
-                for r4_str in self.r4_str_values:
-                    if r4_str in r4s:
-                        sensor_position, *_ = [
-                            sensor_position
-                            for sensor_position in self.sensor_positions
-                            if sensor_position.r4 == r4_str
-                        ]
-                        rs_u1 = float(sensor_position.rs_u1)
-                        rs_u2 = float(sensor_position.rs_u2)
-                        r4 = self.r4_to_float[sensor_position.r4]
-
-                        vertical_asimptote = 2.5 + 4.068 * (2.5 - rs_u2)
-
-                        def function_wrapper(rs_u1, rs_u2, r4):
-                            def f(u):
-                                logger.debug(
-                                    f"rs1: {rs_u1}, rs2: {rs_u2}, r4: {r4}, u: {u}"
-                                )
-                                if u < vertical_asimptote:
-                                    return (rs_u1 - rs_u2) * r4 / (
-                                        (2.5 + 2.5 * 4.068 - u) / 4.068 - rs_u2
-                                    ) - r4
-                                else:
-                                    return 1e14
-
-                            return f
-
-                        logger.debug(f"R4 is calibrated {r4_str} {r4s} {rs_u1} {rs_u2}")
-                        funcs_dict[
-                            self.r4_to_int[sensor_position.r4]
-                        ] = function_wrapper(rs_u1, rs_u2, r4)
-                    else:
-                        logger.debug(f"R4 not in set of calibrated {r4_str} {r4s}")
-                        funcs_dict[self.r4_to_int[r4_str]] = lambda u: u
-            else:
-                logger.debug("Not calibrated")
-                for r4_str in self.r4_str_values:
-                    funcs_dict[self.r4_to_int[r4_str]] = lambda u: u
             return funcs_dict
-        else:
-            if self.resistances_convertors_loaded and self.working_sensor.isChecked():
-                sensor_position = self.sensor_positions[0]
-                try:
-                    r4 = float(sensor_position.r4)
-                except ValueError:
-                    logger.warn("R4 is not calibrated")
-                    return lambda u: u
-                rs_u1 = float(sensor_position.rs_u1)
-                rs_u2 = float(sensor_position.rs_u2)
-
-                vertical_asimptote = 2.5 + 4.068 * (2.5 - rs_u2)
-
-                def function_wrapper(rs_u1, rs_u2, r4):
-                    def f(u):
-                        logger.debug(f"rs1: {rs_u1}, rs2: {rs_u2}, r4: {r4}, u: {u}")
-                        if u < vertical_asimptote:
-                            return (rs_u1 - rs_u2) * r4 / (
-                                (2.5 + 2.5 * 4.068 - u) / 4.068 - rs_u2
-                            ) - r4
-                        else:
-                            return 1e14
-
-                    return f
-
-                return function_wrapper(rs_u1, rs_u2, r4)
-            else:
-                logger.debug("Not calibrated")
-                return lambda u: u
+        return funcs_dict[1]
 
     def set_labels(self, u, r, sr, mode, temperature, un=0):
         if u == sr:
@@ -0,0 +1,208 @@
+import typing
+
+import numpy as np
+from scipy.interpolate import PPoly, make_interp_spline
+
+BRIDGE_K = 4.068
+OUT_OF_RANGE_RESISTANCE = 1e14
+# Up to this number of ticks voltages are converted sensor by sensor, numpy calls cost more than the work
+FAST_PATH_MAX_TICKS = 4
+
+BridgeCoefficients = typing.Tuple[float, float, float]  # rs_u1, rs_u2, r4
+
+
+def get_vertical_asimptote(rs_u2):
+    return 2.5 + BRIDGE_K * (2.5 - rs_u2)
+
+
+def make_voltage_to_resistance_func(rs_u1: float, rs_u2: float, r4: float) -> typing.Callable[[float], float]:
+    vertical_asimptote = get_vertical_asimptote(rs_u2)
+
+    def f(u):
+        if u < vertical_asimptote:
+            return (rs_u1 - rs_u2) * r4 / ((2.5 + 2.5 * BRIDGE_K - u) / BRIDGE_K - rs_u2) - r4
+        else:
+            return OUT_OF_RANGE_RESISTANCE
+
+    return f
+
+
+class VoltageToResistanceConverter:
+    """Converts bridge voltages of all sensors to sensor resistances by one array expression.
+
+    Coefficients have shape (sensors, modes), modes are numbered from 1. Voltage of sensor
+    which is not calibrated in its mode is returned as is. A few ticks (the live path converts
+    one) are converted by the same formula in a Python loop over sensors."""
+
+    def __init__(self, rs_u1: np.ndarray, rs_u2: np.ndarray, r4: np.ndarray, calibrated: np.ndarray):
+        self.rs_u1 = rs_u1
+        self.rs_u2 = rs_u2
+        self.r4 = r4
+        self.calibrated = calibrated
+        self.vertical_asimptote = get_vertical_asimptote(rs_u2)
+        self.sensor_indexes = np.arange(rs_u1.shape[0])
+        # (rs_u1, rs_u2, r4, vertical asymptote) of every sensor and mode, None if not calibrated
+        all_coefficients = np.stack((rs_u1, rs_u2, r4, self.vertical_asimptote), axis=-1).tolist()
+        self.mode_coefficients = [
+            [coefficients if mode_calibrated else None for coefficients, mode_calibrated in zip(*sensor)]
+            for sensor in zip(all_coefficients, calibrated.tolist())
+        ]
+
+    @classmethod
+    def from_coefficients(
+        cls, coefficients: typing.Sequence[typing.Mapping[int, typing.Optional[BridgeCoefficients]]], modes_number: int
+    ) -> "VoltageToResistanceConverter":
+        shape = (len(coefficients), modes_number)
+        rs_u1, rs_u2, r4 = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        calibrated = np.zeros(shape, dtype=bool)
+        for sensor, sensor_coefficients in enumerate(coefficients):
+            for mode, mode_coefficients in sensor_coefficients.items():
+                if mode_coefficients is not None:
+                    rs_u1[sensor, mode - 1], rs_u2[sensor, mode - 1], r4[sensor, mode - 1] = mode_coefficients
+                    calibrated[sensor, mode - 1] = True
+        return cls(rs_u1, rs_u2, r4, calibrated)
+
+    def convert(self, us: np.ndarray, modes: typing.Optional[np.ndarray] = None) -> np.ndarray:
+        """us and modes are (sensors,) for one tick or (ticks, sensors) for a batch,
+        without modes the first mode is used"""
+        us = np.asarray(us, dtype=np.float64)
+        if (1 if us.ndim == 1 else us.shape[0]) <= FAST_PATH_MAX_TICKS:
+            return self._convert_by_sensors(us, modes)
+        mode_indexes = 0 if modes is None else np.asarray(modes) - 1
+        sensor_indexes = self.sensor_indexes[:us.shape[-1]]
+        rs_u1 = self.rs_u1[sensor_indexes, mode_indexes]
+        rs_u2 = self.rs_u2[sensor_indexes, mode_indexes]
+        r4 = self.r4[sensor_indexes, mode_indexes]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            resistances = (rs_u1 - rs_u2) * r4 / ((2.5 + 2.5 * BRIDGE_K - us) / BRIDGE_K - rs_u2) - r4
+        resistances = np.where(us < self.vertical_asimptote[sensor_indexes, mode_indexes], resistances, OUT_OF_RANGE_RESISTANCE)
+        return np.where(self.calibrated[sensor_indexes, mode_indexes], resistances, us)
+
+    def _convert_by_sensors(self, us: np.ndarray, modes: typing.Optional[np.ndarray]) -> np.ndarray:
+        """The same result as the array expression, operations on floats go in the same order"""
+        sensors_number = us.shape[-1]
+        ticks_us = us.reshape(-1, sensors_number).tolist()
+        if modes is None:
+            ticks_modes = [[1] * sensors_number] * len(ticks_us)
+        else:
+            ticks_modes = np.asarray(modes).reshape(-1, sensors_number).tolist()
+        resistances = []
+        for tick_us, tick_modes in zip(ticks_us, ticks_modes):
+            for sensor_coefficients, u, mode in zip(self.mode_coefficients, tick_us, tick_modes):
+                coefficients = sensor_coefficients[mode - 1]
+                if coefficients is None:
+                    resistances.append(u)
+                elif u < coefficients[3]:
+                    rs_u1, rs_u2, r4, _ = coefficients
+                    resistances.append((rs_u1 - rs_u2) * r4 / ((2.5 + 2.5 * BRIDGE_K - u) / BRIDGE_K - rs_u2) - r4)
+                else:
+                    resistances.append(OUT_OF_RANGE_RESISTANCE)
+        return np.array(resistances, dtype=np.float64).reshape(us.shape)
+
+
+class ResistanceToTemperatureConverter:
+    """Converts heater resistances of all sensors to temperatures by linear calibration,
+    temperature of not calibrated sensor is 0"""
+
+    def __init__(self, intercept: np.ndarray, slope: np.ndarray, calibrated: np.ndarray):
+        self.intercept = intercept
+        self.slope = slope
+        self.calibrated = calibrated
+
+    @classmethod
+    def from_coefficients(
+        cls, coefficients: typing.Sequence[typing.Optional[typing.Tuple[float, float]]]
+    ) -> "ResistanceToTemperatureConverter":
+        intercept, slope = np.zeros(len(coefficients)), np.ones(len(coefficients))
+        calibrated = np.zeros(len(coefficients), dtype=bool)
+        for sensor, sensor_coefficients in enumerate(coefficients):
+            if sensor_coefficients is not None:
+                intercept[sensor], slope[sensor] = sensor_coefficients
+                calibrated[sensor] = True
+        return cls(intercept, slope, calibrated)
+
+    def convert(self, rs: np.ndarray) -> np.ndarray:
+        rs = np.asarray(rs, dtype=np.float64)
+        sensors_number = rs.shape[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            temperatures = (rs - self.intercept[:sensors_number]) / self.slope[:sensors_number]
+        return np.where(self.calibrated[:sensors_number], temperatures, 0.0)
+
+
+class TemperatureToResistanceConverter:
+    """Converts temperatures of all sensors to heater resistance setpoints by linear calibration,
+    setpoint of not calibrated sensor is 0"""
+
+    def __init__(self, intercept: np.ndarray, slope: np.ndarray, calibrated: np.ndarray):
+        self.intercept = intercept
+        self.slope = slope
+        self.calibrated = calibrated
+
+    @classmethod
+    def from_coefficients(
+        cls, coefficients: typing.Sequence[typing.Optional[typing.Tuple[float, float]]]
+    ) -> "TemperatureToResistanceConverter":
+        inverse = ResistanceToTemperatureConverter.from_coefficients(coefficients)
+        return cls(inverse.intercept, inverse.slope, inverse.calibrated)
+
+    def convert(self, temperatures: np.ndarray) -> np.ndarray:
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        sensors_number = temperatures.shape[-1]
+        resistances = self.intercept[:sensors_number] + self.slope[:sensors_number] * temperatures
+        return np.where(self.calibrated[:sensors_number], resistances, 0.0)
+
+
+class TemperatureToVoltageConverter:
+    """Converts temperatures of all sensors to voltage setpoints.
+
+    Cubic spline of calibration, the same as interp1d(kind="cubic") builds, is kept as piecewise
+    polynomial coefficients. Intervals of all sensors are packed into one sorted array with
+    offset per sensor, so intervals for all sensors are found by one searchsorted call.
+    Setpoint of not calibrated sensor is 0, temperature out of calibration range raises ValueError."""
+
+    def __init__(self, calibrations: typing.Sequence[typing.Optional[typing.Tuple[np.ndarray, np.ndarray]]]):
+        sensors_number = len(calibrations)
+        self.t_min = np.zeros(sensors_number)
+        self.t_max = np.zeros(sensors_number)
+        self.calibrated = np.zeros(sensors_number, dtype=bool)
+        lefts, coefficients = [], []
+        for sensor, calibration in enumerate(calibrations):
+            if calibration is None:
+                # dummy interval keeps indexing of the following sensors
+                lefts.append(np.zeros(1))
+                coefficients.append(np.zeros((4, 1)))
+                continue
+            temperatures, voltages = map(np.asarray, calibration)
+            order = np.argsort(temperatures, kind="mergesort")
+            spline = PPoly.from_spline(make_interp_spline(temperatures[order], voltages[order], k=3))
+            # repeated end knots give empty intervals
+            nonempty = np.diff(spline.x) > 0
+            lefts.append(spline.x[:-1][nonempty])
+            coefficients.append(spline.c[:, nonempty])
+            self.t_min[sensor], self.t_max[sensor] = spline.x[0], spline.x[-1]
+            self.calibrated[sensor] = True
+        self.lefts = np.concatenate(lefts)
+        self.coefficients = np.concatenate(coefficients, axis=1)
+        self.first_interval = np.cumsum([0] + [sensor_lefts.size for sensor_lefts in lefts])
+        self.origin = np.min(self.lefts)
+        self.sensor_offset = np.arange(sensors_number) * (np.max(self.t_max) - self.origin + 1.0)
+        self.search_lefts = np.concatenate([
+            sensor_lefts - self.origin + sensor_offset for sensor_lefts, sensor_offset in zip(lefts, self.sensor_offset)
+        ])
+
+    def convert(self, temperatures: np.ndarray) -> np.ndarray:
+        """temperatures are (sensors,) for one tick or (ticks, sensors) for the whole program"""
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        sensors_number = temperatures.shape[-1]
+        calibrated = self.calibrated[:sensors_number]
+        out_of_range = calibrated & ((temperatures < self.t_min[:sensors_number]) | (temperatures > self.t_max[:sensors_number]))
+        if np.any(out_of_range):
+            sensors = sorted(set(np.nonzero(out_of_range)[-1] + 1))
+            raise ValueError(f"Temperature is out of calibration range for sensors {sensors}")
+        search_temperatures = np.where(calibrated, temperatures, self.t_min[:sensors_number]) - self.origin
+        index = np.searchsorted(self.search_lefts, search_temperatures + self.sensor_offset[:sensors_number], side="right") - 1
+        index = np.clip(index, self.first_interval[:sensors_number], self.first_interval[1:sensors_number + 1] - 1)
+        dx = temperatures - self.lefts[index]
+        c = self.coefficients
+        voltages = ((c[0, index] * dx + c[1, index]) * dx + c[2, index]) * dx + c[3, index]
+        return np.where(calibrated, voltages, 0.0)
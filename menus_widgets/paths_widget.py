@@ -13,6 +13,7 @@ class PathsWidget(QtWidgets.QWidget):
         self.paths_settings = [
             "operation_widget_save_path",
             "operation_widget_programs_path",
+            "operation_widget_program_cache_path",
             "calibration_widget_res_path",
             "calibration_widget_par_path",
             "calibration_widget_cal_path",
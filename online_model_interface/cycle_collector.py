@@ -1,7 +1,7 @@
 from program_dataclasses.operation_classes import MSOneTickClass
+from operation_utils.queue_consumer import QueueConsumer
 from queue import Queue
 from PySide2 import QtCore
-from time import sleep
 import typing
 
 class CycleCollector(QtCore.QObject):
@@ -13,15 +13,24 @@ class CycleCollector(QtCore.QObject):
         self.is_stopped = True
         self.previous_stage_num = -1
         self.one_cycle_data: typing.List[MSOneTickClass] = []
+        self.consumer = QueueConsumer(queue, self.process_ticks)
 
-    def cycle(self):
-        while not self.is_stopped:
-            sleep(0.02)
-            if not self.queue.empty():
-                self.process_one_element_in_queue()
+    def start(self):
+        self.is_stopped = False
+        self.consumer.start()
 
-    def process_one_element_in_queue(self):
-        one_tick_data = self.queue.get()
+    def stop(self):
+        self.is_stopped = True
+        self.consumer.stop()
+
+    def join(self):
+        self.consumer.join()
+
+    def process_ticks(self, ticks: typing.List[MSOneTickClass]):
+        for one_tick_data in ticks:
+            self.process_one_element_in_queue(one_tick_data)
+
+    def process_one_element_in_queue(self, one_tick_data: MSOneTickClass):
         if self.previous_stage_num != one_tick_data.stage_num:
             self.process_one_whole_cycle()
         else:
@@ -1,18 +1,27 @@
+import datetime
+import functools
+import hashlib
 import logging
 import pathlib
 from typing import TYPE_CHECKING
 
-import yaml
 from PySide2 import QtCore, QtWidgets
 from PySide2.QtCore import QTimer, Signal
 from PySide2.QtWidgets import QFrame
 
 from misc import Lamp
-from operation_utils.program_generator import ProgramGenerator
+from sensor_system import MS_ABC
+from operation_utils.program_cache import ProgramCache
 from operation_utils.queue_runner import QueueRunner
+from dat_utils.writer import FlushPolicy
 from operation_utils.program_runner import ProgramRunner
-from operation_utils.queues_holder import QueuesHolder
+from operation_utils.multi_device_runner import MultiDeviceRunner
+from operation_utils.setpoint_schedule import SetpointSchedule
+from operation_utils.tick_scheduler import CatchUpPolicy
+from operation_utils.queues_holder import QueuePolicy, QueuesHolder
 from operation_utils.operation_plot_widget import OperationalPlotWidget
+from operation_utils.latency import LatencyRecorder
+from operation_utils.latency_panel import LatencyPanel
 
 if TYPE_CHECKING:
     from equipment_settings import EquipmentSettings
@@ -44,17 +53,30 @@ class OperationWidget(QtWidgets.QWidget):
         self.gasstate_widget = parent.gasstate_widget
         self.runner = None
         self.generator = None
+        self.program_hash = None
         self.queues_holder = QueuesHolder()
         save_folder = self.global_settings.value(
             "operation_widget_save_path", "./tests"
         )
         self.queue_runner = QueueRunner(
             self,
-            self.queues_holder.add_new_queue(),
-            self.measurement_widget.get_voltage_to_resistance_funcs,
+            # Device threads wait for the disk writer rather than lose ticks
+            self.queues_holder.add_new_queue(10000, QueuePolicy.BLOCK, "disk writer"),
+            self.measurement_widget.get_voltage_to_resistance_converter,
             self.measurement_widget.get_multirange_status,
-            self.measurement_widget.get_heater_resistance_to_heater_temperature_funcs,
+            self.measurement_widget.get_heater_resistance_to_heater_temperature_converter,
             save_folder,
+            FlushPolicy(
+                max_bytes=int(self.global_settings.value("operation_widget_flush_bytes", 64 * 1024)),
+                max_delay=float(self.global_settings.value("operation_widget_flush_delay", 1.0)),
+                fsync_on_stage_change=self.global_settings.value(
+                    "operation_widget_fsync_on_stage_change", True, type=bool
+                ),
+            ),
+            dat_format=int(self.global_settings.value("operation_widget_dat_format", 1)),
+            compression=self.global_settings.value("operation_widget_dat_compression", "zlib"),
+            chunk_ticks=int(self.global_settings.value("operation_widget_dat_chunk_ticks", 4096)),
+            get_dat_metadata=self.get_dat_metadata,
         )
         self.settings: EquipmentSettings = self.parent_py.settings_widget
         self.settings.redraw_signal.connect(self.refresh_state)
@@ -94,15 +116,38 @@ class OperationWidget(QtWidgets.QWidget):
         self.checkbox_if_send_u_or_r = QtWidgets.QCheckBox("Send U")
         self.checkbox_if_send_u_or_r.setChecked(True)
         self.solid_mode_mode = QtWidgets.QCheckBox("Solid mode")
+        self.pipelined_checkbox = QtWidgets.QCheckBox("Pipelined")
+        self.pipelined_checkbox.setToolTip("Send the next tick before the answer of the previous one is processed")
         controls_groupbox_layout.addWidget(start_button)
         controls_groupbox_layout.addWidget(stop_button)
         controls_groupbox_layout.addWidget(self.checkbox_if_send_u_or_r)
         controls_groupbox_layout.addWidget(self.solid_mode_mode)
+        controls_groupbox_layout.addWidget(self.pipelined_checkbox)
+        self.catch_up_combobox = QtWidgets.QComboBox()
+        self.catch_up_combobox.addItems([policy.value for policy in CatchUpPolicy])
+        self.catch_up_combobox.setToolTip("What to do with ticks which missed their deadline:\n"
+                                          "compress - send them immediately, skip - drop them,\n"
+                                          "stretch - send immediately and shift the rest of the program")
+        controls_groupbox_layout.addWidget(self.catch_up_combobox)
+        self.extra_ports_lineedit = QtWidgets.QLineEdit()
+        self.extra_ports_lineedit.setPlaceholderText("Extra ports")
+        self.extra_ports_lineedit.setToolTip("Comma separated ports of additional devices running the same program")
+        self.extra_ports_lineedit.setText(self.global_settings.value("operation_widget_extra_ports", ""))
+        controls_groupbox_layout.addWidget(self.extra_ports_lineedit)
         controls_groupbox_layout.addStretch()
 
         layout1.addWidget(controls_groupbox)
 
-        self.plot_widget = OperationalPlotWidget(self)
+        # stages of every plotted tick from the request to the screen
+        self.latency_recorder = LatencyRecorder()
+        self.latency_panel = LatencyPanel(self.latency_recorder, self.global_settings, self)
+        self.plot_widget = OperationalPlotWidget(
+            self,
+            number_of_dots=int(self.global_settings.value("operation_widget_plot_window", 1200)),
+            history_budget=int(self.global_settings.value("operation_widget_history_budget_mb", 256)) * 2 ** 20,
+            fast=bool(int(self.global_settings.value("operation_widget_fast_plot", 1))),
+            latency_recorder=self.latency_recorder,
+        )
         self.plot_widget.set_sensor_number(self.settings.get_sensor_number())
 
         layout1.addStretch(1)
@@ -134,13 +179,17 @@ class OperationWidget(QtWidgets.QWidget):
         self.lamp = Lamp()
         self.lamp.set_stop()
         status_groupbox_layout.addWidget(self.lamp)
+        self.frame_time_label = QtWidgets.QLabel("Frame: - ms")
+        status_groupbox_layout.addWidget(self.frame_time_label)
+        latency_button = QtWidgets.QPushButton("Latency")
+        latency_button.clicked.connect(self.latency_panel.show)
+        status_groupbox_layout.addWidget(latency_button)
 
         layout2.addWidget(status_groupbox)
 
         layout2.addStretch(1)
 
-        self.timer_plot.timeout.connect(self.plot_widget.plot_answer)
-        self.queue_runner.hold_result.connect((self.plot_widget.hold_answer))
+        self.timer_plot.timeout.connect(self.plot_answers)
         self.values_set_timer.timeout.connect(self.set_values_on_meas_widget)
         layout.addWidget(self.plot_widget)
 
@@ -157,12 +206,41 @@ class OperationWidget(QtWidgets.QWidget):
     def get_checkbox_state(self):
         return self.checkbox_if_send_u_or_r.isChecked()
 
+    def get_extra_ports(self) -> list:
+        text = self.extra_ports_lineedit.text()
+        self.global_settings.setValue("operation_widget_extra_ports", text)
+        return [port.strip() for port in text.split(",") if port.strip()]
+
     def get_range_mode_settings(self):
         if self.solid_mode_mode.isChecked():
             return self.measurement_widget.get_r4_resistance_modes
         else:
             return None
 
+    def get_dat_metadata(self) -> dict:
+        """Header of .dat v2 file"""
+        *_, machine_name, machine_id = self.settings.get_variables()
+        return {
+            "machine": machine_name,
+            "machine_id": machine_id,
+            "calibration_ids": self.measurement_widget.get_calibration_ids(),
+            "program_hash": self.program_hash,
+            "created": datetime.datetime.now().isoformat(),
+        }
+
+    def prepare_setpoint_schedule(self) -> SetpointSchedule:
+        """Converts temperatures of the whole program to setpoints of the chosen request type"""
+        if self.get_checkbox_state():
+            request_type, converter_type = MS_ABC.REQUEST_U, "V"
+        else:
+            request_type, converter_type = MS_ABC.REQUEST_R, "R"
+        return SetpointSchedule.prepare(
+            self.generator.compile(),
+            self.measurement_widget.get_setpoint_converter(converter_type),
+            request_type,
+            self.settings.get_sensor_number(),
+        )
+
     def start(self):
         if self.load_label.text() == "Loaded":
             if self.runner is not None and not self.runner.isStopped():
@@ -174,6 +252,11 @@ class OperationWidget(QtWidgets.QWidget):
                 ret = msg_box.exec_()
                 if ret == QtWidgets.QMessageBox.No:
                     return
+            try:
+                setpoint_schedule = self.prepare_setpoint_schedule()
+            except ValueError as e:
+                self.parent_py.message_signal.emit(f"Program can't be converted to setpoints: {e}")
+                return
             self.refresh_state()
             self.load_program_button.setEnabled(False)
 
@@ -182,11 +265,10 @@ class OperationWidget(QtWidgets.QWidget):
                 critical_bottom,
             ) = self.measurement_widget.get_critical_sensors_voltages()
 
-            self.runner = ProgramRunner(
-                self.generator,
-                self.settings.get_new_ms,
+            extra_ports = self.get_extra_ports()
+            runner_args = (
                 self.measurement_widget.get_sensor_types_list,
-                self.measurement_widget.get_convert_funcs,
+                self.measurement_widget.get_setpoint_converter,
                 self.get_range_mode_settings(),
                 self.settings.get_multirange(),
                 self.gasstate_widget.send_gasstate_signal,
@@ -198,7 +280,27 @@ class OperationWidget(QtWidgets.QWidget):
                 critical_top,
                 critical_bottom,
             )
+            if extra_ports:
+                self.runner = MultiDeviceRunner(
+                    (self.generator,),
+                    [functools.partial(self.settings.lease_ms, for_program=True, port=port)
+                     for port in (None, *extra_ports)],
+                    *runner_args,
+                    pipelined=self.pipelined_checkbox.isChecked(),
+                    catch_up_policy=CatchUpPolicy(self.catch_up_combobox.currentText()),
+                    setpoint_schedules=(setpoint_schedule,),
+                )
+            else:
+                self.runner = ProgramRunner(
+                    self.generator,
+                    functools.partial(self.settings.lease_ms, for_program=True),
+                    *runner_args,
+                    pipelined=self.pipelined_checkbox.isChecked(),
+                    catch_up_policy=CatchUpPolicy(self.catch_up_combobox.currentText()),
+                    setpoint_schedule=setpoint_schedule,
+                )
             self.plot_widget.clear_plot()
+            self.latency_recorder.reset()
             self.runner.start()
             self.queue_runner.start()
             self.timer_plot.start()
@@ -216,6 +318,8 @@ class OperationWidget(QtWidgets.QWidget):
         self.queue_runner.join()
         self.timer_plot.stop()
         self.values_set_timer.stop()
+        self.plot_answers(force=True)
+        self.log_queues_statistics()
         self.lamp.set_stop()
         self.settings.start_program_signal.emit(0)
         self.load_program_button.setEnabled(True)
@@ -236,13 +340,18 @@ class OperationWidget(QtWidgets.QWidget):
                 pathlib.Path(filename).parent.as_posix(),
             ),
         )
+        program_cache = ProgramCache(
+            self.global_settings.value("operation_widget_program_cache_path", "./tests"),
+            int(self.global_settings.value("operation_widget_program_cache_size_mb", 512)) * 2 ** 20,
+        )
         try:
-            loaded = yaml.load(pathlib.Path(filename).read_text(), yaml.Loader)
+            program_text = pathlib.Path(filename).read_text()
+            self.generator = program_cache.get_program_generator(program_text)
+            self.program_hash = hashlib.sha256(program_text.encode("utf-8")).hexdigest()
         except:
             self.set_program_not_loaded()
             raise
         else:
-            self.generator = ProgramGenerator(loaded)
             program_min_temperature, program_max_temperature = self.generator.calculate_min_and_max_temperatures()
             max_of_minimums, min_of_maximums = self.measurement_widget.get_working_sensors_temperature_calibration_interval()
             if max_of_minimums is not None and min_of_maximums is not None:
@@ -261,6 +370,17 @@ class OperationWidget(QtWidgets.QWidget):
         self.load_label.setStyleSheet("background-color:pink")
 
 
+    def plot_answers(self, force: bool = False):
+        for answer in self.queue_runner.get_plot_answers():
+            self.plot_widget.hold_answer(answer)
+        self.plot_widget.plot_answer(force)
+        self.frame_time_label.setText(f"Frame: {self.plot_widget.frame_time * 1000:.1f} ms")
+
+    def log_queues_statistics(self):
+        for statistics in self.queues_holder.get_statistics() + self.queue_runner.get_queues_statistics():
+            logger.info(f"Queue {statistics}")
+        logger.info(f"Tick latency:\n{self.latency_recorder.format()}")
+
     def set_values_on_meas_widget(self):
         results = self.queue_runner.get_meas_tuple()
         if results is not None:
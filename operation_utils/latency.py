@@ -0,0 +1,107 @@
+from time import perf_counter_ns
+import json
+import pathlib
+import threading
+import typing
+import logging
+
+from operation_utils.tick_scheduler import LatenessHistogram
+
+logger = logging.getLogger(__name__)
+
+# Points of the tick on its way from the device to the screen, stamps of a tick are
+# perf_counter_ns values indexed by them, 0 means the tick didn't pass the point
+REQUEST = 0  # request is sent to the device
+ANSWER = 1  # answer is received
+QUEUED = 2  # tick is put to QueuesHolder
+CONSUMED = 3  # QueueRunner.one_cycle_step takes the tick
+CONVERTED = 4  # converted values are put to the plot queue
+HELD = 5  # OperationalPlotWidget.hold_answer takes the values
+PLOTTED = 6  # OperationalPlotWidget.plot_answer has set the data of the lines
+PAINTED = 7  # the plot is painted
+POINTS_NUMBER = 8
+
+# Stage is the time between two points
+STAGES = (
+    ("request", REQUEST, ANSWER),
+    ("queue put", ANSWER, QUEUED),
+    ("queue wait", QUEUED, CONSUMED),
+    ("conversion", CONSUMED, CONVERTED),
+    ("plot queue", CONVERTED, HELD),
+    ("plot wait", HELD, PLOTTED),
+    ("paint", PLOTTED, PAINTED),
+)
+TOTAL = "answer to screen"
+
+
+def new_stamps() -> typing.List[int]:
+    stamps = [0] * POINTS_NUMBER
+    stamps[REQUEST] = perf_counter_ns()
+    return stamps
+
+
+def mark(stamps: typing.Optional[typing.List[int]], point: int, now: typing.Optional[int] = None):
+    """Stamps the point, now is given to stamp several ticks by one clock reading"""
+    if stamps is not None:
+        stamps[point] = perf_counter_ns() if now is None else now
+
+
+class LatencyRecorder:
+    """Collects stamps of finished ticks into a histogram per stage.
+
+    Ticks are recorded by the thread which finishes them, histograms are read by GUI,
+    so both are done under the lock. Stages which the tick didn't pass are skipped."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: typing.Dict[str, LatenessHistogram] = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {name: LatenessHistogram() for name, *_ in STAGES}
+            self.histograms[TOTAL] = LatenessHistogram()
+
+    def record(self, stamps: typing.List[int]):
+        with self.lock:
+            for name, start, stop in STAGES:
+                if stamps[start] and stamps[stop]:
+                    self.histograms[name].add(max(stamps[stop] - stamps[start], 0))
+            last = max(stamps[HELD:])
+            if stamps[ANSWER] and last:
+                self.histograms[TOTAL].add(max(last - stamps[ANSWER], 0))
+
+    def record_many(self, stamps_list: typing.Iterable[typing.List[int]]):
+        for stamps in stamps_list:
+            self.record(stamps)
+
+    def get_statistics(self) -> typing.List[dict]:
+        with self.lock:
+            return [
+                {
+                    "stage": name,
+                    "ticks": histogram.total,
+                    "mean": histogram.sum_ns / histogram.total / 1e9 if histogram.total else 0.0,
+                    "max": histogram.max_ns / 1e9,
+                    "bins": [(start, stop, count) for start, stop, count in histogram.get_bins() if count],
+                }
+                for name, histogram in self.histograms.items()
+            ]
+
+    def format(self) -> str:
+        parts = []
+        for statistics in self.get_statistics():
+            parts.append(f"{statistics['stage']}: {statistics['ticks']} ticks, "
+                         f"mean {statistics['mean'] * 1e3:.3f} ms, max {statistics['max'] * 1e3:.3f} ms")
+            parts.extend(f"{start * 1e3:9.3f}..{stop * 1e3:9.3f} ms: {count}"
+                         for start, stop, count in statistics["bins"])
+        return "\n".join(parts)
+
+    def dump(self, path: typing.Union[str, pathlib.Path]):
+        """Saves statistics of all stages as JSON, the last bin has null end"""
+        statistics = self.get_statistics()
+        for stage in statistics:
+            stage["bins"] = [(start, None if stop == float("inf") else stop, count)
+                             for start, stop, count in stage["bins"]]
+        with open(path, "w") as fd:
+            json.dump(statistics, fd, indent=1)
@@ -0,0 +1,68 @@
+import pathlib
+import logging
+
+from PySide2 import QtCore, QtGui, QtWidgets
+
+from operation_utils.latency import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyPanel(QtWidgets.QWidget):
+    """Debug window with latency histograms of the tick stages, refreshed every second"""
+
+    def __init__(self, recorder: LatencyRecorder, global_settings: QtCore.QSettings, parent=None):
+        super().__init__(parent, QtCore.Qt.Window)
+        self.setWindowTitle("Tick latency")
+        self.recorder = recorder
+        self.global_settings = global_settings
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.text = QtWidgets.QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        layout.addWidget(self.text)
+
+        buttons_layout = QtWidgets.QHBoxLayout()
+        reset_button = QtWidgets.QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        buttons_layout.addWidget(reset_button)
+        save_button = QtWidgets.QPushButton("Save...")
+        save_button.clicked.connect(self.save)
+        buttons_layout.addWidget(save_button)
+        buttons_layout.addStretch()
+        layout.addLayout(buttons_layout)
+
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        self.text.setPlainText(self.recorder.format())
+
+    def reset(self):
+        self.recorder.reset()
+        self.refresh()
+
+    def save(self):
+        filename, filters = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save latency", self.global_settings.value("operation_widget_latency_path", "./tests"),
+            "JSON (*.json)"
+        )
+        if not filename:
+            return
+        self.global_settings.setValue("operation_widget_latency_path", pathlib.Path(filename).parent.as_posix())
+        try:
+            self.recorder.dump(filename)
+        except OSError as e:
+            logger.error(f"Latency isn't saved: {e}")
+            QtWidgets.QMessageBox.warning(self, "Save latency", str(e))
@@ -0,0 +1,222 @@
+import bisect
+import pathlib
+import tempfile
+import typing
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BlockStore:
+    """Rows of the same width stored by blocks. Full blocks can be spilled to a file, then they
+    are read back through one file handle, so a long run doesn't use up file descriptors"""
+
+    def __init__(self, width: int, block_rows: int, spill_path: pathlib.Path):
+        self.width = width
+        self.block_rows = block_rows
+        self.spill_path = spill_path
+        # spilled blocks are None, they are read from the file
+        self.blocks: typing.List[typing.Optional[np.ndarray]] = []
+        self.first_times: typing.List[float] = []
+        self.spilled = 0
+        self.size = 0
+        self.spill_file: typing.Optional[typing.BinaryIO] = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def block_bytes(self) -> int:
+        return self.block_rows * self.width * 8
+
+    def get_memory_bytes(self) -> int:
+        return (len(self.blocks) - self.spilled) * self.block_bytes
+
+    def append(self, row: np.ndarray) -> bool:
+        """Returns True when a block was filled"""
+        if self.size % self.block_rows == 0:
+            self.blocks.append(np.empty((self.block_rows, self.width)))
+            self.first_times.append(float(row[0]))
+        self.blocks[-1][self.size % self.block_rows] = row
+        self.size += 1
+        return self.size % self.block_rows == 0
+
+    def spill_oldest(self) -> bool:
+        """Moves the oldest full block in memory to the file, returns False if there is no such block"""
+        full_blocks = self.size // self.block_rows
+        if self.spilled >= full_blocks:
+            return False
+        if self.spill_file is None:
+            self.spill_file = open(self.spill_path, "w+b")
+        self.spill_file.seek(self.spilled * self.block_bytes)
+        self.spill_file.write(self.blocks[self.spilled].tobytes())
+        self.blocks[self.spilled] = None
+        self.spilled += 1
+        return True
+
+    def read_block(self, block_index: int) -> np.ndarray:
+        block = self.blocks[block_index]
+        if block is not None:
+            return block
+        block = np.empty((self.block_rows, self.width))
+        self.spill_file.seek(block_index * self.block_bytes)
+        self.spill_file.readinto(memoryview(block).cast("B"))
+        return block
+
+    def close(self):
+        self.blocks.clear()
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def get_rows(self, start: int, stop: int) -> np.ndarray:
+        stop = min(stop, self.size)
+        if start >= stop:
+            return np.empty((0, self.width))
+        parts = []
+        for block_index in range(start // self.block_rows, (stop - 1) // self.block_rows + 1):
+            block_start = block_index * self.block_rows
+            parts.append(self.read_block(block_index)[max(start - block_start, 0):stop - block_start])
+        return np.concatenate(parts)
+
+    def find_time(self, time: float, side: str = "left") -> int:
+        """Index of row with time (the first column) like np.searchsorted gives"""
+        if self.size == 0:
+            return 0
+        block_index = max(bisect.bisect_right(self.first_times, time) - 1, 0)
+        block = self.read_block(block_index)
+        rows = min(self.size - block_index * self.block_rows, self.block_rows)
+        return block_index * self.block_rows + int(np.searchsorted(block[:rows, 0], time, side))
+
+
+class LiveHistory:
+    """All ticks of the run with min/max levels for plotting any time range of it.
+
+    Samples are kept at full resolution, level k keeps min and max of every
+    first_bucket * factor ** k samples. Levels are updated on every append, so append costs
+    O(1) amortized. When memory of the stores exceeds memory_budget, the oldest full blocks
+    are spilled to files in spill_folder, full resolution first."""
+
+    def __init__(
+        self,
+        channels: int,
+        memory_budget: int = 256 * 2 ** 20,
+        spill_folder: typing.Optional[typing.Union[str, pathlib.Path]] = None,
+        block_rows: int = 4096,
+        first_bucket: int = 16,
+        factor: int = 4,
+        levels_number: int = 8,
+    ):
+        self.channels = channels
+        self.memory_budget = memory_budget
+        self.temporary_folder = None
+        if spill_folder is None:
+            self.temporary_folder = tempfile.TemporaryDirectory(prefix="live_history_")
+            spill_folder = self.temporary_folder.name
+        spill_folder = pathlib.Path(spill_folder)
+        self.bucket_sizes = [first_bucket * factor ** level for level in range(levels_number)]
+        self.factor = factor
+        # sample row is time and values, bucket row is time of the first sample, mins and maxs
+        self.samples = BlockStore(1 + channels, block_rows, spill_folder / "samples.bin")
+        self.levels = [BlockStore(1 + 2 * channels, block_rows, spill_folder / f"level_{level}.bin")
+                       for level in range(levels_number)]
+        self.sample = np.empty(1 + channels)
+        # not finished bucket of every level and the number of its parts
+        self.accumulators = np.empty((levels_number, 1 + 2 * channels))
+        self.counts = [0] * levels_number
+
+    def __len__(self):
+        return len(self.samples)
+
+    def close(self):
+        self.samples.close()
+        for level in self.levels:
+            level.close()
+        if self.temporary_folder is not None:
+            try:
+                self.temporary_folder.cleanup()
+            except OSError as e:
+                logger.warning(f"Spill files of live history aren't removed: {e}")
+
+    def get_memory_bytes(self) -> int:
+        return self.samples.get_memory_bytes() + sum(level.get_memory_bytes() for level in self.levels)
+
+    def append(self, time: float, values: typing.Union[typing.Sequence, np.ndarray]):
+        self.sample[0] = time
+        self.sample[1:] = values
+        block_filled = self.samples.append(self.sample)
+        self.add_to_level(0, self.sample[0], self.sample[1:], self.sample[1:])
+        if block_filled:
+            self.keep_budget()
+
+    def add_to_level(self, level: int, time: float, mins: np.ndarray, maxs: np.ndarray):
+        accumulator = self.accumulators[level]
+        if self.counts[level] == 0:
+            accumulator[0] = time
+            accumulator[1:1 + self.channels] = mins
+            accumulator[1 + self.channels:] = maxs
+        else:
+            np.fmin(accumulator[1:1 + self.channels], mins, out=accumulator[1:1 + self.channels])
+            np.fmax(accumulator[1 + self.channels:], maxs, out=accumulator[1 + self.channels:])
+        self.counts[level] += 1
+        if self.counts[level] == (self.bucket_sizes[0] if level == 0 else self.factor):
+            self.counts[level] = 0
+            if self.levels[level].append(accumulator):
+                self.keep_budget()
+            if level + 1 < len(self.levels):
+                self.add_to_level(level + 1, accumulator[0], accumulator[1:1 + self.channels],
+                                  accumulator[1 + self.channels:])
+
+    def keep_budget(self):
+        for store in [self.samples] + self.levels:
+            while self.get_memory_bytes() > self.memory_budget:
+                if not store.spill_oldest():
+                    break
+
+    def get_level(self, samples_number: int, max_points: int) -> typing.Optional[int]:
+        """The finest level with at most max_points values in samples_number samples, None for samples themselves"""
+        if samples_number <= max_points:
+            return None
+        for level, bucket_size in enumerate(self.bucket_sizes):
+            # every bucket gives min and max
+            if 2 * -(-samples_number // bucket_size) <= max_points:
+                return level
+        return len(self.levels) - 1
+
+    def get_tail(self, level: int) -> typing.Optional[np.ndarray]:
+        """Bucket row of samples after the last finished bucket of the level"""
+        tail = None
+        for lower_level in range(level + 1):
+            if self.counts[lower_level] == 0:
+                continue
+            accumulator = self.accumulators[lower_level]
+            if tail is None:
+                tail = accumulator.copy()
+            else:
+                # lower level has later samples
+                tail[0] = accumulator[0]
+                np.fmin(tail[1:1 + self.channels], accumulator[1:1 + self.channels], out=tail[1:1 + self.channels])
+                np.fmax(tail[1 + self.channels:], accumulator[1 + self.channels:], out=tail[1 + self.channels:])
+        return tail
+
+    def get_view(self, time_start: float, time_stop: float, max_points: int = 4000) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Times and (channels, points) values of samples with time in [time_start, time_stop], decimated
+        to about max_points. Min and max of bucket are given at its time one after another.
+        One sample out of the range is added at each side, so the lines reach the borders"""
+        start = max(self.samples.find_time(time_start) - 1, 0)
+        stop = min(self.samples.find_time(time_stop, "right") + 1, len(self.samples))
+        level = self.get_level(stop - start, max_points)
+        if level is None:
+            rows = self.samples.get_rows(start, stop)
+            return rows[:, 0], rows[:, 1:].T
+        bucket_size = self.bucket_sizes[level]
+        rows = self.levels[level].get_rows(start // bucket_size, -(-stop // bucket_size))
+        if stop > len(self.levels[level]) * bucket_size:
+            tail = self.get_tail(level)
+            if tail is not None:
+                rows = np.concatenate((rows, tail[None]))
+        times = np.repeat(rows[:, 0], 2)
+        values = np.stack((rows[:, 1:1 + self.channels], rows[:, 1 + self.channels:]), axis=1).reshape(-1, self.channels)
+        return times, values.T
@@ -0,0 +1,140 @@
+from .program_generator import ProgramGenerator
+from .program_runner import ProgramRunner
+from .setpoint_schedule import SetpointSchedule
+from .tick_scheduler import CatchUpPolicy, ClockOrigin, ScheduleShift, clock_origin
+import threading
+import traceback
+import typing
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NullSignal:
+    """Replaces Qt signal for device runners, which must not notify GUI"""
+
+    def emit(self, *args):
+        pass
+
+
+class MultiDeviceRunner:
+    """Runs programs on several MS devices at once.
+
+    Every device is driven by its own ProgramRunner on its own I/O thread. The clock origin is
+    taken when all devices are leased, so ticks with the same time_next are sent to all devices
+    at the same moment. With stretch policy the schedulers share one shift, so a late device
+    delays the following ticks of all devices. Ticks of all devices are put into one
+    QueuesHolder and differ by MSOneTickClass.device_index. Only the first device emits gas state and running signals,
+    stop_signal is emitted once, when all devices are finished.
+    If one device can't be leased, none of them starts."""
+
+    def __init__(
+        self,
+        program_generators: typing.Sequence[ProgramGenerator],
+        lease_ms_methods: typing.Sequence[typing.Callable],
+        get_sensor_types_list,
+        get_setpoint_converter,
+        solid_mode,
+        multirange,
+        send_gasstate_signal,
+        checkbox_state,
+        queues_holder,
+        stop_signal,
+        running_signal,
+        sensor_number,
+        sensors_critical_values_top,
+        sensors_critical_values_bottom,
+        pipelined=False,
+        catch_up_policy=CatchUpPolicy.COMPRESS,
+        setpoint_schedules: typing.Optional[typing.Sequence[SetpointSchedule]] = None,
+    ):
+        if len(program_generators) == 1:
+            program_generators = tuple(program_generators) * len(lease_ms_methods)
+        if setpoint_schedules is None:
+            setpoint_schedules = (None,) * len(lease_ms_methods)
+        elif len(setpoint_schedules) == 1:
+            setpoint_schedules = tuple(setpoint_schedules) * len(lease_ms_methods)
+        if len(program_generators) != len(lease_ms_methods):
+            raise ValueError("Number of programs is not matching number of devices")
+        self.stopped = True
+        self.stop_signal = stop_signal
+        self.origin: typing.Optional[ClockOrigin] = None
+        self.schedule_shift = ScheduleShift()
+        self.start_barrier = threading.Barrier(len(lease_ms_methods), action=self.set_clock_origin)
+        self.finished_lock = threading.Lock()
+        self.running_devices = 0
+        self.threads: typing.List[threading.Thread] = []
+        self.runners = [
+            ProgramRunner(
+                program_generator,
+                lease_ms_method,
+                get_sensor_types_list,
+                get_setpoint_converter,
+                solid_mode,
+                multirange,
+                send_gasstate_signal if device_index == 0 else NullSignal(),
+                checkbox_state,
+                queues_holder,
+                NullSignal(),
+                running_signal if device_index == 0 else NullSignal(),
+                sensor_number,
+                sensors_critical_values_top,
+                sensors_critical_values_bottom,
+                pipelined=pipelined,
+                device_index=device_index,
+                get_clock_origin=self.get_clock_origin,
+                catch_up_policy=catch_up_policy,
+                setpoint_schedule=setpoint_schedule,
+                schedule_shift=self.schedule_shift,
+            )
+            for device_index, (program_generator, lease_ms_method, setpoint_schedule) in enumerate(
+                zip(program_generators, lease_ms_methods, setpoint_schedules)
+            )
+        ]
+
+    def set_clock_origin(self):
+        self.schedule_shift.reset()
+        self.origin = clock_origin()
+
+    def get_clock_origin(self) -> ClockOrigin:
+        self.start_barrier.wait()
+        return self.origin
+
+    def start(self):
+        self.stopped = False
+        self.start_barrier.reset()
+        self.running_devices = len(self.runners)
+        self.threads = []
+        for runner in self.runners:
+            runner.stopped = False
+            thread = threading.Thread(target=self.run_device, args=(runner,), daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def run_device(self, runner: ProgramRunner):
+        try:
+            runner.cycle()
+        except Exception:
+            logger.error(f"Device {runner.device_index}: {traceback.format_exc()}")
+            # Devices waiting for the common start are released with BrokenBarrierError
+            self.start_barrier.abort()
+        finally:
+            runner.stopped = True
+            with self.finished_lock:
+                self.running_devices -= 1
+                all_finished = self.running_devices == 0
+            if all_finished:
+                self.stopped = True
+                self.stop_signal.emit()
+
+    def stop(self):
+        for runner in self.runners:
+            runner.stop()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def isStopped(self) -> bool:
+        return self.stopped
+
@@ -1,4 +1,5 @@
 import logging
+import time
 import pyqtgraph as pg
 
 from misc import colors_for_lines
@@ -7,12 +8,18 @@ logger = logging.getLogger(__name__)
 
 class OneView:
     def __init__(
-        self, plot_item: pg.PlotItem, logy: bool = False, sensor_number: int = 12
+        self, plot_item: pg.PlotItem, logy: bool = False, sensor_number: int = 12, fast: bool = False
     ):
         self.sensor_number = sensor_number
         self.plot_item = plot_item
-        self.plot_item.setLogMode(y=logy)
+        self.fast = fast
+        if fast and logy:
+            # data is given as log10 already, only the axis shows powers of ten
+            self.plot_item.getAxis("left").setLogMode(True)
+        else:
+            self.plot_item.setLogMode(y=logy)
         self.emphasized_lines = []
+        self.update_time = 0.0
 
         self.legend = pg.LegendItem(
             offset=(-10, 10),
@@ -58,11 +65,24 @@ class OneView:
         self.plot_item.update()
 
     def plot_data(self, xs, ys):
-        for plot_item, line in zip(
-            self.plot_data_items,
-            ys,
-        ):
-            plot_item.setData(x=xs, y=line)
+        start = time.perf_counter()
+        if not self.fast:
+            for plot_item, line in zip(
+                self.plot_data_items,
+                ys,
+            ):
+                plot_item.setData(x=xs, y=line)
+        else:
+            # hidden lines are given the data by the next plot_data after they are shown
+            for plot_item, line in zip(self.plot_data_items, ys):
+                if plot_item.isVisible():
+                    self.set_line_data(plot_item, xs, line)
+        self.update_time = time.perf_counter() - start
+
+    @staticmethod
+    def set_line_data(plot_item: pg.PlotDataItem, xs, line):
+        # non-finite values break the line, so there is no need to check them beforehand
+        plot_item.setData(x=xs, y=line, connect="finite", skipFiniteCheck=True)
 
     def set_visible_lines_by_flags(self, flags):
         for flag, plot_line in zip(flags, self.plot_data_items):
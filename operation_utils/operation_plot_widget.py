@@ -3,33 +3,61 @@ from PySide2 import QtCore
 import numpy as np
 from misc import colors_for_lines
 import threading
+import time
+import typing
 import logging
 
+from operation_utils import latency
+from operation_utils.live_history import LiveHistory
 from operation_utils.one_view import OneView
+from operation_utils.redraw_throttle import RedrawThrottle
+from operation_utils.ring_buffer import RingBuffer
 
 logger = logging.getLogger(__name__)
 
 
 class OperationalPlotWidget(pg.GraphicsLayoutWidget):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, number_of_dots: int = 1200, history_budget: int = 256 * 2 ** 20,
+                 fast: bool = False, latency_recorder: typing.Optional[latency.LatencyRecorder] = None, **kwargs):
         super().__init__(*args, **kwargs)
         self.sensor_number = 12
-        self.number_of_dots = 1200
-
-        self.heater_resistances = np.empty(shape=(self.sensor_number, self.number_of_dots))
-        self.sensor_resistances = np.empty(shape=(self.sensor_number, self.number_of_dots))
-        self.times = np.empty(shape=(self.number_of_dots,))
-        self.drawing_index = 0
+        self.number_of_dots = number_of_dots
+        self.history_budget = history_budget
+        # fast mode keeps log10 of sensor resistances in the buffer and the history, so it is taken
+        # once per tick instead of on every redraw, and only visible lines are updated
+        self.fast = fast
+        # redraws are throttled by the time of the last setData and paint to keep GUI responsive
+        self.throttle = RedrawThrottle()
+        # stamps of held ticks wait for their redraw, then for the paint
+        self.latency_recorder = latency_recorder
+        self.held_stamps = []
+        self.plotted_stamps = []
+
+        # time, sensor resistances and heater resistances of a tick are one sample of the buffer
+        self.buffer = RingBuffer(self.number_of_dots, 1 + 2 * self.sensor_number)
+        self.sample = np.empty(1 + 2 * self.sensor_number)
+        self.new_samples = 0
+        # the whole run for scrolling back, channels are sensor resistances and heater resistances
+        self.history = LiveHistory(2 * self.sensor_number, self.history_budget)
         
         self.sensor_resistances_one_view = OneView(self.addPlot(row=0, col=0),
                                        logy=True,
-                                       sensor_number=self.sensor_number)
+                                       sensor_number=self.sensor_number,
+                                       fast=self.fast)
         self.heater_resistances_one_view = OneView(self.addPlot(row=0, col=1),
                                        logy=False,
-                                       sensor_number=self.sensor_number)
+                                       sensor_number=self.sensor_number,
+                                       fast=self.fast)
 
         self.lock = threading.Lock()
 
+        # scrolled view is redrawn once after series of range changes
+        self.history_timer = QtCore.QTimer(self)
+        self.history_timer.setSingleShot(True)
+        self.history_timer.setInterval(30)
+        self.history_timer.timeout.connect(self.plot_scrolled)
+        for one_view in (self.sensor_resistances_one_view, self.heater_resistances_one_view):
+            one_view.plot_item.getViewBox().sigXRangeChanged.connect(self.history_timer.start)
 
     def set_sensor_number(self, sensor_number: int):
         self.sensor_number = sensor_number
@@ -37,49 +65,120 @@ class OperationalPlotWidget(pg.GraphicsLayoutWidget):
         self.heater_resistances_one_view.set_sensor_number(sensor_number)
         self.clear_plot()
 
+    def set_number_of_dots(self, number_of_dots: int):
+        self.number_of_dots = number_of_dots
+        self.clear_plot()
+
     def clear_plot(self):
-        self.drawing_index = 0
-        self.heater_resistances = np.empty(shape=(self.sensor_number, self.number_of_dots))
-        self.sensor_resistances = np.empty(shape=(self.sensor_number, self.number_of_dots))
-        self.times = np.empty(shape=(self.number_of_dots,))
+        with self.lock:
+            self.buffer = RingBuffer(self.number_of_dots, 1 + 2 * self.sensor_number)
+            self.sample = np.empty(1 + 2 * self.sensor_number)
+            self.new_samples = 0
+            self.held_stamps = []
+            self.plotted_stamps = []
+            self.history.close()
+            self.history = LiveHistory(2 * self.sensor_number, self.history_budget)
         self.sensor_resistances_one_view.clear()
         self.heater_resistances_one_view.clear()
 
     @QtCore.Slot(tuple)
     def hold_answer(self, answer):
         with self.lock:
-            sensor_resistances, heater_resistances, time_next = answer
-            logger.debug(f"Start add dots {time_next}")
-
-            if self.drawing_index == self.number_of_dots:
-                self.heater_resistances[:, :-1] = self.heater_resistances[:, 1:]
-                self.sensor_resistances[:, :-1] = self.sensor_resistances[:, 1:]
-                self.times[:-1] = self.times[1:]
-                self.heater_resistances[:, self.number_of_dots - 1] = heater_resistances
-                self.sensor_resistances[:, self.number_of_dots - 1] = sensor_resistances
-                self.times[self.number_of_dots - 1] = time_next
+            sensor_resistances, heater_resistances, time_next, stamps = answer
+            if stamps is not None and self.latency_recorder is not None:
+                latency.mark(stamps, latency.HELD)
+                self.held_stamps.append(stamps)
+            self.sample[0] = time_next
+            if self.fast:
+                # non-positive resistances give non-finite values, they aren't connected
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    np.log10(sensor_resistances, out=self.sample[1:1 + self.sensor_number])
             else:
-                self.heater_resistances[:, self.drawing_index] = heater_resistances
-                self.sensor_resistances[:, self.drawing_index] = sensor_resistances
-                self.times[self.drawing_index] = time_next
-
-            if self.drawing_index < self.number_of_dots:
-                self.drawing_index += 1
-            logger.debug(f"End adding dots {time_next}")
-
-    def plot_answer(self):
-        logger.debug(f"Try plotting data, drawing_index = {self.drawing_index}")
+                self.sample[1:1 + self.sensor_number] = sensor_resistances
+            self.sample[1 + self.sensor_number:] = heater_resistances
+            self.buffer.append(self.sample)
+            self.history.append(time_next, self.sample[1:])
+            self.new_samples += 1
+
+    def get_views(self):
+        """OneViews with their channels in the history"""
+        return ((self.sensor_resistances_one_view, slice(0, self.sensor_number)),
+                (self.heater_resistances_one_view, slice(self.sensor_number, 2 * self.sensor_number)))
+
+    @staticmethod
+    def is_following(one_view: OneView) -> bool:
+        """View follows new ticks until the user zooms or pans it, auto range brings it back"""
+        return bool(one_view.plot_item.getViewBox().autoRangeEnabled()[0])
+
+    def plot_history(self, one_view: OneView, channels: slice):
+        view_box = one_view.plot_item.getViewBox()
+        time_start, time_stop = view_box.viewRange()[0]
+        times, values = self.history.get_view(time_start, time_stop, 2 * max(int(view_box.width()), 100))
+        one_view.plot_data(times, values[channels])
+
+    def plot_scrolled(self):
         with self.lock:
-            logger.debug(f"Plotting data, drawing_index = {self.drawing_index}")
-            self.sensor_resistances_one_view.plot_data(self.times[: self.drawing_index],
-                                                       self.sensor_resistances[:, : self.drawing_index])
-            self.heater_resistances_one_view.plot_data(self.times[: self.drawing_index],
-                                                       self.heater_resistances[:, : self.drawing_index])
-            logger.debug(f"End plotting data, drawing_index = {self.drawing_index}")
+            for one_view, channels in self.get_views():
+                if not self.is_following(one_view):
+                    self.plot_history(one_view, channels)
+
+    @property
+    def frame_time(self) -> float:
+        """Seconds of the last redraw: data update and painting"""
+        return self.throttle.frame_time
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        result = super().paintEvent(event)
+        self.throttle.paint_time = time.perf_counter() - start
+        if self.plotted_stamps:
+            now = time.perf_counter_ns()
+            for stamps in self.plotted_stamps:
+                latency.mark(stamps, latency.PAINTED, now)
+            self.latency_recorder.record_many(self.plotted_stamps)
+            self.plotted_stamps = []
+        return result
+
+    def plot_answer(self, force: bool = False):
+        with self.lock:
+            # nothing came since the last plotting
+            if self.new_samples == 0:
+                return
+            if not self.throttle.is_due(force):
+                # the last redraw took long, the held answers are plotted next time
+                return
+            self.redraw()
+
+    def redraw(self):
+        """Plots the buffer or the history of the views, must be called under the lock"""
+        self.new_samples = 0
+        # setData keeps views of the buffer, every redraw gives all lines the current view
+        view = self.buffer.get_view()
+        logger.debug(f"Plotting data, {view.shape[1]} dots")
+        for one_view, channels in self.get_views():
+            if self.is_following(one_view):
+                one_view.plot_data(view[0], view[1 + channels.start:1 + channels.stop])
+            else:
+                self.plot_history(one_view, channels)
+        self.throttle.update_time = sum(one_view.update_time for one_view, _ in self.get_views())
+        if self.held_stamps:
+            # ticks of the previous redraw which weren't painted are recorded without the paint
+            if self.plotted_stamps:
+                self.latency_recorder.record_many(self.plotted_stamps)
+            now = time.perf_counter_ns()
+            for stamps in self.held_stamps:
+                latency.mark(stamps, latency.PLOTTED, now)
+            self.plotted_stamps = self.held_stamps
+            self.held_stamps = []
 
     def set_visible_lines_by_flags(self, flags):
         self.sensor_resistances_one_view.set_visible_lines_by_flags(flags)
         self.heater_resistances_one_view.set_visible_lines_by_flags(flags)
+        if self.fast:
+            # hidden lines weren't updated, shown ones get the current data at once
+            with self.lock:
+                if len(self.buffer):
+                    self.redraw()
 
     def set_all_lines_visible(self):
         flags = (True, ) * 12
@@ -0,0 +1,87 @@
+from .program_generator import COMPILED_PROGRAM_VERSION, PROGRAM_DTYPE, ProgramGenerator
+import hashlib
+import os
+import pathlib
+import tempfile
+import typing
+import numpy as np
+import yaml
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProgramCache:
+    """Stores compiled program timelines as .npy files and memory-maps them on load.
+
+    Files are named by sha256 of the program text and COMPILED_PROGRAM_VERSION. Modification
+    time of the file is its last use, the least recently used files are deleted when cache
+    size exceeds size_budget bytes."""
+
+    PREFIX = "program_"
+
+    def __init__(self, folder: typing.Union[str, pathlib.Path], size_budget: int = 512 * 2 ** 20):
+        self.folder = pathlib.Path(folder)
+        self.size_budget = size_budget
+
+    def get_path(self, program_text: str) -> pathlib.Path:
+        key = hashlib.sha256(f"{COMPILED_PROGRAM_VERSION}\n{program_text}".encode("utf-8")).hexdigest()
+        return self.folder / f"{self.PREFIX}{key}.npy"
+
+    def get_program_generator(self, program_text: str) -> ProgramGenerator:
+        generator = ProgramGenerator(yaml.load(program_text, yaml.Loader))
+        path = self.get_path(program_text)
+        timeline = self.load(path)
+        if timeline is None:
+            self.store(path, generator.compile().timeline)
+            timeline = self.load(path)
+        if timeline is not None:
+            generator.set_compiled_timeline(timeline)
+        return generator
+
+    def load(self, path: pathlib.Path) -> typing.Optional[np.ndarray]:
+        try:
+            timeline = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError):
+            logger.warning(f"Broken program cache file {path} is ignored")
+            return None
+        if timeline.dtype != PROGRAM_DTYPE or timeline.ndim != 1:
+            logger.warning(f"Program cache file {path} has unexpected format")
+            return None
+        os.utime(path)
+        return timeline
+
+    def store(self, path: pathlib.Path, timeline: np.ndarray):
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            # Written to temporary file first, so other process never maps incomplete file
+            with tempfile.NamedTemporaryFile(dir=self.folder, suffix=".tmp", delete=False) as fd:
+                np.save(fd, timeline)
+            os.replace(fd.name, path)
+        except OSError:
+            logger.warning(f"Compiled program can't be cached to {path}")
+            return
+        self.evict(keep=path)
+
+    def evict(self, keep: typing.Optional[pathlib.Path] = None):
+        files = []
+        for path in self.folder.glob(f"{self.PREFIX}*.npy"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.size_budget:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                # File mapped by running program can't be deleted on Windows
+                continue
+            total_size -= size
@@ -12,40 +12,117 @@ logger = logging.getLogger(__name__)
 class ProgramGeneratorException(Exception):
     pass
 
-class ProgramGenerator:
 
-    stages_counter = 0
+# Increase when compiled timeline of the same program changes, cached timelines become stale
+COMPILED_PROGRAM_VERSION = 1
+
+PROGRAM_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("temperatures", "<f8", (12,)),
+    ("gas_state", "<i4"),
+    ("stage_num", "<i4"),
+    ("stage_type", "<i4"),
+])
+
+
+class CompiledProgram:
+    """Program timeline, one PROGRAM_DTYPE record per tick.
+
+    Indexing with int gives the same (time_next, (temperatures, gas_state, stage_num, stage_type))
+    tuple as ProgramGenerator.parse_program_to_queue, slicing gives CompiledProgram."""
+
+    ITERATION_CHUNK = 4096
+
+    def __init__(self, timeline: np.ndarray, step: float):
+        self.timeline = timeline
+        self.step = step
+
+    def __len__(self):
+        return self.timeline.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CompiledProgram(self.timeline[index], self.step)
+        tick = self.timeline[index]
+        return tick["time"].item(), (tuple(tick["temperatures"].tolist()), tick["gas_state"].item(),
+                                     tick["stage_num"].item(), tick["stage_type"].item())
+
+    def __iter__(self):
+        # Records are converted to python objects by chunks, it's much cheaper than per tick
+        for start in range(0, len(self), self.ITERATION_CHUNK):
+            chunk = self.timeline[start:start + self.ITERATION_CHUNK]
+            yield from zip(
+                chunk["time"].tolist(),
+                zip(map(tuple, chunk["temperatures"].tolist()), chunk["gas_state"].tolist(),
+                    chunk["stage_num"].tolist(), chunk["stage_type"].tolist()),
+            )
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.timeline["time"]
+
+    @property
+    def temperatures(self) -> np.ndarray:
+        return self.timeline["temperatures"]
+
+    @property
+    def gas_states(self) -> np.ndarray:
+        return self.timeline["gas_state"]
+
+    @property
+    def stage_nums(self) -> np.ndarray:
+        return self.timeline["stage_num"]
+
+    @property
+    def stage_types(self) -> np.ndarray:
+        return self.timeline["stage_type"]
+
+    @property
+    def full_time(self) -> float:
+        return len(self) * self.step
+
+
+class ProgramGenerator:
 
     def __init__(self, program):
         self.program = munch.munchify(program)
         settings = self.program.settings
         settings.step = 1 / settings.frequency
+        self._compiled = None
+
+    def compile(self) -> CompiledProgram:
+        """Builds the whole program timeline with numpy, stage by stage. Result is memoized."""
+        if self._compiled is None:
+            settings = self.program.settings
+            stage_counter = itertools.count()
+            blocks = [block for stage in self.program.program
+                      for block in ProgramGenerator._compile_stage(stage, settings, stage_counter)]
+            timeline = np.concatenate(blocks) if blocks else np.empty(0, dtype=PROGRAM_DTYPE)
+            # Same sequential summation as itertools.count in parse_program_to_queue
+            steps = np.full(timeline.shape[0], settings.step)
+            steps[:1] = 0
+            timeline["time"] = np.add.accumulate(steps)
+            self._compiled = CompiledProgram(timeline, settings.step)
+        return self._compiled
+
+    def set_compiled_timeline(self, timeline: np.ndarray):
+        """Uses already compiled timeline, e.g. memory-mapped from ProgramCache"""
+        self._compiled = CompiledProgram(timeline, self.program.settings.step)
 
     def parse_program_to_queue(self):
-        self.reset_stage_number()
         settings = self.program.settings
         program = self.program.program
-        full = zip(itertools.count(0, settings.step), ProgramGenerator._parse_all_program(program, settings))
+        # Every parse numbers stages on its own, so several programs can be iterated from different threads
+        stage_counter = itertools.count()
+        full = zip(itertools.count(0, settings.step), ProgramGenerator._parse_all_program(program, settings, stage_counter))
         return full
 
     def calculate_full_time(self):
-        self.reset_stage_number()
-        return ProgramGenerator._calculate_full_time(self.program.program)
+        return self.compile().full_time
 
     def calculate_min_and_max_temperatures(self):
-        self.reset_stage_number()
         return ProgramGenerator._calculate_min_and_max_temperatures(self.program.program)
 
-    @classmethod
-    def get_stage_number(cls):
-        stage_num = cls.stages_counter
-        cls.stages_counter += 1
-        return stage_num
-
-    @classmethod
-    def reset_stage_number(cls):
-        cls.stages_counter = 0
-
     @staticmethod
     def convert_temperatures(temperatures) -> tuple:
         if isinstance(temperatures, list):
@@ -92,21 +169,21 @@ class ProgramGenerator:
                         yield gas_stage.state, None, None
 
     @staticmethod
-    def _parse_all_program(program, settings):
+    def _parse_all_program(program, settings, stage_counter):
         for stage in program:
             if stage.type == "simple":
-                yield from ProgramGenerator._process_simple(stage, settings)
+                yield from ProgramGenerator._process_simple(stage, settings, stage_counter)
             elif stage.type == "stepwise":
-                yield from ProgramGenerator._process_stepwise(stage, settings)
+                yield from ProgramGenerator._process_stepwise(stage, settings, stage_counter)
             elif stage.type == "cyclic":
-                yield from ProgramGenerator._process_cyclic(stage, settings)
+                yield from ProgramGenerator._process_cyclic(stage, settings, stage_counter)
             else:
                 raise ProgramGeneratorException
 
 
     @staticmethod
-    def _process_simple(stage, settings):
-        stage_num = ProgramGenerator.get_stage_number()
+    def _process_simple(stage, settings, stage_counter):
+        stage_num = next(stage_counter)
         step = settings.step
         gas_state = stage.gas_state
         temperatures = ProgramGenerator.convert_temperatures(stage.temperature)
@@ -114,54 +191,79 @@ class ProgramGenerator:
             yield temperatures, gas_state, stage_num, 0
 
     @staticmethod
-    def _process_stepwise(stage, settings):
+    def _process_stepwise(stage, settings, stage_counter):
         step = settings.step
         temperature_step = -stage.temperature_step if stage.temperature_start > stage.temperature_stop else stage.temperature_step
         for temperature in np.arange(stage.temperature_start, stage.temperature_stop, temperature_step):
             converted_temperatures = ProgramGenerator.convert_temperatures(temperature)
             for cycle in range(stage.cycles):
                 for gas_state in stage.gas_states:
-                    stage_num = ProgramGenerator.get_stage_number()
+                    stage_num = next(stage_counter)
                     for _ in np.arange(0, stage.time, step):
                         yield converted_temperatures, gas_state, stage_num, 1
 
     @staticmethod
-    def _process_cyclic(stage, settings):
+    def _process_cyclic(stage, settings, stage_counter):
         step = settings.step
         temperatures = stage.temperatures
         func = interp1d(temperatures.time, temperatures.temperature)
         max_time = max(temperatures.time)
         for (gas_state, variable, variable_value), _ in zip(itertools.cycle(ProgramGenerator.process_gas_states_cycle(stage.gas_states)), range(stage.repeat)):
             gas_get_func = ProgramGenerator.process_gas_state(gas_state, max_time, variable, variable_value)
-            stage_num = ProgramGenerator.get_stage_number()
+            stage_num = next(stage_counter)
             for inter_time in np.arange(0, max_time, step):
                 yield ProgramGenerator.convert_temperatures(float(func(inter_time))), int(gas_get_func(inter_time)), stage_num, 2
 
     @staticmethod
-    def _calculate_full_time(program):
-        full_time = 0
-        for stage in program:
-            if stage.type == "simple":
-                full_time += ProgramGenerator._calculate_simple_time(stage)
-            elif stage.type == "stepwise":
-                full_time += ProgramGenerator._calculate_stepwise_time(stage)
-            elif stage.type == "cyclic":
-                full_time += ProgramGenerator._calculate_cyclic_time(stage)
-            else:
-                raise ProgramGeneratorException
-        return full_time
+    def _compile_stage(stage, settings, stage_counter):
+        if stage.type == "simple":
+            return ProgramGenerator._compile_simple(stage, settings, stage_counter)
+        elif stage.type == "stepwise":
+            return ProgramGenerator._compile_stepwise(stage, settings, stage_counter)
+        elif stage.type == "cyclic":
+            return ProgramGenerator._compile_cyclic(stage, settings, stage_counter)
+        else:
+            raise ProgramGeneratorException
 
     @staticmethod
-    def _calculate_simple_time(stage):
-        return stage.time
+    def _compile_block(length, temperatures, gas_state, stage_num, stage_type) -> np.ndarray:
+        block = np.empty(length, dtype=PROGRAM_DTYPE)
+        block["temperatures"] = temperatures
+        block["gas_state"] = gas_state
+        block["stage_num"] = stage_num
+        block["stage_type"] = stage_type
+        return block
 
     @staticmethod
-    def _calculate_stepwise_time(stage):
-        return np.arange(stage.temperature_start, stage.temperature_stop, stage.temperature_step).shape[0] * stage.cycles * len(stage.gas_states)
+    def _compile_simple(stage, settings, stage_counter):
+        length = np.arange(0, stage.time, settings.step).shape[0]
+        temperatures = ProgramGenerator.convert_temperatures(stage.temperature)
+        return [ProgramGenerator._compile_block(length, temperatures, stage.gas_state, next(stage_counter), 0)]
 
     @staticmethod
-    def _calculate_cyclic_time(stage):
-        return stage.repeat * max(stage.temperatures.time)
+    def _compile_stepwise(stage, settings, stage_counter):
+        length = np.arange(0, stage.time, settings.step).shape[0]
+        temperature_step = -stage.temperature_step if stage.temperature_start > stage.temperature_stop else stage.temperature_step
+        blocks = []
+        for temperature in np.arange(stage.temperature_start, stage.temperature_stop, temperature_step):
+            for cycle in range(stage.cycles):
+                for gas_state in stage.gas_states:
+                    blocks.append(ProgramGenerator._compile_block(length, temperature, gas_state, next(stage_counter), 1))
+        return blocks
+
+    @staticmethod
+    def _compile_cyclic(stage, settings, stage_counter):
+        temperatures = stage.temperatures
+        func = interp1d(temperatures.time, temperatures.temperature)
+        max_time = max(temperatures.time)
+        inter_times = np.arange(0, max_time, settings.step)
+        cycle_temperatures = func(inter_times)[:, np.newaxis]
+        blocks = []
+        for (gas_state, variable, variable_value), _ in zip(itertools.cycle(ProgramGenerator.process_gas_states_cycle(stage.gas_states)), range(stage.repeat)):
+            gas_get_func = ProgramGenerator.process_gas_state(gas_state, max_time, variable, variable_value)
+            gas_states = np.asarray(gas_get_func(inter_times)).astype(np.int64)
+            blocks.append(ProgramGenerator._compile_block(inter_times.shape[0], cycle_temperatures, gas_states, next(stage_counter), 2))
+        return blocks
 
     @staticmethod
     def _calculate_min_and_max_temperatures(program) -> Tuple[float, float]:
@@ -1,7 +1,13 @@
 from .program_generator import ProgramGenerator
+from .setpoint_schedule import SetpointSchedule
 from program_dataclasses.operation_classes import MSOneTickClass
 from sensor_system import MS_Uni, MS_ABC
-from time import sleep, time
+from sensor_system_utils.pipeline import PipelinedMS
+from .tick_scheduler import CatchUpPolicy, ScheduleShift, TickScheduler, clock_origin
+from . import latency
+from time import time
+import collections
+import typing
 import threading
 import traceback
 import numpy as np
@@ -13,9 +19,9 @@ class ProgramRunner:
     def __init__(
         self,
         program_generator: ProgramGenerator,
-        get_ms_method,
+        lease_ms_method,
         get_sensor_types_list,
-        get_convert_funcs,
+        get_setpoint_converter,
         solid_mode,
         multirange,
         send_gasstate_signal,
@@ -26,16 +32,22 @@ class ProgramRunner:
         sensor_number,
         sensors_critical_values_top,
         sensors_critical_values_bottom,
+        pipelined=False,
+        device_index=0,
+        get_clock_origin=clock_origin,
+        catch_up_policy=CatchUpPolicy.COMPRESS,
+        setpoint_schedule: typing.Optional[SetpointSchedule] = None,
+        schedule_shift: typing.Optional[ScheduleShift] = None,
     ):
         self.stopped = True
         self.stop_signal = stop_signal
         self.running_signal = running_signal
         self.program_generator = program_generator
-        self.program = self.program_generator.parse_program_to_queue()
-        self.get_ms_method = get_ms_method
+        self.program = enumerate(self.program_generator.compile())
+        self.lease_ms_method = lease_ms_method
         self.get_sensor_types_list = get_sensor_types_list
-        self.convert_funcs = get_convert_funcs("R")
-        self.convert_funcs_2 = get_convert_funcs("V")
+        self.resistance_converter = get_setpoint_converter("R")
+        self.voltage_converter = get_setpoint_converter("V")
         self.solid_mode = solid_mode
         self.multirange: bool = multirange
         self.send_gasstate_signal = send_gasstate_signal
@@ -47,6 +59,15 @@ class ProgramRunner:
         self.sensors_critical_values_top = sensors_critical_values_top
 
         self.need_to_analyze = self.multirange and (self.solid_mode is None)
+        # In pipelined mode frame of the next tick is sent before the answer of the previous one is processed
+        self.pipelined = pipelined
+        self.device_index = device_index
+        # Runners of several devices share the clock origin to keep ticks aligned
+        self.get_clock_origin = get_clock_origin
+        self.scheduler = TickScheduler(self.program_generator.program.settings.step, catch_up_policy,
+                                       shift=schedule_shift)
+        # Setpoints converted before start, used while request type is the same as in the schedule
+        self.setpoint_schedule = setpoint_schedule
 
     def start(self):
         self.stopped = False
@@ -61,10 +82,15 @@ class ProgramRunner:
             self.thread.join()
 
     def cycle(self):
-        ms: MS_Uni = self.get_ms_method()
-        time_0 = time()
-        time_sleep = self.program_generator.program.settings.step / 100
+        with self.lease_ms_method() as ms:
+            self.run_program(ms)
+
+    def run_program(self, ms: MS_Uni):
+        pending_ticks = collections.deque()
         sensor_types_list = self.get_sensor_types_list()
+        # Frames are encoded before the clock starts, so the first ticks are not late
+        frames = self.encode_setpoint_schedule(ms, sensor_types_list)
+        self.scheduler.start(self.get_clock_origin())
         sensor_states = [
             1,
         ] * self.sensor_number
@@ -77,80 +103,128 @@ class ProgramRunner:
         sensors_critical_values_top = self.sensors_critical_values_top
         sensors_critical_values_bottom = self.sensors_critical_values_bottom
 
-        while not self.stopped:
+        def process_answer(us, rs, tick):
+            time_next_plus_t0, time_next, temperatures, gas_state, stage_num, stage_type, converted, stamps = tick
+            latency.mark(stamps, latency.ANSWER)
             try:
-                time_next, (temperatures, gas_state, stage_num, stage_type) = next(
-                    self.program
+                self.send_gasstate_signal.emit(int(gas_state))
+            except:
+                logger.error(traceback.format_exc())
+            finally:
+                latency.mark(stamps, latency.QUEUED)
+                self.queues_holder.put(
+                    MSOneTickClass(
+                        us,
+                        rs,
+                        time_next_plus_t0,
+                        time_next,
+                        temperatures,
+                        gas_state,
+                        stage_num,
+                        stage_type,
+                        # ranges are changed in place by analyze_us, the tick keeps ranges it was measured with
+                        tuple(sensor_states),
+                        converted,
+                        self.device_index,
+                        stamps,
+                    )
+                )
+                self.analyze_us(
+                    device,
+                    us,
+                    sensor_states,
+                    sensor_stab_up_states,
+                    sensor_stab_down_states,
+                    sensors_critical_values_top,
+                    sensors_critical_values_bottom,
                 )
-            except StopIteration:
-                self.stop_signal.emit()
-                self.stopped = True
-            else:
-                self.running_signal.emit()
-                temperatures = temperatures[: self.sensor_number]
-                time_next_plus_t0 = time_0 + time_next
-                while time() < time_next_plus_t0:
-                    sleep(time_sleep)
+
+        # I/O thread of the pipeline is started right before the try block, so it is always closed
+        pipeline = PipelinedMS(ms) if self.pipelined else None
+        device = pipeline if self.pipelined else ms
+        try:
+            while not self.stopped:
                 try:
-                    logger.debug(f"{time()} {time_next_plus_t0} {time_next}")
-                    if self.checkbox_state():
-                        converted = self.convert_to_voltages(temperatures)
-                        us, rs = ms.full_request(
-                            converted,
-                            request_type=MS_ABC.REQUEST_U,
-                            sensor_types_list=sensor_types_list,
-                        )
-                    else:
-                        converted = self.convert_to_resistances(temperatures)
-                        us, rs = ms.full_request(
-                            converted,
-                            request_type=MS_ABC.REQUEST_R,
-                            sensor_types_list=sensor_types_list,
-                        )
-                except MS_ABC.MSException:
+                    index, (time_next, (temperatures, gas_state, stage_num, stage_type)) = next(
+                        self.program
+                    )
+                except StopIteration:
                     self.stop_signal.emit()
-                    self.clear_ms_state(ms)
-                    raise
+                    self.stopped = True
                 else:
+                    self.running_signal.emit()
+                    temperatures = temperatures[: self.sensor_number]
+                    if not self.scheduler.wait(time_next):
+                        continue
+                    time_next_plus_t0 = self.scheduler.planned_time(time_next)
                     try:
-                        self.send_gasstate_signal.emit(int(gas_state))
-                    except:
-                        logger.error(traceback.format_exc())
-                    finally:
-                        self.queues_holder.put(
-                            MSOneTickClass(
-                                us,
-                                rs,
-                                time_next_plus_t0,
-                                time_next,
-                                temperatures,
-                                gas_state,
-                                stage_num,
-                                stage_type,
-                                sensor_states,
-                                converted,
-                            )
-                        )
-                        self.analyze_us(
-                            ms,
-                            us,
-                            sensor_states,
-                            sensor_stab_up_states,
-                            sensor_stab_down_states,
-                            sensors_critical_values_top,
-                            sensors_critical_values_bottom,
-                        )
-        self.clear_ms_state(ms)
+                        logger.debug(f"{time()} {time_next_plus_t0} {time_next}")
+                        request_type = MS_ABC.REQUEST_U if self.checkbox_state() else MS_ABC.REQUEST_R
+                        if frames is not None and request_type == self.setpoint_schedule.request_type:
+                            converted = self.setpoint_schedule.setpoints[index]
+                            frame = frames[index].tobytes()
+                        elif request_type == MS_ABC.REQUEST_U:
+                            converted = self.convert_to_voltages(temperatures)
+                            frame = None
+                        else:
+                            converted = self.convert_to_resistances(temperatures)
+                            frame = None
+                        stamps = latency.new_stamps()
+                        tick = (time_next_plus_t0, time_next, temperatures, gas_state, stage_num, stage_type, converted,
+                                stamps)
+                        if pipeline is None:
+                            if frame is None:
+                                us, rs = ms.full_request(
+                                    converted,
+                                    request_type=request_type,
+                                    sensor_types_list=sensor_types_list,
+                                )
+                            else:
+                                us, rs = ms.full_request_frame(frame)
+                        else:
+                            if frame is None:
+                                seq = pipeline.submit(converted, request_type, sensor_types_list)
+                            else:
+                                seq = pipeline.submit_frame(frame)
+                            pending_ticks.append((seq, tick))
+                            if len(pending_ticks) < 2:
+                                continue
+                            seq, tick = pending_ticks.popleft()
+                            us, rs = pipeline.result(seq)
+                    except MS_ABC.MSException:
+                        self.stop_signal.emit()
+                        raise
+                    else:
+                        process_answer(us, rs, tick)
+            while pending_ticks:
+                seq, tick = pending_ticks.popleft()
+                us, rs = pipeline.result(seq)
+                process_answer(us, rs, tick)
+        finally:
+            logger.info(f"Device {self.device_index} timing: {self.scheduler.get_statistics()}\n"
+                        f"{self.scheduler.histogram.format()}")
+            if pipeline is not None:
+                pipeline.close()
+            self.clear_ms_state(ms)
+
+    def encode_setpoint_schedule(self, ms: MS_Uni, sensor_types_list) -> typing.Optional[np.ndarray]:
+        if self.setpoint_schedule is None:
+            return None
+        try:
+            return self.setpoint_schedule.encode(ms, sensor_types_list)
+        except Exception:
+            logger.warning(f"Setpoint schedule can't be encoded, setpoints are converted on every tick\n"
+                           f"{traceback.format_exc()}")
+            return None
 
     def clear_ms_state(self, ms: MS_Uni):
         ms.clear_state(self.get_sensor_types_list())
-        ms.close()
 
-    def convert_to_resistances(self, temperatures) -> tuple:
-        return tuple(func(t) for t, func in zip(temperatures, self.convert_funcs))
+    def convert_to_resistances(self, temperatures) -> np.ndarray:
+        return self.resistance_converter.convert(temperatures)
 
-    def convert_to_voltages(self, temperatures) -> tuple:
-        return tuple(func(t) for t, func in zip(temperatures, self.convert_funcs_2))
+    def convert_to_voltages(self, temperatures) -> np.ndarray:
+        return self.voltage_converter.convert(temperatures)
 
     def analyze_us(
         self,
@@ -0,0 +1,79 @@
+from queue import Empty, Queue
+import threading
+import traceback
+import typing
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueueConsumer:
+    """Takes items from the queue on its own thread and gives them to process_batch by batches.
+
+    The thread blocks on the queue, so the batch is processed as soon as an item is put, together
+    with everything queued at this moment. on_idle is called when nothing came during idle_timeout.
+    stop() puts a sentinel after already queued items: they are processed, then on_stop is called
+    and the thread ends."""
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        queue: Queue,
+        process_batch: typing.Callable[[list], None],
+        on_idle: typing.Optional[typing.Callable[[], None]] = None,
+        on_stop: typing.Optional[typing.Callable[[], None]] = None,
+        idle_timeout: float = 0.5,
+    ):
+        self.queue = queue
+        self.process_batch = process_batch
+        self.on_idle = on_idle
+        self.on_stop = on_stop
+        self.idle_timeout = idle_timeout
+        self.thread = None
+        self.stopped = True
+
+    def start(self):
+        if self.stopped:
+            self.stopped = False
+            self.thread = threading.Thread(target=self.cycle, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        # Sentinel is put only for the running thread, otherwise it would end the next run at once
+        if not self.stopped:
+            self.stopped = True
+            self.queue.put(self._STOP)
+
+    def join(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    def cycle(self):
+        try:
+            finished = False
+            while not finished:
+                try:
+                    item = self.queue.get(timeout=self.idle_timeout)
+                except Empty:
+                    if self.on_idle is not None:
+                        self.on_idle()
+                    continue
+                batch = []
+                while True:
+                    if item is self._STOP:
+                        finished = True
+                        break
+                    batch.append(item)
+                    try:
+                        item = self.queue.get_nowait()
+                    except Empty:
+                        break
+                if batch:
+                    try:
+                        self.process_batch(batch)
+                    except Exception:
+                        logger.error(traceback.format_exc())
+        finally:
+            if self.on_stop is not None:
+                self.on_stop()
@@ -1,55 +1,84 @@
-from queue import Queue
-import threading
+from queue import Empty, Queue
+from time import perf_counter_ns
+import functools
 import pathlib
 import datetime
-from time import sleep
-import struct
+import typing
+import numpy as np
 from PySide2 import QtCore
 
+from dat_utils.writer import ChunkedDatWriter, DatWriter, FlushPolicy
+from measurement_utils.vectorized_converters import ResistanceToTemperatureConverter, VoltageToResistanceConverter
+from operation_utils import latency
+from operation_utils.queue_consumer import QueueConsumer
+from operation_utils.queues_holder import BoundedQueue, QueuePolicy
+from program_dataclasses.operation_classes import MSOneTickClass
+
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class QueueRunner(QtCore.QObject):
-    hold_result = QtCore.Signal(tuple)
+    """Converts and saves ticks. Converted values are published to plot_queue, which drops
+    the oldest values when plot is behind, and to labels_queue, which keeps only the latest."""
 
     def __init__(
         self,
         parent,
         queue: Queue,
-        converters_func_voltage_to_r,
+        get_voltage_to_resistance_converter: typing.Callable[[], VoltageToResistanceConverter],
         multirange_state_func,
-        converters_func_heater_res_to_heater_temperature,
+        get_heater_resistance_to_heater_temperature_converter: typing.Callable[[], ResistanceToTemperatureConverter],
         save_folder,
+        flush_policy: typing.Optional[FlushPolicy] = None,
+        plot_queue_size: int = 1200,
+        dat_format: int = 1,
+        compression: str = "zlib",
+        chunk_ticks: int = 4096,
+        get_dat_metadata: typing.Optional[typing.Callable[[], dict]] = None,
     ):
         super().__init__(parent)
         self.queue = queue
-        self.thread = None
+        self.consumer: typing.Optional[QueueConsumer] = None
         self.stopped = True
         self.filename = None
         self.save_folder = save_folder
-        self.converter_funcs_dicts = converters_func_voltage_to_r
-        self.converter_funcs_heater_res_to_heater_temp = (
-            converters_func_heater_res_to_heater_temperature
+        self.get_voltage_to_resistance_converter = get_voltage_to_resistance_converter
+        self.get_heater_resistance_to_heater_temperature_converter = (
+            get_heater_resistance_to_heater_temperature_converter
         )
         self.multirange_state_func = multirange_state_func
-        self._meas_values_tuple = None
-        self.meas_tuple_lock = threading.Lock()
-        self.bin_write_struct = None
+        self.flush_policy = flush_policy
+        # .dat v2 is written when dat_format is 2, metadata is taken on start for its header
+        self.dat_format = dat_format
+        self.compression = compression
+        self.chunk_ticks = chunk_ticks
+        self.get_dat_metadata = get_dat_metadata
+        self.dat_metadata = {}
+        self.plot_queue = BoundedQueue(plot_queue_size, QueuePolicy.DROP_OLDEST, "plot")
+        self.labels_queue = BoundedQueue(1, QueuePolicy.LATEST, "labels")
 
     def get_meas_tuple(self):
-        with self.meas_tuple_lock:
-            return self._meas_values_tuple
+        try:
+            return self.labels_queue.get_nowait()
+        except Empty:
+            return None
+
+    def get_plot_answers(self) -> list:
+        answers = []
+        while True:
+            try:
+                answers.append(self.plot_queue.get_nowait())
+            except Empty:
+                return answers
 
-    def set_meas_tuple(self, values):
-        with self.meas_tuple_lock:
-            self._meas_values_tuple = values
+    def get_queues_statistics(self) -> typing.List[dict]:
+        return [self.plot_queue.get_statistics(), self.labels_queue.get_statistics()]
 
     def start(self):
         if self.stopped:
             self.stopped = False
-            self.thread = threading.Thread(target=self.cycle)
             self.filename = (
                 pathlib.Path(self.save_folder)
                 / datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -58,101 +87,113 @@ class QueueRunner(QtCore.QObject):
                 pathlib.Path(self.save_folder)
                 / datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
             ).with_suffix(".dat")
-            self.bin_write_struct = None
-            self.thread.start()
+            if self.get_dat_metadata is not None:
+                self.dat_metadata = self.get_dat_metadata()
+            # Ticks of every device are saved to their own file
+            writers = {0: self.create_writer(0)}
+            self.consumer = QueueConsumer(
+                self.queue,
+                functools.partial(
+                    self.one_cycle_step,
+                    self.multirange_state_func(),
+                    self.get_voltage_to_resistance_converter(),
+                    self.get_heater_resistance_to_heater_temperature_converter(),
+                    writers,
+                ),
+                on_idle=functools.partial(self.poll_writers, writers),
+                on_stop=functools.partial(self.close_writers, writers),
+            )
+            self.consumer.start()
 
     def join(self):
-        if self.thread is not None:
-            self.thread.join()
-
-    def cycle(self):
-        fd_bin = self.binary_filename.open("wb")
-        converter_funcs = self.converter_funcs_dicts()
-        converter_funcs_heater_res_to_heater_temp = (
-            self.converter_funcs_heater_res_to_heater_temp()
-        )
-        multirange = self.multirange_state_func()
-        while not self.stopped:
-            sleep(0.02)
-            if not self.queue.empty():
-                self.one_cycle_step(
-                    multirange,
-                    converter_funcs,
-                    converter_funcs_heater_res_to_heater_temp,
-                    fd_bin,
-                )
-        while not self.queue.empty():
-            self.one_cycle_step(
-                multirange,
-                converter_funcs,
-                converter_funcs_heater_res_to_heater_temp,
-                fd_bin,
+        if self.consumer is not None:
+            self.consumer.join()
+
+    def get_binary_filename(self, device_index: int) -> pathlib.Path:
+        if device_index == 0:
+            return self.binary_filename
+        return self.binary_filename.with_name(f"{self.binary_filename.stem}_dev{device_index}.dat")
+
+    def create_writer(self, device_index: int) -> DatWriter:
+        fd = self.get_binary_filename(device_index).open("wb")
+        if self.dat_format == 2:
+            return ChunkedDatWriter(
+                fd, self.flush_policy, dict(self.dat_metadata, device_index=device_index), self.compression,
+                self.chunk_ticks,
             )
+        return DatWriter(fd, self.flush_policy)
+
+    def poll_writers(self, writers: typing.Dict[int, DatWriter]):
+        for writer in writers.values():
+            writer.poll()
 
-        fd_bin.close()
+    def close_writers(self, writers: typing.Dict[int, DatWriter]):
+        for writer in writers.values():
+            writer.close()
 
     def one_cycle_step(
         self,
         multirange: bool,
-        converter_funcs,
-        converter_funcs_heater_res_to_heater_temp,
-        fd_bin,
+        converter: VoltageToResistanceConverter,
+        heater_converter: ResistanceToTemperatureConverter,
+        writers: typing.Dict[int, DatWriter],
+        ticks_batch: typing.List[MSOneTickClass],
     ):
-        one_tick_data = self.queue.get()
+        """Processes batch of ticks, they are converted and written to files by one batch per device"""
+        now = perf_counter_ns()
+        batches = {}
+        for one_tick_data in ticks_batch:
+            latency.mark(one_tick_data.stamps, latency.CONSUMED, now)
+            batches.setdefault(one_tick_data.device_index, []).append(one_tick_data)
+        for device_index, ticks in batches.items():
+            sensor_resistances = self.process_ticks(ticks, multirange, converter, heater_converter)
+            writer = writers.get(device_index)
+            if writer is None:
+                writer = writers[device_index] = self.create_writer(device_index)
+            writer.write_ticks(ticks, sensor_resistances)
+        self.poll_writers(writers)
+
+    def process_ticks(
+        self,
+        ticks: typing.List[MSOneTickClass],
+        multirange: bool,
+        converter: VoltageToResistanceConverter,
+        heater_converter: ResistanceToTemperatureConverter,
+    ) -> np.ndarray:
+        """Converts ticks of one device, returns sensor resistances with shape (ticks, sensors)"""
+        us = np.array([one_tick_data.us for one_tick_data in ticks], dtype=np.float64)
         if multirange:
-            sensor_resistances = tuple(
-                converter_func_dict[sensor_state](u)
-                for converter_func_dict, u, sensor_state in zip(
-                    converter_funcs, one_tick_data.us, one_tick_data.sensor_states
-                )
-            )
+            sensor_states = np.array([one_tick_data.sensor_states for one_tick_data in ticks])
+            sensor_resistances = converter.convert(us, sensor_states)
         else:
-            sensor_resistances = tuple(
-                converter_func_dict(u)
-                for converter_func_dict, u in zip(
-                    converter_funcs, one_tick_data.us
-                )
-            )
-        heater_temperatures = tuple(
-            convert_heater_res_to_heater_temp(heater_res)
-            for convert_heater_res_to_heater_temp, heater_res in zip(
-                converter_funcs_heater_res_to_heater_temp, one_tick_data.rs
-            )
+            sensor_resistances = converter.convert(us)
+        heater_temperatures = heater_converter.convert(
+            np.array([one_tick_data.rs for one_tick_data in ticks], dtype=np.float64)
         )
         logger.debug(f"Call in cycle")
-        logger.debug(f"{one_tick_data}")
-        self.set_meas_tuple(
-            (
-                one_tick_data.us,
-                one_tick_data.rs,
-                sensor_resistances,
-                one_tick_data.sensor_states,
-                one_tick_data.temperatures,
-                one_tick_data.converted,
-            )
-        )
-        self.hold_result.emit(
-            (sensor_resistances, heater_temperatures, one_tick_data.time_next)
-        )
-        if self.bin_write_struct is None:
-            sensors_number = len(one_tick_data.rs)
-            self.bin_write_struct = struct.Struct(
-                "<f" + sensors_number * 4 * "f" + "BIH" + sensors_number * "B"
-            )
-            fd_bin.write(struct.pack("<B", sensors_number))
-        fd_bin.write(
-            self.bin_write_struct.pack(
-                one_tick_data.time_next,
-                *one_tick_data.us,
-                *one_tick_data.rs,
-                *sensor_resistances,
-                *one_tick_data.temperatures,
-                one_tick_data.gas_state,
-                one_tick_data.stage_num,
-                one_tick_data.stage_type,
-                *one_tick_data.sensor_states,
+        if ticks[0].device_index == 0:
+            now = perf_counter_ns()
+            for one_tick_data, tick_resistances, tick_heater_temperatures in zip(
+                ticks, sensor_resistances, heater_temperatures
+            ):
+                latency.mark(one_tick_data.stamps, latency.CONVERTED, now)
+                self.plot_queue.put(
+                    (tick_resistances, tick_heater_temperatures, one_tick_data.time_next, one_tick_data.stamps)
+                )
+            one_tick_data = ticks[-1]
+            self.labels_queue.put(
+                (
+                    one_tick_data.us,
+                    one_tick_data.rs,
+                    sensor_resistances[-1],
+                    one_tick_data.sensor_states,
+                    one_tick_data.temperatures,
+                    one_tick_data.converted,
+                )
             )
-        )
+        return sensor_resistances
 
     def stop(self):
         self.stopped = True
+        if self.consumer is not None:
+            self.consumer.stop()
@@ -1,22 +1,80 @@
 from queue import Queue
+import enum
 import typing
 import threading
 
 
+class QueuePolicy(enum.Enum):
+    # producer waits for free place, nothing is lost (disk writer)
+    BLOCK = "block"
+    # the oldest item is dropped to free place (plotting)
+    DROP_OLDEST = "drop_oldest"
+    # only the newest item is kept (measurement labels)
+    LATEST = "latest"
+
+
+class BoundedQueue(Queue):
+    """Queue which handles overflow by its policy and counts depth and dropped items"""
+
+    def __init__(self, maxsize: int = 0, policy: QueuePolicy = QueuePolicy.BLOCK, name: str = ""):
+        super().__init__(1 if policy is QueuePolicy.LATEST else maxsize)
+        if policy is QueuePolicy.DROP_OLDEST and maxsize <= 0:
+            raise ValueError("Drop-oldest queue must be bounded")
+        self.policy = policy
+        self.name = name
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item, block=True, timeout=None):
+        if self.policy is QueuePolicy.BLOCK:
+            super().put(item, block, timeout)
+            with self.mutex:
+                self.max_depth = max(self.max_depth, self._qsize())
+            return
+        with self.mutex:
+            if 0 < self.maxsize <= self._qsize():
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.max_depth = max(self.max_depth, self._qsize())
+            self.not_empty.notify()
+
+    def get_statistics(self) -> dict:
+        with self.mutex:
+            return {
+                "name": self.name,
+                "policy": self.policy.value,
+                "depth": self._qsize(),
+                "max_depth": self.max_depth,
+                "dropped": self.dropped,
+            }
+
+
 class QueuesHolder:
+    """Puts every item to all registered queues.
+
+    Queues are kept in a tuple which is replaced on registration, put() iterates over the
+    snapshot without lock, so a blocking queue doesn't block registration of others."""
+
     def __init__(self):
-        self.queues: typing.List[Queue] = []
+        self.queues: typing.Tuple[BoundedQueue, ...] = ()
         self.queues_access_lock = threading.Lock()
 
-    def add_new_queue(self) -> Queue:
-        new_queue = Queue()
-        self.queues.append(new_queue)
+    def add_new_queue(self, maxsize: int = 0, policy: QueuePolicy = QueuePolicy.BLOCK, name: str = "") -> BoundedQueue:
+        new_queue = BoundedQueue(maxsize, policy, name)
+        with self.queues_access_lock:
+            self.queues = self.queues + (new_queue,)
         return new_queue
 
     def delete_queue(self, queue: Queue):
-        self.queues.remove(queue)
+        with self.queues_access_lock:
+            self.queues = tuple(registered for registered in self.queues if registered is not queue)
 
     def put(self, something: object):
-        with self.queues_access_lock:
-            for queue in self.queues:
-                queue.put(something)
+        for queue in self.queues:
+            queue.put(something)
+
+    def get_statistics(self) -> typing.List[dict]:
+        return [queue.get_statistics() for queue in self.queues]
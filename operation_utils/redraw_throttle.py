@@ -0,0 +1,27 @@
+import time
+import typing
+
+
+class RedrawThrottle:
+    """Decides if the plot is redrawn now. Redraw is skipped while less than factor frame times
+    passed since the last one, so slow painting doesn't take all time of GUI thread.
+    Frame time is the time of the last data update and paint."""
+
+    def __init__(self, factor: float = 2.0, clock: typing.Callable[[], float] = time.perf_counter):
+        self.factor = factor
+        self.clock = clock
+        self.update_time = 0.0
+        self.paint_time = 0.0
+        self.last_redraw: typing.Optional[float] = None
+
+    @property
+    def frame_time(self) -> float:
+        return self.update_time + self.paint_time
+
+    def is_due(self, force: bool = False) -> bool:
+        """Returns True and starts the redraw interval if the plot must be redrawn"""
+        now = self.clock()
+        if not force and self.last_redraw is not None and now - self.last_redraw < self.factor * self.frame_time:
+            return False
+        self.last_redraw = now
+        return True
@@ -0,0 +1,50 @@
+import typing
+
+import numpy as np
+
+
+class RingBuffer:
+    """The last capacity samples of several channels.
+
+    Every sample is written twice, at head and at head + capacity, so the samples in time order
+    are always one contiguous slice of the storage: append is O(1) for any capacity and
+    get_view() doesn't copy. Storage has shape (channels, 2 * capacity)."""
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("Capacity of ring buffer must be positive")
+        self.capacity = capacity
+        self.data = np.empty((channels, 2 * capacity), dtype=dtype)
+        self.head = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+    def append(self, values: typing.Union[typing.Sequence, np.ndarray]):
+        """values has one value for every channel"""
+        self.data[:, self.head] = values
+        self.data[:, self.head + self.capacity] = values
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, values: np.ndarray):
+        """values has shape (channels, samples), only the last capacity samples are kept"""
+        values = values[:, -self.capacity:]
+        samples = values.shape[1]
+        first = min(samples, self.capacity - self.head)
+        for offset in (0, self.capacity):
+            self.data[:, self.head + offset:self.head + offset + first] = values[:, :first]
+            self.data[:, offset:offset + samples - first] = values[:, first:]
+        self.head = (self.head + samples) % self.capacity
+        self.size = min(self.size + samples, self.capacity)
+
+    def get_view(self) -> np.ndarray:
+        """Samples in time order as (channels, len) view, valid until the next append"""
+        if self.size < self.capacity:
+            return self.data[:, :self.size]
+        return self.data[:, self.head:self.head + self.capacity]
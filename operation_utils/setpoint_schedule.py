@@ -0,0 +1,49 @@
+import logging
+import typing
+
+import numpy as np
+
+from sensor_system import MS_Uni
+from .program_generator import CompiledProgram
+
+logger = logging.getLogger(__name__)
+
+
+class SetpointSchedule:
+    """Setpoints for every tick of compiled program, converted before the program is started.
+
+    Request frames are encoded for the leased device by encode(), so the runtime loop
+    only takes the row of the tick and writes it."""
+
+    def __init__(self, request_type: int, setpoints: np.ndarray, chunk_size: int = 65536):
+        self.request_type = request_type
+        self.setpoints = setpoints
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def prepare(
+        cls, compiled: CompiledProgram, converter, request_type: int, sensor_number: int, chunk_size: int = 65536
+    ) -> "SetpointSchedule":
+        """Converts temperatures of all ticks by converter of ProgramRunner, raises ValueError
+        if some temperature can't be converted"""
+        setpoints = np.empty((len(compiled), sensor_number))
+        # Conversion by chunks keeps temporary arrays small for long programs
+        for start in range(0, len(compiled), chunk_size):
+            stop = start + chunk_size
+            setpoints[start:stop] = converter.convert(compiled.temperatures[start:stop, :sensor_number])
+        return cls(request_type, setpoints, chunk_size)
+
+    def __len__(self):
+        return self.setpoints.shape[0]
+
+    def encode(self, ms: MS_Uni, sensor_types_list: typing.Collection) -> np.ndarray:
+        """Request frames of all ticks as (ticks, frame length) array of bytes"""
+        frames = ms.form_requests(self.setpoints[:self.chunk_size], self.request_type, sensor_types_list)
+        if len(self) <= self.chunk_size:
+            return frames
+        first_frames, frames = frames, np.empty((len(self), frames.shape[1]), dtype=np.uint8)
+        frames[:self.chunk_size] = first_frames
+        for start in range(self.chunk_size, len(self), self.chunk_size):
+            stop = start + self.chunk_size
+            frames[start:stop] = ms.form_requests(self.setpoints[start:stop], self.request_type, sensor_types_list)
+        return frames
@@ -0,0 +1,152 @@
+from time import perf_counter_ns, sleep, time
+import bisect
+import enum
+import threading
+import typing
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ClockOrigin(typing.NamedTuple):
+    wall: float
+    monotonic_ns: int
+
+
+def clock_origin() -> ClockOrigin:
+    return ClockOrigin(time(), perf_counter_ns())
+
+
+class CatchUpPolicy(enum.Enum):
+    # missed ticks are sent immediately one after another until the schedule is reached
+    COMPRESS = "compress"
+    # missed ticks are dropped, the schedule is kept
+    SKIP = "skip"
+    # missed tick is sent immediately and the rest of the schedule is shifted by its lateness
+    STRETCH = "stretch"
+
+
+class ScheduleShift:
+    """Shift of the schedule made by stretch policy. Schedulers of devices which keep ticks
+    aligned share one shift, so the late device moves deadlines of all devices"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ns = 0
+
+    def reset(self):
+        with self.lock:
+            self.ns = 0
+
+    def stretch(self, lateness_ns: int) -> int:
+        """Shifts the schedule by at least lateness_ns of the tick counted without the shift,
+        returns the shift"""
+        with self.lock:
+            self.ns = max(self.ns, lateness_ns)
+            return self.ns
+
+
+class LatenessHistogram:
+    """Counts tick lateness in fixed bins, bin i holds values in [edges[i], edges[i + 1])"""
+
+    EDGES_NS = (0, 10_000, 20_000, 50_000, 100_000, 200_000, 500_000, 1_000_000, 2_000_000,
+                5_000_000, 10_000_000, 20_000_000, 50_000_000, 100_000_000, 1_000_000_000)
+
+    def __init__(self):
+        self.counts = [0] * len(self.EDGES_NS)
+        self.total = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def add(self, lateness_ns: int):
+        self.counts[bisect.bisect_right(self.EDGES_NS, lateness_ns) - 1] += 1
+        self.total += 1
+        self.sum_ns += lateness_ns
+        self.max_ns = max(self.max_ns, lateness_ns)
+
+    def get_bins(self) -> typing.List[typing.Tuple[float, float, int]]:
+        """Returns (from, to, count) in seconds, the last bin is open"""
+        edges = [edge / 1e9 for edge in self.EDGES_NS] + [float("inf")]
+        return [(edges[idx], edges[idx + 1], count) for idx, count in enumerate(self.counts)]
+
+    def format(self) -> str:
+        return "\n".join(
+            f"{start * 1e3:9.3f}..{stop * 1e3:9.3f} ms: {count}" for start, stop, count in self.get_bins() if count
+        )
+
+
+class TickScheduler:
+    """Waits for tick deadlines on the monotonic clock.
+
+    Sleeps until spin_ns before the deadline and spins the rest. Tick is missed when it's late
+    by more than tolerance when the wait starts, missed ticks are handled by the catch-up policy.
+    Lateness of every sent tick is collected into the histogram."""
+
+    def __init__(
+        self,
+        step: float,
+        policy: CatchUpPolicy = CatchUpPolicy.COMPRESS,
+        tolerance: typing.Optional[float] = None,
+        spin_ns: int = 2_000_000,
+        clock: typing.Callable[[], int] = perf_counter_ns,
+        sleep_func: typing.Callable[[float], None] = sleep,
+        shift: typing.Optional[ScheduleShift] = None,
+    ):
+        self.policy = policy
+        self.tolerance_ns = int((step / 2 if tolerance is None else tolerance) * 1e9)
+        self.spin_ns = spin_ns
+        self.clock = clock
+        self.sleep = sleep_func
+        self.origin: typing.Optional[ClockOrigin] = None
+        # shared shift is reset by its owner when the common origin is taken
+        self.shared_shift = shift is not None
+        self.shift = ScheduleShift() if shift is None else shift
+        self.histogram = LatenessHistogram()
+        self.missed = 0
+        self.skipped = 0
+
+    def start(self, origin: typing.Optional[ClockOrigin] = None):
+        self.origin = ClockOrigin(time(), self.clock()) if origin is None else origin
+        if not self.shared_shift:
+            self.shift.reset()
+        self.histogram = LatenessHistogram()
+        self.missed = 0
+        self.skipped = 0
+
+    def planned_time(self, time_next: float) -> float:
+        """Wall clock time of the tick, including the shift of stretch policy"""
+        return self.origin.wall + time_next + self.shift.ns / 1e9
+
+    def wait(self, time_next: float) -> bool:
+        """Waits for the tick, returns False if the tick must be skipped"""
+        planned = self.origin.monotonic_ns + round(time_next * 1e9)
+        deadline = planned + self.shift.ns
+        now = self.clock()
+        if now - deadline > self.tolerance_ns:
+            self.missed += 1
+            if self.policy is CatchUpPolicy.SKIP:
+                self.skipped += 1
+                return False
+            if self.policy is CatchUpPolicy.STRETCH:
+                # shift made by another device meanwhile may be larger, then the tick waits for it
+                deadline = planned + self.shift.stretch(now - planned)
+        remaining = deadline - now
+        if remaining > self.spin_ns:
+            self.sleep((remaining - self.spin_ns) / 1e9)
+        now = self.clock()
+        while now < deadline:
+            self.sleep(0)
+            now = self.clock()
+        self.histogram.add(now - deadline)
+        return True
+
+    def get_statistics(self) -> dict:
+        histogram = self.histogram
+        return {
+            "ticks": histogram.total,
+            "missed": self.missed,
+            "skipped": self.skipped,
+            "mean_lateness": histogram.sum_ns / histogram.total / 1e9 if histogram.total else 0.0,
+            "max_lateness": histogram.max_ns / 1e9,
+            "shift": self.shift.ns / 1e9,
+        }
@@ -2,6 +2,15 @@ from PySide2 import QtWidgets, QtCore
 import pyqtgraph as pg
 import numpy as np
 import pandas as pd
+import threading
+import traceback
+import typing
+import logging
+
+from dat_utils.pyramid import MinMaxPyramid
+from dat_utils.reader import open_dat
+
+logger = logging.getLogger(__name__)
 
 colors_for_lines = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22',
                     '#17becf', "#DDDDDD", "#00FF00"]
@@ -15,6 +24,12 @@ class ProgramPlotter(QtWidgets.QWidget):
 
 
 class ExperimentPlotter(QtWidgets.QWidget):
+    # pyramid of the opened file is built on its own thread, these signals bring the result to GUI
+    pyramid_progress_signal = QtCore.Signal(int, int)
+    pyramid_ready_signal = QtCore.Signal(object, object, str)
+    # text file converted from .dat is read whole on the same thread
+    text_ready_signal = QtCore.Signal(object)
+
     def __init__(self, *args, **kwargs):
         super(ExperimentPlotter, self).__init__(*args, f=QtCore.Qt.Window, **kwargs)
         self.setWindowTitle("Experiment plotter")
@@ -25,9 +40,14 @@ class ExperimentPlotter(QtWidgets.QWidget):
         import_groupbox.setTitle("Import")
         import_groupbox_layout = QtWidgets.QHBoxLayout(import_groupbox)
 
-        open_experiment_file_button = QtWidgets.QPushButton("Open experiment")
-        open_experiment_file_button.clicked.connect(self.open_experiment_file)
-        import_groupbox_layout.addWidget(open_experiment_file_button)
+        self.open_experiment_file_button = QtWidgets.QPushButton("Open experiment")
+        self.open_experiment_file_button.clicked.connect(self.open_experiment_file)
+        import_groupbox_layout.addWidget(self.open_experiment_file_button)
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setFormat("Indexing %p%")
+        self.progress_bar.setVisible(False)
+        import_groupbox_layout.addWidget(self.progress_bar)
 
         import_groupbox_layout.addStretch()
         controls_layout.addWidget(import_groupbox)
@@ -41,20 +61,104 @@ class ExperimentPlotter(QtWidgets.QWidget):
         self.legend_item.setParentItem(self.plot_widget.getPlotItem())
         main_layout.addWidget(self.plot_widget)
 
+        self.reader = None
+        self.pyramid = None
+        self.plot_data_items = []
+        # view is redrawn once after series of range changes while zooming or panning
+        self.update_timer = QtCore.QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(30)
+        self.update_timer.timeout.connect(self.update_view)
+        plot_item.getViewBox().sigXRangeChanged.connect(self.update_timer.start)
+        self.pyramid_progress_signal.connect(self.update_progress_bar)
+        self.pyramid_ready_signal.connect(self.show_experiment)
+        self.text_ready_signal.connect(self.show_text_experiment)
+
     def toggle_visibility(self):
         self.setVisible(not self.isVisible())
 
     def open_experiment_file(self):
         filename, filters = QtWidgets.QFileDialog.getOpenFileName(
-            self, " Open experiment file", ".", "Experiment File (*.txt)"
+            self, " Open experiment file", ".", "Experiment File (*.dat *.txt)"
         )
         if not filename:
             return
-        data = pd.read_csv(filename, delimiter="\t", index_col=0, skiprows=1)
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+            self.pyramid = None
+        self.open_experiment_file_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        threading.Thread(target=self.open_reader, args=(filename,), daemon=True).start()
+
+    def open_reader(self, filename: str):
+        """Opens the file and its pyramid, which is built on the first opening of the file only.
+        Text file is read whole, as it was before .dat files were plotted"""
+        reader = None
+        try:
+            if filename.lower().endswith(".txt"):
+                self.text_ready_signal.emit(pd.read_csv(filename, delimiter="\t", index_col=0, skiprows=1))
+                return
+            reader = open_dat(filename)
+            pyramid = MinMaxPyramid.open_cached(filename, reader, progress=self.pyramid_progress_signal.emit)
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            if reader is not None:
+                reader.close()
+            self.pyramid_ready_signal.emit(None, None, f"{type(e).__name__}: {e}")
+        else:
+            self.pyramid_ready_signal.emit(reader, pyramid, "")
+
+    def update_progress_bar(self, done: int, total: int):
+        self.progress_bar.setValue(int(1000 * done / total) if total else 1000)
+
+    def show_experiment(self, reader, pyramid, error: str):
+        self.open_experiment_file_button.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        if reader is None:
+            QtWidgets.QMessageBox.warning(self, "Open experiment", error)
+            return
+        self.reader = reader
+        self.pyramid = pyramid
+        self.create_lines([f"Sensor {i + 1}" for i in range(self.reader.sensors_number)])
+        plot_item = self.plot_widget.getPlotItem()
+        if len(self.reader):
+            plot_item.setXRange(*self.reader.get_time_bounds(), padding=0)
+        plot_item.enableAutoRange(x=False)
+        self.update_view()
+
+    def show_text_experiment(self, data):
+        """All records of text file are plotted at once"""
+        self.open_experiment_file_button.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        columns = [column for column in data.columns if column.startswith("Rs")]
+        if not columns:
+            QtWidgets.QMessageBox.warning(self, "Open experiment", "File has no sensor resistance columns")
+            return
+        # columns of not exported sensors are missing, so names are taken from the header
+        self.create_lines([f"Sensor {column[len('Rs'):]}" for column in columns])
+        for plot_data_item, column in zip(self.plot_data_items, columns):
+            plot_data_item.setData(x=data.index.to_numpy(), y=data[column].to_numpy())
+        self.plot_widget.getPlotItem().enableAutoRange(x=True)
+
+    def create_lines(self, names: typing.Sequence[str]):
         self.legend_item.clear()
         self.plot_widget.getPlotItem().clear()
-        number_of_sensors = len(tuple(col for col in data.columns if col.startswith("State")))
-        for i, (sensor_idx, color) in enumerate(zip(range(number_of_sensors), colors_for_lines)):
-            plot_data_item = self.plot_widget.plot(x=data.index, y=data[f"Rs{sensor_idx}"], pen=pg.mkPen(pg.mkColor(color), width=2))
-            self.legend_item.addItem(plot_data_item, f"Sensor {i + 1}")
+        self.plot_data_items = []
+        for name, color in zip(names, colors_for_lines):
+            plot_data_item = self.plot_widget.plot(pen=pg.mkPen(pg.mkColor(color), width=2))
+            self.plot_data_items.append(plot_data_item)
+            self.legend_item.addItem(plot_data_item, name)
 
+    def update_view(self):
+        """Plots records of the visible time range from the pyramid level matching the plot width"""
+        if self.reader is None:
+            return
+        x_start, x_stop = self.plot_widget.getPlotItem().getViewBox().viewRange()[0]
+        rows = self.reader.get_time_slice(x_start, x_stop)
+        # one record out of the range at each side, so the lines reach the borders
+        rows = slice(max(rows.start - 1, 0), rows.stop + 1)
+        times, values = self.pyramid.get_view(self.reader, rows, 2 * max(self.plot_widget.width(), 100))
+        for i, plot_data_item in enumerate(self.plot_data_items):
+            plot_data_item.setData(x=times, y=values[:, i])
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import typing
 import numpy as np
 
 
@@ -15,4 +16,7 @@ class MSOneTickClass:
     stage_type: int
     sensor_states: tuple
     converted: tuple
+    device_index: int = 0
+    # perf_counter_ns of the tick at points of operation_utils.latency, filled on the way to the screen
+    stamps: typing.Optional[typing.List[int]] = None
 
@@ -6,6 +6,8 @@ from abc import ABC, abstractmethod
 import numpy as np
 import serial
 
+from sensor_system_utils.frame_reader import FrameReader
+
 import logging 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +29,12 @@ class MS_ABC(ABC):
     REQUEST_U = 0
     REQUEST_R = 1
 
+    # Zero bytes between setpoints and END_KEY in U/R frames
+    SEND_PADDING_LENGTH = 0
+
+    # One sensor in answer: heater resistance (2 bytes), sensor voltage (3 bytes), reserved byte
+    ANSWER_SENSOR_DTYPE = np.dtype([("r", "<u2"), ("u", "u1", (3,)), ("reserved", "u1")])
+
     class MSException(Exception):
         pass
 
@@ -43,12 +51,16 @@ class MS_ABC(ABC):
         self.struct = None  # Must be implemented by child
         self.heater_resistance_converter = heater_resistance_converter
         self.reciprocal_heater_resistance_converter = 1 / self.heater_resistance_converter
+        self._answer_buffer = None
+        self._send_buffer = None
+        self.frame_reader = FrameReader(self.ser, self.BEGIN_KEY, self.END_KEY, MS_ABC.MSException)
 
     def set_port(self, port: str):
         self.ser.port = port
 
     def close(self):
         self.ser.close()
+        self.frame_reader.reset()
 
     def open(self):
         try:
@@ -79,6 +91,25 @@ class MS_ABC(ABC):
     def _back_convert_r(self, value: int) -> float:
         return value * self.reciprocal_heater_resistance_converter
 
+    @staticmethod
+    def _convert_us(values: typing.Collection, out: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        lowest = values.min()
+        if lowest < 0:
+            raise Exception("U must be larger than 0")
+        elif lowest != lowest:
+            raise ValueError("U must be a number")
+        return np.multiply(np.minimum(values, 5), 65535 / 5, out=out, casting="unsafe")
+
+    def _convert_rs(self, values: typing.Collection, out: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        if values.min() < 0:
+            raise Exception("R must be larger than 0")
+        codes = values * self.heater_resistance_converter
+        if not codes.max() < 2 ** 16:
+            raise OverflowError("R is too big to convert")
+        return np.copyto(out, codes, casting="unsafe")
+
     def _request_test(self):
         recieved = b""
         while recieved[-2:] != self.END_KEY:
@@ -95,39 +126,47 @@ class MS_ABC(ABC):
         logger.debug(f"recieving values")
         return self.recieve_answer()
 
+    @property
+    def answer_length(self) -> int:
+        return len(self.BEGIN_KEY) + self.sensors_number * self.ANSWER_SENSOR_DTYPE.itemsize + len(self.END_KEY)
+
     def recieve_answer(self) -> typing.Tuple[np.ndarray, np.ndarray]:
         logger.debug("Start recieving")
-        us = np.empty(self.sensors_number, dtype=np.float32)
-        rs = np.empty(self.sensors_number, dtype=np.float32)
-        # recieved = bytes()
-        begin_key_index = 3
-        end_key = 2
-        data_one_sensor_length = 6
-        r_index = 2
-        u_index = 5
-        recieved = self.ser.read(
-            begin_key_index + self.sensors_number * data_one_sensor_length + end_key)
+        recieved = self.frame_reader.read_frame(self.answer_length)
         logger.debug(recieved)
-        if recieved[-end_key:] != self.END_KEY:
-            logger.debug(recieved)
-            while self.ser.read(1):
-                pass
-            raise MS_ABC.MSException("END_KEY is not matching")
-        if recieved[:begin_key_index] != self.BEGIN_KEY:
-            logger.debug(recieved)
-            raise MS_ABC.MSException("BEGIN_KEY is not matching")
-        for i in range(self.sensors_number):
-            start_index = begin_key_index + i * data_one_sensor_length
-            rs[i] = self._back_convert_r(
-                int.from_bytes(recieved[start_index:start_index + r_index],
-                               "little", signed=False))
-            us[i] = self._back_convert_u(
-                int.from_bytes(recieved[start_index + r_index:start_index + u_index],
-                               "little", signed=False))
+        us, rs = self.decode_answer(recieved)
         logger.debug(f"{us}{rs}")
         return us, rs
 
+    def decode_answer(self, recieved: bytes) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Decodes all sensors of an answer frame at once.
+        Keys must be already checked, returns us, rs as float32 arrays."""
+        if self._answer_buffer is None:
+            self._init_answer_views()
+        self._answer_buffer[:len(recieved)] = recieved
+        us = ((self._answer_u_codes & 0xFFFFFF) * (5 / 2 ** 24)).astype(np.float32)
+        rs = (self._answer_r_codes * self.reciprocal_heater_resistance_converter).astype(np.float32)
+        return us, rs
+
+    def _init_answer_views(self):
+        offset = len(self.BEGIN_KEY)
+        stride = self.ANSWER_SENSOR_DTYPE.itemsize
+        self._answer_buffer = bytearray(offset + self.sensors_number * stride + len(self.END_KEY))
+        self._answer_r_codes = np.ndarray((self.sensors_number,), dtype="<u2", buffer=self._answer_buffer,
+                                          offset=offset, strides=(stride,))
+        # 24-bit voltage is read as 32-bit word together with the following byte, which is masked out
+        self._answer_u_codes = np.ndarray((self.sensors_number,), dtype="<u4", buffer=self._answer_buffer,
+                                          offset=offset + self.ANSWER_SENSOR_DTYPE.fields["u"][1],
+                                          strides=(stride,))
+
+    def write_request(self, message) -> int:
+        self.frame_reader.before_request()
+        return self.ser.write(message)
+
     def send_measurement_range(self, values: typing.Union[typing.Iterable, typing.Sized]):
+        self.write_request(self._form_measurement_range_message(values))
+
+    def _form_measurement_range_message(self, values: typing.Union[typing.Iterable, typing.Sized]) -> bytes:
         if len(values) != self.sensors_number:
             raise MS_ABC.MSException("Too few values for setting measurement range")
         sensor_mask = {
@@ -135,21 +174,14 @@ class MS_ABC(ABC):
             2: 0b10,
             3: 0b00
         }
-        self.ser.write(self.BEGIN_KEY)
-        self.ser.write(self.SEND_M)
         result = 0
         for idx, value in enumerate(values):
             result |= (sensor_mask[value] << (idx * 2))
-        self.ser.write(result.to_bytes(int(self.sensors_number / 4),
-                                       "little", signed=False))
-        self.ser.write(self.END_KEY)
+        return self.BEGIN_KEY + self.SEND_M + result.to_bytes(int(self.sensors_number / 4),
+                                                              "little", signed=False) + self.END_KEY
 
     def recieve_measurement_range_answer(self) -> bytes:
-        recieved = self.ser.read(6)
-        if recieved[-2:] != self.END_KEY:
-            raise MS_ABC.MSException("END_KEY in range is not matching")
-        if recieved[:3] != self.BEGIN_KEY:
-            raise MS_ABC.MSException("BEGIN_KEY in range is not matching")
+        recieved = self.frame_reader.read_frame(6)
         if recieved[3:4] != self.SEND_M:
             raise MS_ABC.MSException("SEND_M in range is not matching")
         return recieved
@@ -157,6 +189,52 @@ class MS_ABC(ABC):
     def _form_send_key(self, key: bytes, sensor_types_list: typing.Collection):
         return bytes((functools.reduce(operator.or_, itertools.chain(key, sensor_types_list)), ))
 
+    def _form_message(self, values: typing.Collection, request_type: int, sensor_types_list: typing.Collection) -> bytearray:
+        """Fills reusable frame buffer with setpoints. Returned buffer is overwritten by the next call."""
+        if len(values) != self.sensors_number:
+            raise MS_ABC.MSException(f"Must be iterable of {self.sensors_number} length")
+        if request_type == self.REQUEST_U:
+            send_key, convert_func = self.SEND_U, self._convert_us
+        elif request_type == self.REQUEST_R:
+            send_key, convert_func = self.SEND_R, self._convert_rs
+        else:
+            raise MS_ABC.MSException(f"Wrong request_type arg, with value {request_type}")
+        if self._send_buffer is None:
+            self._init_send_buffer()
+        convert_func(values, self._send_codes)
+        self._send_buffer[len(self.BEGIN_KEY)] = self._form_send_key(send_key, sensor_types_list)[0]
+        return self._send_buffer
+
+    def _form_messages(self, values: np.ndarray, request_type: int, sensor_types_list: typing.Collection) -> np.ndarray:
+        """Encodes frames for every row of setpoints at once, returns (rows, frame length) array of bytes"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != self.sensors_number:
+            raise MS_ABC.MSException(f"Must be rows of {self.sensors_number} length")
+        if request_type == self.REQUEST_U:
+            send_key, convert_func = self.SEND_U, self._convert_us
+        elif request_type == self.REQUEST_R:
+            send_key, convert_func = self.SEND_R, self._convert_rs
+        else:
+            raise MS_ABC.MSException(f"Wrong request_type arg, with value {request_type}")
+        if self._send_buffer is None:
+            self._init_send_buffer()
+        frames = np.empty((values.shape[0], len(self._send_buffer)), dtype=np.uint8)
+        frames[:] = np.frombuffer(self._send_buffer, dtype=np.uint8)
+        frames[:, len(self.BEGIN_KEY)] = self._form_send_key(send_key, sensor_types_list)[0]
+        if not values.size:
+            return frames
+        codes = np.ndarray((values.shape[0], self.sensors_number), dtype="<u2", buffer=frames,
+                           offset=len(self.BEGIN_KEY) + 1, strides=(frames.shape[1], 2))
+        convert_func(values, codes)
+        return frames
+
+    def _init_send_buffer(self):
+        values_offset = len(self.BEGIN_KEY) + 1
+        self._send_buffer = bytearray(values_offset + self.sensors_number * 2 + self.SEND_PADDING_LENGTH + len(self.END_KEY))
+        self._send_buffer[:len(self.BEGIN_KEY)] = self.BEGIN_KEY
+        self._send_buffer[-len(self.END_KEY):] = self.END_KEY
+        self._send_codes = np.ndarray((self.sensors_number,), dtype="<u2", buffer=self._send_buffer, offset=values_offset)
+
 
     # Abstract methods
     # =========================
@@ -180,24 +258,17 @@ class MS_ABC(ABC):
 class MS12(MS_ABC):
     """Класс реализует протокол общения с 12-сенсорным прибором."""
 
+    SEND_PADDING_LENGTH = 8
+
     def __init__(self, port=None, heater_resistance_converter=100):
         super().__init__(port=port, heater_resistance_converter=heater_resistance_converter)
         self.sensors_number = 12
         self.struct = struct.Struct(">" + (self.sensors_number + 1) * "f")
 
     def _send(self, values: typing.Collection, request_type: int, sensor_types_list: typing.Collection) -> int:
-        if len(values) != self.sensors_number:
-            raise MS_ABC.MSException("Must be iterable of 12 length")
-        if request_type == self.REQUEST_U:
-            send_key, convert_func = self.SEND_U, self._convert_u
-        elif request_type == self.REQUEST_R:
-            send_key, convert_func = self.SEND_R, self._convert_r
-        else:
-            raise MS_ABC.MSException(f"Wrong request_type arg, with value {request_type}")
-        send_key = self._form_send_key(send_key, sensor_types_list)
-        message = self.BEGIN_KEY + send_key + functools.reduce(operator.add, (convert_func(number) for number in values)) + bytes(8) + self.END_KEY
-        logger.debug(str(message))
-        return self.ser.write(message)
+        message = self._form_message(values, request_type, sensor_types_list)
+        logger.debug("%s", message)
+        return self.write_request(message)
 
     def _send_test(self):
         send_message = self.BEGIN_KEY + self.SEND_U + bytes(16 * 2) + self.END_KEY
@@ -220,18 +291,9 @@ class MS4(MS_ABC):
         pass
 
     def _send(self, values: typing.Collection, request_type: int, sensor_types_list: typing.Collection) -> int:
-        if len(values) != self.sensors_number:
-            raise MS_ABC.MSException("Must be iterable of 4 length")
-        if request_type == self.REQUEST_U:
-            send_key, convert_func = self.SEND_U, self._convert_u
-        elif request_type == self.REQUEST_R:
-            send_key, convert_func = self.SEND_R, self._convert_r
-        else:
-            raise MS_ABC.MSException(f"Wrong request_type arg, with value {request_type}")
-        send_key = self._form_send_key(send_key, sensor_types_list)
-        message = self.BEGIN_KEY + send_key + functools.reduce(operator.add, (convert_func(number) for number in values)) + self.END_KEY
-        logger.debug(str(message))
-        return self.ser.write(message)
+        message = self._form_message(values, request_type, sensor_types_list)
+        logger.debug("%s", message)
+        return self.write_request(message)
 
     def _send_test(self, *args, **kwargs):
         send_message = self.BEGIN_KEY + self.SEND_U + bytes(4 * 2) + self.END_KEY
@@ -271,6 +333,12 @@ class MSEmulator(MS_ABC):
         pass
 
 class MS_Uni():
+    CSS_SENSORS = {
+        MS_ABC.SEND_CSS_1_4: slice(0, 4),
+        MS_ABC.SEND_CSS_5_8: slice(4, 8),
+        MS_ABC.SEND_CSS_9_12: slice(8, 12),
+    }
+
     def __init__(self, sensor_number, port, heater_resistance_converter):
         self.sensors_number = sensor_number
         if sensor_number == 4:
@@ -285,9 +353,13 @@ class MS_Uni():
         self.ms.recieve_measurement_range_answer()
 
     def full_request(self, values, request_type = MS_ABC.REQUEST_U, sensor_types_list = None) -> typing.Tuple[np.ndarray, np.ndarray]:
-        values = list(values)
         if sensor_types_list is None:
             sensor_types_list = []
+        return self.ms.full_request(self.prepare_values(values, request_type, sensor_types_list), request_type, sensor_types_list)
+
+    def prepare_values(self, values, request_type, sensor_types_list) -> list:
+        """Limits voltages of CSS sensors and cuts values to sensors number"""
+        values = list(values)
         if request_type == MS_ABC.REQUEST_U:
             for sensor_type in sensor_types_list:
                 if sensor_type == MS_ABC.SEND_CSS_1_4:
@@ -299,7 +371,38 @@ class MS_Uni():
                 if sensor_type == MS_ABC.SEND_CSS_9_12:
                     for i in range(8, 12):
                         values[i] = min(4, values[i])
-        return self.ms.full_request(values[:self.sensors_number], request_type, sensor_types_list)
+        return values[:self.sensors_number]
+
+    def prepare_values_array(self, values, request_type, sensor_types_list) -> np.ndarray:
+        """prepare_values for (ticks, sensors) array of setpoints"""
+        values = np.array(values, dtype=np.float64)
+        if request_type == MS_ABC.REQUEST_U:
+            for sensor_type in set(sensor_types_list):
+                css_sensors = self.CSS_SENSORS.get(sensor_type)
+                if css_sensors is not None:
+                    np.minimum(values[:, css_sensors], 4, out=values[:, css_sensors])
+        return values[:, :self.sensors_number]
+
+    def form_requests(self, values, request_type = MS_ABC.REQUEST_U, sensor_types_list = None) -> np.ndarray:
+        """Frames for (ticks, sensors) array of setpoints, every row is the same as form_request gives"""
+        if sensor_types_list is None:
+            sensor_types_list = []
+        return self.ms._form_messages(self.prepare_values_array(values, request_type, sensor_types_list),
+                                      request_type, sensor_types_list)
+
+    def full_request_frame(self, frame: bytes) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Sends already formed request frame, returns us, rs"""
+        self.ms.write_request(frame)
+        return self.ms.recieve_answer()
+
+    def form_request(self, values, request_type = MS_ABC.REQUEST_U, sensor_types_list = None) -> bytes:
+        if sensor_types_list is None:
+            sensor_types_list = []
+        return bytes(self.ms._form_message(self.prepare_values(values, request_type, sensor_types_list),
+                                           request_type, sensor_types_list))
+
+    def form_measurement_range_request(self, values: List[int]) -> bytes:
+        return self.ms._form_measurement_range_message(values[:self.sensors_number])
 
     def clear_state(self, sensor_types_list=None):
         self.full_request([0,] * self.ms.sensors_number, sensor_types_list=sensor_types_list)
@@ -307,3 +410,23 @@ class MS_Uni():
     def close(self):
         self.ms.close()
 
+    def open(self):
+        self.ms.open()
+
+    def is_open(self) -> bool:
+        return self.ms.ser.is_open
+
+    def get_link_counters(self) -> typing.Dict[str, int]:
+        return self.ms.frame_reader.get_counters()
+
+    def is_healthy(self) -> bool:
+        """Port is open and still present, and the device answered the last read"""
+        if not self.is_open() or self.ms.frame_reader.unanswered_reads:
+            return False
+        try:
+            # fails when USB device is unplugged
+            self.ms.ser.in_waiting
+        except (serial.SerialException, OSError):
+            return False
+        return True
+
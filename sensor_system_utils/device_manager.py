@@ -0,0 +1,91 @@
+import contextlib
+import logging
+import threading
+import typing
+
+import serial
+
+from sensor_system import MS_ABC, MS_Uni
+
+logger = logging.getLogger(__name__)
+
+DeviceKey = typing.Tuple[str, int, float]
+
+
+class DeviceUnavailableException(Exception):
+    pass
+
+
+class MSDeviceManager:
+    """Keeps one opened MS_Uni per (port, sensors number, heater resistance converter).
+
+    Device is leased to one user at a time, lease waits lease_timeout for a busy device by default. After a communication error the device is closed
+    and a new one is created on the next lease. Device is checked before it is leased again:
+    its port must be open and present and its last read must have got an answer."""
+
+    def __init__(self, lease_timeout: float = 5.0):
+        self.lease_timeout = lease_timeout
+        self.devices: typing.Dict[DeviceKey, MS_Uni] = {}
+        self.device_locks: typing.Dict[DeviceKey, threading.Lock] = {}
+        self.to_close: typing.Set[DeviceKey] = set()
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def lease(self, port: str, sensor_number: int, heater_resistance_converter: float,
+              timeout: typing.Optional[float] = None) -> typing.Iterator[MS_Uni]:
+        """timeout 0 raises DeviceUnavailableException at once if the device is busy"""
+        key = (port, sensor_number, heater_resistance_converter)
+        with self.lock:
+            device_lock = self.device_locks.setdefault(key, threading.Lock())
+        if not device_lock.acquire(timeout=self.lease_timeout if timeout is None else timeout):
+            raise DeviceUnavailableException(f"Device on port {port} is busy")
+        try:
+            ms = self._get_healthy_device(key)
+            try:
+                yield ms
+            except (MS_ABC.MSException, serial.SerialException, OSError):
+                logger.debug(f"Device on port {port} is dropped after error")
+                self._close_device(key)
+                raise
+        finally:
+            with self.lock:
+                if key in self.to_close:
+                    self.to_close.discard(key)
+                    self._close_device(key)
+            device_lock.release()
+
+    def close_all(self):
+        """Closes devices which are not leased now, the leased ones are closed on release"""
+        with self.lock:
+            for key, device_lock in self.device_locks.items():
+                if key not in self.devices:
+                    continue
+                if device_lock.acquire(blocking=False):
+                    try:
+                        self._close_device(key)
+                    finally:
+                        device_lock.release()
+                else:
+                    self.to_close.add(key)
+
+    def _get_healthy_device(self, key: DeviceKey) -> MS_Uni:
+        ms = self.devices.get(key)
+        if ms is not None and not ms.is_healthy():
+            logger.debug(f"Device on port {key[0]} is dropped, it is closed or didn't answer the last request")
+            self._close_device(key)
+            ms = None
+        if ms is None:
+            port, sensor_number, heater_resistance_converter = key
+            try:
+                ms = MS_Uni(sensor_number, port, heater_resistance_converter)
+            except serial.SerialException as e:
+                raise DeviceUnavailableException(str(e)) from e
+            logger.debug(f"New MS device created on port {port} with {sensor_number} sensors "
+                          f"and converter value: {heater_resistance_converter}")
+            self.devices[key] = ms
+        return ms
+
+    def _close_device(self, key: DeviceKey):
+        ms = self.devices.pop(key, None)
+        if ms is not None:
+            ms.close()
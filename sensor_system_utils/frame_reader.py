@@ -0,0 +1,114 @@
+import logging
+import typing
+
+logger = logging.getLogger(__name__)
+
+
+class FrameReader:
+    """Reads fixed-length frames from serial port through a reusable buffer.
+
+    Garbage before BEGIN_KEY and frames with broken END_KEY are skipped by searching for the
+    next BEGIN_KEY in already received bytes, so one bad byte does not cost a whole request.
+    Partial frames are kept between calls. After an error, and before every request, bytes left
+    in the buffer and in the port are discarded, so a late answer is not taken for the next one."""
+
+    def __init__(self, ser, begin_key: bytes, end_key: bytes,
+                 exception_class: typing.Type[Exception] = Exception, capacity: int = 4096):
+        self.ser = ser
+        self.begin_key = begin_key
+        self.end_key = end_key
+        self.exception_class = exception_class
+        self.buffer = bytearray(capacity)
+        self.start = 0
+        self.end = 0
+        self.resync_count = 0
+        self.dropped_bytes = 0
+        # failed reads since the last received frame, device which stopped answering has them
+        self.unanswered_reads = 0
+
+    def get_counters(self) -> typing.Dict[str, int]:
+        return {"resync_count": self.resync_count, "dropped_bytes": self.dropped_bytes}
+
+    def reset(self):
+        self.start = 0
+        self.end = 0
+
+    def discard(self):
+        """Drops received bytes and everything waiting in the port"""
+        self.dropped_bytes += self.end - self.start + self.ser.in_waiting
+        self.reset()
+        self.ser.reset_input_buffer()
+
+    def before_request(self):
+        """Drops answers which came after their request has failed"""
+        if self.start != self.end or self.ser.in_waiting:
+            self.resync_count += 1
+            self.discard()
+
+    def read_frame(self, length: int) -> bytes:
+        dropped_before = self.dropped_bytes
+        try:
+            frame = self._read_frame(length)
+            self.unanswered_reads = 0
+            return frame
+        except Exception:
+            self.unanswered_reads += 1
+            try:
+                self.discard()
+            except OSError:
+                # port is closed or lost
+                self.reset()
+            raise
+        finally:
+            if self.dropped_bytes != dropped_before:
+                self.resync_count += 1
+                logger.debug(f"Resync, dropped {self.dropped_bytes - dropped_before} bytes")
+
+    def _read_frame(self, length: int) -> bytes:
+        frame_was_broken = False
+        while True:
+            index = self.buffer.find(self.begin_key, self.start, self.end)
+            if index < 0:
+                # Tail can be the beginning of BEGIN_KEY, it is kept
+                self._drop(max(self.start, self.end - len(self.begin_key) + 1) - self.start)
+                needed = length
+            else:
+                self._drop(index - self.start)
+                frame_end = self.start + length
+                if frame_end <= self.end:
+                    if self.buffer[frame_end - len(self.end_key):frame_end] == self.end_key:
+                        frame = bytes(self.buffer[self.start:frame_end])
+                        self.start = frame_end
+                        return frame
+                    # Broken frame or BEGIN_KEY inside data, search for the next BEGIN_KEY
+                    self._drop(1)
+                    frame_was_broken = True
+                    continue
+                needed = frame_end - self.end
+            waiting = self.ser.in_waiting
+            if frame_was_broken and index < 0 and not waiting:
+                raise self.exception_class("END_KEY is not matching")
+            self._receive(max(needed, waiting))
+
+    def _receive(self, size: int):
+        chunk = self.ser.read(size)
+        if not chunk:
+            raise self.exception_class("No answer from device")
+        if self.end + len(chunk) > len(self.buffer):
+            self._compact()
+            if self.end + len(chunk) > len(self.buffer):
+                self.buffer.extend(bytes(self.end + len(chunk) - len(self.buffer)))
+        self.buffer[self.end:self.end + len(chunk)] = chunk
+        self.end += len(chunk)
+
+    def _compact(self):
+        size = self.end - self.start
+        self.buffer[:size] = self.buffer[self.start:self.end]
+        self.start = 0
+        self.end = size
+
+    def _drop(self, size: int):
+        self.start += size
+        self.dropped_bytes += size
+        if self.start == self.end:
+            self.reset()
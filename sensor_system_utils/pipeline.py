@@ -0,0 +1,100 @@
+import logging
+import threading
+import typing
+from queue import Queue
+
+import numpy as np
+
+from sensor_system import MS_ABC, MS_Uni
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinedMS:
+    """Runs requests to MS_Uni device on a dedicated I/O thread.
+
+    submit() returns a sequence number as soon as the frame is queued, result() waits for
+    the answer with this sequence number and decodes it in the calling thread. So the frame
+    for tick N+1 can be sent before the answer of tick N is used.
+    Requests are written and answered strictly in the order of submission."""
+
+    _STOP = object()
+
+    def __init__(self, ms: MS_Uni, max_in_flight: int = 2):
+        self.ms = ms
+        self.requests: Queue = Queue(maxsize=max_in_flight)
+        self.answers: typing.Dict[int, typing.Union[bytes, Exception]] = {}
+        self.answers_condition = threading.Condition()
+        self.not_waited_seqs = set()
+        # errors of not waited requests by their sequence numbers
+        self.not_waited_exceptions: typing.Dict[int, Exception] = {}
+        self.next_seq = 0
+        self.thread = threading.Thread(target=self.cycle, daemon=True)
+        self.thread.start()
+
+    def submit(self, values, request_type=MS_ABC.REQUEST_U, sensor_types_list=None) -> int:
+        return self._submit(self.ms.form_request(values, request_type, sensor_types_list), self.ms.ms.answer_length)
+
+    def submit_frame(self, frame: bytes) -> int:
+        return self._submit(frame, self.ms.ms.answer_length)
+
+    def send_measurement_range(self, values: typing.List[int]):
+        """Queues range switching after already submitted requests. Does not wait for the answer,
+        its error is raised from result() of the first request submitted after it."""
+        seq = self._submit(self.ms.form_measurement_range_request(values), 6)
+        with self.answers_condition:
+            self.not_waited_seqs.add(seq)
+            self._collect_not_waited()
+
+    def result(self, seq: int, timeout: typing.Optional[float] = None) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Answer of the request. Error of range switching queued before the request is raised
+        first, the answer is kept then and is returned by the next call"""
+        with self.answers_condition:
+            if not self.answers_condition.wait_for(lambda: seq in self.answers, timeout):
+                raise MS_ABC.MSException(f"No answer for request {seq}")
+            self._collect_not_waited()
+            earlier = [not_waited_seq for not_waited_seq in self.not_waited_exceptions if not_waited_seq < seq]
+            if earlier:
+                raise self.not_waited_exceptions.pop(min(earlier))
+            answer = self.answers.pop(seq)
+        if isinstance(answer, Exception):
+            raise answer
+        return self.ms.ms.decode_answer(answer)
+
+    def close(self):
+        self.requests.put((None, self._STOP, None))
+        self.thread.join()
+
+    def _submit(self, frame: bytes, answer_length: int) -> int:
+        seq = self.next_seq
+        self.next_seq += 1
+        self.requests.put((seq, frame, answer_length))
+        return seq
+
+    def _collect_not_waited(self):
+        for seq in tuple(self.not_waited_seqs):
+            if seq in self.answers:
+                self.not_waited_seqs.remove(seq)
+                answer = self.answers.pop(seq)
+                if isinstance(answer, Exception):
+                    self.not_waited_exceptions[seq] = answer
+
+    def cycle(self):
+        ms = self.ms.ms
+        while True:
+            seq, frame, answer_length = self.requests.get()
+            if frame is self._STOP:
+                break
+            try:
+                ms.write_request(frame)
+                answer = ms.frame_reader.read_frame(answer_length)
+                if frame[3:4] == ms.SEND_M and answer[3:4] != ms.SEND_M:
+                    raise MS_ABC.MSException("SEND_M in range is not matching")
+            except MS_ABC.MSException as e:
+                answer = e
+            except Exception as e:
+                logger.error(f"Request {seq} failed: {e}")
+                answer = MS_ABC.MSException(str(e))
+            with self.answers_condition:
+                self.answers[seq] = answer
+                self.answers_condition.notify_all()
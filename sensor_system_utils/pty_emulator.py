@@ -0,0 +1,232 @@
+import logging
+import os
+import random
+import select
+import threading
+import time
+import tty
+import typing
+
+import numpy as np
+
+from sensor_system import MS_ABC, MS12
+
+logger = logging.getLogger(__name__)
+
+
+class HeaterSensorModel:
+    """Simple physical model of heaters and sensors of one device.
+
+    Heater resistance grows linearly with temperature, temperature relaxes to the value defined by
+    the heating power (U mode) or by the requested resistance (R mode). Sensor resistance follows
+    activation law and is measured by the bridge with load resistor r4 chosen by measurement range."""
+
+    K = 4.068
+    R4_BY_MODE = {1: 1e4, 2: 1e6, 3: 1e8}
+
+    def __init__(self, sensor_number: int, seed: typing.Optional[int] = None):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.sensor_number = sensor_number
+        self.ambient_temperature = 25.0
+        self.heater_r0 = rng.uniform(12.0, 18.0, sensor_number)
+        self.heater_alpha = np.full(sensor_number, 0.003)
+        self.thermal_resistance = rng.uniform(450.0, 550.0, sensor_number)  # C per W
+        self.time_constant = 0.2
+        self.sensor_r0 = 10 ** rng.uniform(8, 9, sensor_number)  # at ambient temperature
+        self.activation_temperature = 4000.0  # Ea / k, K
+        self.rs_u1 = np.full(sensor_number, 3.2)
+        self.rs_u2 = np.full(sensor_number, 1.6)
+        self.modes = np.full(sensor_number, 3)
+        self.temperatures = np.full(sensor_number, self.ambient_temperature)
+
+    def heater_resistances(self) -> np.ndarray:
+        return self.heater_r0 * (1 + self.heater_alpha * (self.temperatures - self.ambient_temperature))
+
+    def step_voltages(self, voltages: np.ndarray, dt: float):
+        power = voltages ** 2 / self.heater_resistances()
+        self._relax(self.ambient_temperature + self.thermal_resistance * power, dt)
+
+    def step_resistances(self, resistances: np.ndarray, dt: float):
+        target = self.ambient_temperature + (resistances / self.heater_r0 - 1) / self.heater_alpha
+        self._relax(np.maximum(target, self.ambient_temperature), dt)
+
+    def sensor_voltages(self) -> np.ndarray:
+        temperatures_k = self.temperatures + 273.15
+        ambient_k = self.ambient_temperature + 273.15
+        sensor_resistances = self.sensor_r0 * np.exp(
+            self.activation_temperature * (1 / temperatures_k - 1 / ambient_k))
+        sensor_resistances *= self.rng.normal(1, 0.002, self.sensor_number)
+        r4 = np.array([self.R4_BY_MODE[mode] for mode in self.modes])
+        divider = self.rs_u2 + (self.rs_u1 - self.rs_u2) * r4 / (sensor_resistances + r4)
+        return np.clip(2.5 + 2.5 * self.K - self.K * divider, 0, 5)
+
+    def _relax(self, target: np.ndarray, dt: float):
+        self.temperatures += (target - self.temperatures) * (1 - np.exp(-dt / self.time_constant))
+
+
+class MSPtyEmulator:
+    """Emulates MS4/MS12 device on a pseudo-terminal with the real byte protocol.
+
+    MS_Uni opens MSPtyEmulator.port like a real serial port. Answers are delayed by latency
+    plus uniform jitter, part of answers can be corrupted: garbage before the frame (device
+    noise, reader must resync) or broken END_KEY (answer is lost)."""
+
+    SENSOR_MASK_TO_MODE = {0b11: 1, 0b10: 2, 0b00: 3, 0b01: 3}
+
+    def __init__(
+        self,
+        sensor_number: int = 12,
+        heater_resistance_converter: float = 100,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        garbage_probability: float = 0.0,
+        corruption_probability: float = 0.0,
+        seed: typing.Optional[int] = None,
+    ):
+        if sensor_number not in (4, 12):
+            raise ValueError("Only 4 and 12 sensors devices are emulated")
+        self.sensor_number = sensor_number
+        self.heater_resistance_converter = heater_resistance_converter
+        self.latency = latency
+        self.jitter = jitter
+        self.garbage_probability = garbage_probability
+        self.corruption_probability = corruption_probability
+        self.random = random.Random(seed)
+        self.model = HeaterSensorModel(sensor_number, seed)
+        padding = MS12.SEND_PADDING_LENGTH if sensor_number == 12 else 0
+        self.request_length = len(MS_ABC.BEGIN_KEY) + 1 + 2 * sensor_number + padding + len(MS_ABC.END_KEY)
+        self.range_request_length = len(MS_ABC.BEGIN_KEY) + 1 + sensor_number // 4 + len(MS_ABC.END_KEY)
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self.thread = None
+        self.stopped = True
+        self.last_step_time = None
+        self.counters = {"requests": 0, "range_requests": 0, "garbage": 0, "corrupted": 0, "skipped_bytes": 0}
+
+    def start(self) -> str:
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.stopped = False
+        self.last_step_time = time.perf_counter()
+        self.thread = threading.Thread(target=self.cycle, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def __enter__(self) -> "MSPtyEmulator":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def cycle(self):
+        buffer = bytearray()
+        while not self.stopped:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                buffer += os.read(self.master_fd, 4096)
+            except OSError:
+                break
+            while True:
+                answer, consumed = self.process_buffer(buffer)
+                if consumed == 0:
+                    break
+                del buffer[:consumed]
+                if answer is not None:
+                    self.write_answer(answer)
+
+    def process_buffer(self, buffer: bytearray) -> typing.Tuple[typing.Optional[bytes], int]:
+        """Returns answer for the first complete frame in buffer and number of consumed bytes"""
+        index = buffer.find(MS_ABC.BEGIN_KEY)
+        if index < 0:
+            skipped = max(0, len(buffer) - len(MS_ABC.BEGIN_KEY) + 1)
+            self.counters["skipped_bytes"] += skipped
+            return None, skipped
+        key_index = index + len(MS_ABC.BEGIN_KEY)
+        if key_index >= len(buffer):
+            return None, index
+        key = buffer[key_index]
+        length = self.range_request_length if key == MS_ABC.SEND_M[0] else self.request_length
+        if index + length > len(buffer):
+            return None, index
+        frame = bytes(buffer[index:index + length])
+        if frame[-len(MS_ABC.END_KEY):] != MS_ABC.END_KEY:
+            self.counters["skipped_bytes"] += index + 1
+            return None, index + 1
+        self.counters["skipped_bytes"] += index
+        if key == MS_ABC.SEND_M[0]:
+            return self.answer_range(frame), index + length
+        return self.answer_request(key, frame), index + length
+
+    def answer_range(self, frame: bytes) -> bytes:
+        self.counters["range_requests"] += 1
+        mask = int.from_bytes(frame[4:4 + self.sensor_number // 4], "little", signed=False)
+        self.model.modes = np.array(
+            [self.SENSOR_MASK_TO_MODE[(mask >> (idx * 2)) & 0b11] for idx in range(self.sensor_number)])
+        return MS_ABC.BEGIN_KEY + MS_ABC.SEND_M + MS_ABC.END_KEY
+
+    def answer_request(self, key: int, frame: bytes) -> bytes:
+        self.counters["requests"] += 1
+        codes = np.frombuffer(frame, dtype="<u2", count=self.sensor_number, offset=len(MS_ABC.BEGIN_KEY) + 1)
+        now = time.perf_counter()
+        dt, self.last_step_time = now - self.last_step_time, now
+        if key & MS_ABC.SEND_R[0] == MS_ABC.SEND_R[0]:
+            self.model.step_resistances(codes / self.heater_resistance_converter, dt)
+        else:
+            self.model.step_voltages(codes * (5 / 65535), dt)
+        answer = np.zeros(self.sensor_number, dtype=MS_ABC.ANSWER_SENSOR_DTYPE)
+        answer["r"] = np.minimum(self.model.heater_resistances() * self.heater_resistance_converter, 2 ** 16 - 1)
+        u_codes = np.minimum(self.model.sensor_voltages() / 5 * 2 ** 24, 2 ** 24 - 1).astype(np.uint32)
+        answer["u"] = np.stack([u_codes & 0xFF, (u_codes >> 8) & 0xFF, u_codes >> 16], axis=1)
+        return MS_ABC.BEGIN_KEY + answer.tobytes() + MS_ABC.END_KEY
+
+    def write_answer(self, answer: bytes):
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.random.random() < self.garbage_probability:
+            self.counters["garbage"] += 1
+            answer = bytes(self.random.randrange(256) for _ in range(self.random.randint(1, 8))) + answer
+        if self.random.random() < self.corruption_probability:
+            self.counters["corrupted"] += 1
+            answer = answer[:-1] + bytes(((answer[-1] + 1) % 256,))
+        try:
+            os.write(self.master_fd, answer)
+        except OSError:
+            logger.debug("Emulator port is closed")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs MS device emulator on a pseudo-terminal")
+    parser.add_argument("--sensors", type=int, default=12, choices=(4, 12))
+    parser.add_argument("--converter", type=float, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--garbage", type=float, default=0.0)
+    parser.add_argument("--corruption", type=float, default=0.0)
+    args = parser.parse_args()
+    with MSPtyEmulator(args.sensors, args.converter, args.latency, args.jitter, args.garbage,
+                       args.corruption) as emulator:
+        print(f"Emulator is listening on {emulator.port}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from dat_utils.batch_export import BatchExporter
+from dat_utils.text_export import export_text
+from tests.test_one_tick_binary_saving import make_ticks, pack_by_struct
+
+
+class SignalRecorder:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def emit(self, *args):
+        with self.lock:
+            self.calls.append(args)
+
+
+class TestBatchExporter(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.folder = tempfile.TemporaryDirectory()
+        self.sizes = {"a.dat": 100, "b.dat": 2000, "c.dat": 30}
+        for name, size in self.sizes.items():
+            ticks = make_ticks(12, size, rng, stage_length=90)
+            sensor_resistances = [tuple(rng.uniform(1e3, 1e9, 12)) for _ in ticks]
+            with open(os.path.join(self.folder.name, name), "wb") as fd:
+                fd.write(pack_by_struct(ticks, sensor_resistances))
+        # empty file can't be converted
+        open(os.path.join(self.folder.name, "broken.dat"), "wb").close()
+        self.sources = BatchExporter.find_sources(self.folder.name)
+        self.signals = [SignalRecorder() for _ in range(3)]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_folder(self):
+        exporter = BatchExporter(self.sources, (True,) * 12, (True,) * 9, *self.signals, workers=2)
+        exporter.start()
+        exporter.join()
+        progress, file_finished, finished = self.signals
+        self.assertEqual(finished.calls, [()])
+        results = {result.source.name: result for result, in file_finished.calls}
+        self.assertEqual(set(results), {"a.dat", "b.dat", "c.dat", "broken.dat"})
+        self.assertIn("ValueError", results["broken.dat"].error)
+        self.assertIsNone(results["broken.dat"].target)
+        for name, size in self.sizes.items():
+            result = results[name]
+            self.assertIsNone(result.error)
+            self.assertEqual(result.records_number, size)
+            with open(result.target, "rb") as fd:
+                converted = fd.read()
+            expected = os.path.join(self.folder.name, "expected.txt")
+            export_text(result.source, expected)
+            with open(expected, "rb") as fd:
+                self.assertEqual(converted, fd.read())
+        self.assertIn((results["b.dat"].source, 2000, 2000), progress.calls)
+
+    def test_cancel(self):
+        exporter = BatchExporter(self.sources, (True,) * 12, (True,) * 9, *self.signals, workers=2)
+        exporter.cancel()
+        exporter.start()
+        exporter.join()
+        progress, file_finished, finished = self.signals
+        self.assertEqual(finished.calls, [()])
+        results = [result for result, in file_finished.calls]
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result.cancelled or result.error for result in results))
+        self.assertEqual([name for name in os.listdir(self.folder.name) if name.endswith(".txt")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from operation_utils.program_generator import ProgramGenerator
+
+PROGRAM = {
+    "settings": {"frequency": 10},
+    "program": [
+        {"type": "simple", "time": 1.5, "temperature": [300, 350, 400, 450], "gas_state": 1},
+        {"type": "stepwise", "temperature_start": 500, "temperature_stop": 300, "temperature_step": 100,
+         "cycles": 2, "time": 0.7, "gas_states": [0, 3]},
+        {"type": "cyclic", "repeat": 5,
+         "temperatures": {"time": [0, 1, 2.5], "temperature": [200, 450, 200]},
+         "gas_states": [
+             {"state": 1, "number": 1},
+             {"state": {"time": [0.5, 1.0], "substates": [2, 3]}, "number": 1},
+             {"template": ["x", 4, 6], "state": {"time": [0.5], "substates": ["x"]}, "number": 1},
+             {"state": [{"state": 7, "number": 2}], "number": 1},
+         ]},
+        {"type": "simple", "time": 0.3, "temperature": 250.5, "gas_state": 0},
+    ],
+}
+
+
+class TestCompiledProgram(unittest.TestCase):
+    def test_same_as_generator(self):
+        generator = ProgramGenerator(PROGRAM)
+        expected = list(generator.parse_program_to_queue())
+        compiled = generator.compile()
+        self.assertEqual(len(compiled), len(expected))
+        for (time_next, (temperatures, gas_state, stage_num, stage_type)), tick in zip(expected, compiled):
+            self.assertEqual((time_next, (tuple(map(float, temperatures)), int(gas_state), stage_num, stage_type)), tick)
+
+    def test_random_access(self):
+        generator = ProgramGenerator(PROGRAM)
+        compiled = generator.compile()
+        self.assertIs(generator.compile(), compiled)
+        ticks = list(compiled)
+        self.assertEqual(compiled[17], ticks[17])
+        self.assertEqual(compiled[-1], ticks[-1])
+        self.assertEqual(list(compiled[20:40:3]), ticks[20:40:3])
+        self.assertAlmostEqual(generator.calculate_full_time(), len(ticks) / PROGRAM["settings"]["frequency"])
+        self.assertEqual(compiled.stage_nums[-1], 14)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import dataclasses
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from dat_utils import container
+from dat_utils.records import get_record_dtype
+from dat_utils.writer import ChunkedDatWriter, FlushPolicy
+from tests.test_one_tick_binary_saving import make_ticks, pack_by_struct
+
+
+def write_v2(path, ticks, sensor_resistances, batch=7, close=True, **kwargs):
+    writer = ChunkedDatWriter(
+        open(path, "wb"), FlushPolicy(max_delay=3600, fsync_on_stage_change=False),
+        {"machine": "test", "program_hash": "abc"}, **kwargs
+    )
+    for start in range(0, len(ticks), batch):
+        writer.write_ticks(ticks[start:start + batch], sensor_resistances[start:start + batch])
+    if close:
+        writer.close()
+    else:
+        writer.flush()
+        writer.fd.close()
+
+
+class TestChunkedDat(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.ticks = make_ticks(12, 1000, rng, stage_length=90)
+        # the first stage is repeated after the others, like cyclic program does
+        self.ticks[900:] = [dataclasses.replace(tick, stage_num=0) for tick in self.ticks[900:]]
+        self.sensor_resistances = [tuple(rng.uniform(1e3, 1e9, 12)) for _ in self.ticks]
+        self.expected = np.frombuffer(pack_by_struct(self.ticks, self.sensor_resistances)[1:], get_record_dtype(12))
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "run.dat")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_same_records_as_v1(self):
+        for compression in container.get_available_compressions():
+            write_v2(self.path, self.ticks, self.sensor_resistances, compression=compression, chunk_ticks=64)
+            with container.ChunkedDatReader(self.path) as reader:
+                self.assertFalse(reader.recovered)
+                self.assertEqual(reader.metadata["machine"], "test")
+                self.assertEqual(reader.metadata["compression"], compression)
+                self.assertEqual(len(reader), len(self.ticks))
+                np.testing.assert_array_equal(reader.read(), self.expected)
+                np.testing.assert_array_equal(np.concatenate(list(reader.iter_chunks())), self.expected)
+            with open(self.path, "rb") as fd:
+                self.assertEqual(container.read_format_version(fd), 2)
+                self.assertEqual(fd.tell(), 0)
+
+    def test_seek(self):
+        write_v2(self.path, self.ticks, self.sensor_resistances, chunk_ticks=64)
+        with container.ChunkedDatReader(self.path) as reader:
+            np.testing.assert_array_equal(reader.read(130, 333), self.expected[130:333])
+            np.testing.assert_array_equal(reader.read(990, 2000), self.expected[990:])
+            self.assertEqual(len(reader.read(500, 500)), 0)
+
+            stage = reader.read_stage(0, ("time_next", "us"))
+            expected = self.expected[self.expected["stage_num"] == 0]
+            self.assertEqual(stage.dtype.names, ("time_next", "us"))
+            np.testing.assert_array_equal(stage["us"], expected["us"])
+            np.testing.assert_array_equal(reader.read_stage(5), self.expected[self.expected["stage_num"] == 5])
+            self.assertEqual(len(reader.read_stage(42)), 0)
+            self.assertEqual(list(reader.stages["stage_num"]), list(range(10)) + [0])
+
+            times = self.expected["time_next"]
+            window = reader.read_time(times[200], times[420], ("rs",))
+            np.testing.assert_array_equal(window["rs"], self.expected["rs"][(times >= times[200]) & (times < times[420])])
+
+    def test_file_without_index(self):
+        write_v2(self.path, self.ticks, self.sensor_resistances, close=False, chunk_ticks=64)
+        with open(self.path, "ab") as fd:
+            # the last chunk was cut when the program crashed
+            fd.write(container.CHUNK_STRUCT.pack(container.CHUNK_MAGIC, 64, 1) + b"\x00" * 10)
+        with container.ChunkedDatReader(self.path) as reader:
+            self.assertTrue(reader.recovered)
+            np.testing.assert_array_equal(reader.read(), self.expected)
+            np.testing.assert_array_equal(reader.read_stage(0), self.expected[self.expected["stage_num"] == 0])
+
+    def test_flushes_keep_chunks_full(self):
+        # every batch is flushed, like a slow program with max_delay shorter than a batch
+        writer = ChunkedDatWriter(open(self.path, "wb"), FlushPolicy(max_delay=0, fsync_on_stage_change=True),
+                                  chunk_ticks=64)
+        for start in range(0, len(self.ticks), 7):
+            writer.write_ticks(self.ticks[start:start + 7], self.sensor_resistances[start:start + 7])
+            if start == 700:
+                # the program crashes here, the file has full chunks and the tail
+                size = os.path.getsize(self.path)
+                with open(self.path, "rb") as fd, open(os.path.join(self.folder.name, "crashed.dat"), "wb") as out:
+                    out.write(fd.read(size))
+        writer.close()
+        with container.ChunkedDatReader(self.path) as reader:
+            self.assertEqual(list(reader.chunks["ticks"]), [64] * 15 + [40])
+            np.testing.assert_array_equal(reader.read(), self.expected)
+        with container.ChunkedDatReader(os.path.join(self.folder.name, "crashed.dat")) as reader:
+            self.assertTrue(reader.recovered)
+            np.testing.assert_array_equal(reader.read(), self.expected[:707])
+
+    def test_not_v2_file(self):
+        with open(self.path, "wb") as fd:
+            fd.write(pack_by_struct(self.ticks[:3], self.sensor_resistances[:3]))
+        with open(self.path, "rb") as fd:
+            self.assertEqual(container.read_format_version(fd), 1)
+        with self.assertRaises(ValueError):
+            container.ChunkedDatReader(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from dat_utils.reader import COLUMNS, open_dat
+from dat_utils.records import get_record_dtype
+from tests.test_dat_container import write_v2
+from tests.test_one_tick_binary_saving import make_ticks, pack_by_struct
+
+
+class TestDatReader(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.ticks = make_ticks(12, 1000, rng, stage_length=90)
+        self.sensor_resistances = [tuple(rng.uniform(1e3, 1e9, 12)) for _ in self.ticks]
+        self.data = pack_by_struct(self.ticks, self.sensor_resistances)
+        self.expected = np.frombuffer(self.data[1:], get_record_dtype(12))
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "run.dat")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write_v1(self, data):
+        with open(self.path, "wb") as fd:
+            fd.write(data)
+
+    def test_columns_are_views(self):
+        # the last record was cut when the program crashed
+        self.write_v1(self.data[:-5])
+        with open_dat(self.path) as reader:
+            self.assertEqual(reader.version, 1)
+            self.assertEqual(reader.sensors_number, 12)
+            self.assertEqual(len(reader), len(self.ticks) - 1)
+            self.assertIsInstance(reader.records, np.memmap)
+            for name, field in COLUMNS.items():
+                column = getattr(reader, name)
+                self.assertTrue(np.shares_memory(column, reader.records))
+                np.testing.assert_array_equal(column, self.expected[field][:-1])
+            sensors = reader.get_column("us", slice(2, 5), slice(10, 20))
+            self.assertTrue(np.shares_memory(sensors, reader.records))
+            np.testing.assert_array_equal(sensors, self.expected["us"][10:20, 2:5])
+            np.testing.assert_array_equal(reader.get_column("temperatures", [0, 7]), self.expected["temperatures"][:-1, [0, 7]])
+            with self.assertRaises(ValueError):
+                reader.get_column("time", [0])
+
+    def test_stages_and_time(self):
+        self.write_v1(self.data)
+        with open_dat(self.path) as reader:
+            stage_nums = self.expected["stage_num"]
+            for stage_num in (0, 5, 11):
+                rows = reader.get_stage_slice(stage_num)
+                np.testing.assert_array_equal(reader.rs[rows], self.expected["rs"][stage_nums == stage_num])
+            self.assertEqual(reader.get_stage_slice(42).stop - reader.get_stage_slice(42).start, 0)
+            stages = reader.get_stages()
+            self.assertEqual([stage_num for stage_num, _ in stages], sorted(set(stage_nums)))
+            self.assertEqual(sum(rows.stop - rows.start for _, rows in stages), len(self.ticks))
+
+            times = self.expected["time_next"]
+            rows = reader.get_time_slice(times[200], times[420])
+            np.testing.assert_array_equal(reader.time[rows], times[(times >= times[200]) & (times < times[420])])
+
+    def test_v2_and_empty_files(self):
+        write_v2(self.path, self.ticks, self.sensor_resistances, chunk_ticks=64)
+        with open_dat(self.path) as reader:
+            self.assertEqual(reader.version, 2)
+            self.assertEqual(reader.metadata["machine"], "test")
+            # records are read by columns and chunks when they are asked
+            self.assertEqual(len(reader.records), 0)
+            self.assertEqual(len(reader), len(self.ticks))
+            for name, field in COLUMNS.items():
+                np.testing.assert_array_equal(getattr(reader, name), self.expected[field])
+            np.testing.assert_array_equal(reader.get_column("us", slice(2, 5), slice(100, 200)),
+                                          self.expected["us"][100:200, 2:5])
+            times = self.expected["time_next"]
+            self.assertEqual(reader.get_time_bounds(), (times[0], times[-1]))
+            for start, stop in ((200, 420), (0, 64), (63, 999)):
+                rows = reader.get_time_slice(times[start], times[stop])
+                self.assertEqual((rows.start, rows.stop), (start, stop))
+            self.assertEqual(reader.get_time_slice(times[-1] + 1, times[-1] + 2), slice(len(times), len(times)))
+
+        self.write_v1(self.data[:1])
+        with open_dat(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(reader.us.shape, (0, 12))
+        self.write_v1(b"")
+        with self.assertRaises(ValueError):
+            open_dat(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
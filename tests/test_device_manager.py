@@ -0,0 +1,72 @@
+import sys
+import time
+import unittest
+
+from sensor_system import MS_ABC
+from sensor_system_utils.device_manager import DeviceUnavailableException, MSDeviceManager
+from sensor_system_utils.pty_emulator import MSPtyEmulator
+
+SENSOR_NUMBER = 12
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "pseudo-terminals are used")
+class TestMSDeviceManager(unittest.TestCase):
+    def setUp(self):
+        self.emulator = MSPtyEmulator(SENSOR_NUMBER)
+        self.emulator.start()
+        self.manager = MSDeviceManager()
+
+    def tearDown(self):
+        self.manager.close_all()
+        self.emulator.stop()
+
+    def lease(self):
+        return self.manager.lease(self.emulator.port, SENSOR_NUMBER, 100)
+
+    def test_healthy_device_is_reused(self):
+        with self.lease() as ms:
+            ms.full_request((0,) * SENSOR_NUMBER)
+        with self.lease() as same_ms:
+            self.assertIs(same_ms, ms)
+            same_ms.full_request((0,) * SENSOR_NUMBER)
+
+    def test_device_without_answer_is_dropped(self):
+        # every answer is lost, the caller swallows the error
+        self.emulator.corruption_probability = 1.0
+        with self.lease() as ms:
+            ms.ms.ser.timeout = 0.1
+            with self.assertRaises(MS_ABC.MSException):
+                ms.full_request((0,) * SENSOR_NUMBER)
+        self.assertFalse(ms.is_healthy())
+        self.emulator.corruption_probability = 0.0
+        with self.lease() as new_ms:
+            self.assertIsNot(new_ms, ms)
+            self.assertFalse(ms.is_open())
+            new_ms.full_request((0,) * SENSOR_NUMBER)
+            self.assertTrue(new_ms.is_healthy())
+
+    def test_closed_device_is_replaced(self):
+        with self.lease() as ms:
+            pass
+        ms.close()
+        with self.lease() as new_ms:
+            self.assertIsNot(new_ms, ms)
+            new_ms.full_request((0,) * SENSOR_NUMBER)
+
+    def test_busy_device_is_reported_at_once(self):
+        self.manager.lease_timeout = 0.2
+        with self.lease():
+            start = time.perf_counter()
+            with self.assertRaises(DeviceUnavailableException):
+                with self.manager.lease(self.emulator.port, SENSOR_NUMBER, 100, timeout=0):
+                    pass
+            self.assertLess(time.perf_counter() - start, 0.1)
+            # program waits for the device
+            with self.assertRaises(DeviceUnavailableException):
+                with self.lease():
+                    pass
+            self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+
+from sensor_system import MS12
+from sensor_system_utils.frame_reader import FrameReader
+
+BEGIN_KEY = bytes((0xAA, 0x55, 0xAA))
+END_KEY = bytes((0x0D, 0x0A))
+
+
+class FakeSerial:
+    def __init__(self, data: bytes, chunk_size: int = 1000):
+        self.data = bytearray(data)
+        self.chunk_size = chunk_size
+        self.reads = 0
+
+    @property
+    def in_waiting(self):
+        return min(len(self.data), self.chunk_size)
+
+    def reset_input_buffer(self):
+        self.data.clear()
+
+    def read(self, size):
+        self.reads += 1
+        size = min(size, self.chunk_size)
+        chunk = bytes(self.data[:size])
+        del self.data[:size]
+        return chunk
+
+
+def frame(payload: bytes) -> bytes:
+    return BEGIN_KEY + payload + END_KEY
+
+
+class LateDevice(FakeSerial):
+    """Answers every request with heater codes equal to request number, the first answer comes
+    right after its read has timed out"""
+
+    def __init__(self, sensors_number: int):
+        super().__init__(b"")
+        self.sensors_number = sensors_number
+        self.requests = 0
+
+    def answer(self, number: int) -> bytes:
+        sensors = np.zeros(self.sensors_number, dtype=MS12.ANSWER_SENSOR_DTYPE)
+        sensors["r"] = number
+        return frame(sensors.tobytes())
+
+    def read(self, size):
+        chunk = super().read(size)
+        if not chunk and self.requests == 1:
+            self.data += self.answer(1)
+        return chunk
+
+    def write(self, message):
+        self.requests += 1
+        if self.requests > 1:
+            self.data += self.answer(self.requests)
+        return len(message)
+
+
+class TestFrameReader(unittest.TestCase):
+    def test_clean_frames(self):
+        ser = FakeSerial(frame(b"abcd") + frame(b"efgh"))
+        reader = FrameReader(ser, BEGIN_KEY, END_KEY, ValueError)
+        self.assertEqual(reader.read_frame(9), frame(b"abcd"))
+        self.assertEqual(reader.read_frame(9), frame(b"efgh"))
+        self.assertEqual(reader.get_counters(), {"resync_count": 0, "dropped_bytes": 0})
+
+    def test_garbage_before_frame(self):
+        ser = FakeSerial(b"\x00\xAA\x55" + frame(b"abcd"))
+        reader = FrameReader(ser, BEGIN_KEY, END_KEY, ValueError)
+        self.assertEqual(reader.read_frame(9), frame(b"abcd"))
+        self.assertEqual(reader.get_counters(), {"resync_count": 1, "dropped_bytes": 3})
+
+    def test_partial_frames_are_reassembled(self):
+        ser = FakeSerial(b"\x01" + frame(b"abcd") + frame(b"efgh"), chunk_size=2)
+        reader = FrameReader(ser, BEGIN_KEY, END_KEY, ValueError)
+        self.assertEqual(reader.read_frame(9), frame(b"abcd"))
+        self.assertEqual(reader.read_frame(9), frame(b"efgh"))
+        self.assertEqual(reader.dropped_bytes, 1)
+
+    def test_broken_frame_is_skipped(self):
+        ser = FakeSerial(BEGIN_KEY + b"ab" + frame(b"efgh"))
+        reader = FrameReader(ser, BEGIN_KEY, END_KEY, ValueError)
+        self.assertEqual(reader.read_frame(9), frame(b"efgh"))
+        self.assertEqual(reader.get_counters(), {"resync_count": 1, "dropped_bytes": 5})
+
+    def test_broken_frame_without_next_raises_immediately(self):
+        ser = FakeSerial(BEGIN_KEY + b"abcdXX")
+        reader = FrameReader(ser, BEGIN_KEY, END_KEY, ValueError)
+        with self.assertRaises(ValueError):
+            reader.read_frame(9)
+        self.assertEqual(ser.reads, 1)
+
+    def test_timeout(self):
+        reader = FrameReader(FakeSerial(frame(b"ab")), BEGIN_KEY, END_KEY, ValueError)
+        with self.assertRaises(ValueError):
+            reader.read_frame(9)
+
+    def test_late_answer_is_not_taken_for_next_request(self):
+        ms = MS12(heater_resistance_converter=1)
+        ms.ser = LateDevice(ms.sensors_number)
+        ms.frame_reader = FrameReader(ms.ser, BEGIN_KEY, END_KEY, MS12.MSException)
+        with self.assertRaises(MS12.MSException):
+            ms.full_request((0,) * 12, MS12.REQUEST_U, [])
+        for number in (2, 3):
+            us, rs = ms.full_request((0,) * 12, MS12.REQUEST_U, [])
+            np.testing.assert_array_equal(rs, number)
+
+    def test_partial_answer_is_dropped_on_error(self):
+        ser = FakeSerial(BEGIN_KEY + b"ab")
+        reader = FrameReader(ser, BEGIN_KEY, END_KEY, ValueError)
+        with self.assertRaises(ValueError):
+            reader.read_frame(9)
+        # the rest of the late answer and the next answer
+        ser.data += b"cd" + END_KEY
+        reader.before_request()
+        ser.data += frame(b"efgh")
+        self.assertEqual(reader.read_frame(9), frame(b"efgh"))
+
+    def test_frame_larger_than_capacity(self):
+        payload = bytes(range(100))
+        reader = FrameReader(FakeSerial(b"\x00" * 20 + frame(payload), chunk_size=7), BEGIN_KEY, END_KEY,
+                             ValueError, capacity=16)
+        self.assertEqual(reader.read_frame(105), frame(payload))
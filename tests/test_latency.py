@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+import unittest
+
+from operation_utils import latency
+from operation_utils.latency import LatencyRecorder
+
+
+class TestLatencyRecorder(unittest.TestCase):
+    def test_stages(self):
+        recorder = LatencyRecorder()
+        stamps = [1_000_000 * point + 1 for point in range(latency.POINTS_NUMBER)]
+        recorder.record(stamps)
+        # the tick wasn't painted, its paint stage is skipped
+        stamps = list(stamps)
+        stamps[latency.PAINTED] = 0
+        recorder.record(stamps)
+        statistics = {stage["stage"]: stage for stage in recorder.get_statistics()}
+        self.assertEqual(statistics["request"]["ticks"], 2)
+        self.assertAlmostEqual(statistics["request"]["mean"], 1e-3)
+        self.assertEqual(statistics["paint"]["ticks"], 1)
+        self.assertEqual(statistics[latency.TOTAL]["ticks"], 2)
+        self.assertAlmostEqual(statistics[latency.TOTAL]["max"], 6e-3)
+        self.assertEqual(statistics["request"]["bins"], [(1e-3, 2e-3, 2)])
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "latency.json")
+            recorder.dump(path)
+            with open(path) as fd:
+                dumped = json.load(fd)
+        self.assertEqual([stage["stage"] for stage in dumped], list(statistics))
+
+        recorder.reset()
+        self.assertTrue(all(stage["ticks"] == 0 for stage in recorder.get_statistics()))
+
+    def test_mark(self):
+        stamps = latency.new_stamps()
+        latency.mark(stamps, latency.ANSWER)
+        latency.mark(None, latency.ANSWER)
+        self.assertGreaterEqual(stamps[latency.ANSWER], stamps[latency.REQUEST] > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
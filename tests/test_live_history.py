@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from operation_utils.live_history import LiveHistory
+
+
+class TestLiveHistory(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.times = np.arange(30000) / 10
+        self.values = rng.lognormal(10, 2, (len(self.times), 3))
+        self.values[123, 1] = np.nan
+        self.folder = tempfile.TemporaryDirectory()
+        self.history = LiveHistory(3, memory_budget=300000, spill_folder=self.folder.name, block_rows=256,
+                                   first_bucket=4, factor=4, levels_number=4)
+
+    def tearDown(self):
+        self.history.close()
+        self.folder.cleanup()
+
+    def fill(self, number):
+        for time, values in zip(self.times[:number], self.values[:number]):
+            self.history.append(time, values)
+
+    def test_levels_and_spill(self):
+        self.fill(len(self.times))
+        self.assertLessEqual(self.history.get_memory_bytes(), 300000)
+        self.assertGreater(self.history.samples.spilled, 0)
+        for level, bucket_size in zip(self.history.levels, self.history.bucket_sizes):
+            self.assertEqual(len(level), len(self.times) // bucket_size)
+            for index in (0, 30, len(level) - 1):
+                rows = level.get_rows(index, index + 1)[0]
+                bucket = self.values[index * bucket_size:(index + 1) * bucket_size]
+                self.assertEqual(rows[0], self.times[index * bucket_size])
+                np.testing.assert_array_equal(rows[1:4], np.nanmin(bucket, axis=0))
+                np.testing.assert_array_equal(rows[4:], np.nanmax(bucket, axis=0))
+        np.testing.assert_array_equal(self.history.samples.get_rows(0, len(self.times))[:, 1:], self.values)
+
+    def test_view(self):
+        number = 12345
+        self.fill(number)
+        # scrolled back window is given at full resolution
+        times, values = self.history.get_view(100, 150, max_points=1000)
+        np.testing.assert_array_equal(times, self.times[999:1502])
+        np.testing.assert_array_equal(values, self.values[999:1502].T)
+
+        # the whole run is decimated and keeps envelope up to the last sample
+        times, values = self.history.get_view(0, self.times[number - 1], max_points=1000)
+        self.assertLessEqual(len(times), 1000)
+        bucket_size = self.history.bucket_sizes[self.history.get_level(number, 1000)]
+        self.assertEqual(times[-1], self.times[(number - 1) // bucket_size * bucket_size])
+        np.testing.assert_array_equal(np.nanmin(values, axis=1), np.nanmin(self.values[:number], axis=0))
+        np.testing.assert_array_equal(np.nanmax(values, axis=1), np.nanmax(self.values[:number], axis=0))
+
+    def test_spilled_blocks_keep_descriptors(self):
+        if not os.path.isdir("/proc/self/fd"):
+            self.skipTest("Open descriptors can't be counted")
+        history = LiveHistory(1, memory_budget=0, spill_folder=self.folder.name, block_rows=16,
+                              first_bucket=4, factor=4, levels_number=2)
+        descriptors = len(os.listdir("/proc/self/fd"))
+        values = np.arange(16 * 3000, dtype=np.float64)
+        for time in values:
+            history.append(time, (time,))
+        self.assertGreater(history.samples.spilled, 2000)
+        self.assertLessEqual(len(os.listdir("/proc/self/fd")), descriptors + 1 + len(history.levels))
+        np.testing.assert_array_equal(history.samples.get_rows(0, len(values))[:, 1], values)
+        times, _ = history.get_view(100, 200)
+        np.testing.assert_array_equal(times, values[99:202])
+        history.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from dat_utils.pyramid import MinMaxPyramid, PYRAMID_META_SUFFIX
+from dat_utils.reader import open_dat
+from dat_utils.records import HEADER_STRUCT, get_record_dtype
+from tests.test_dat_container import write_v2
+from tests.test_one_tick_binary_saving import make_ticks
+
+
+class TestMinMaxPyramid(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.records = np.zeros(100000, dtype=get_record_dtype(4))
+        self.records["time_next"] = np.arange(len(self.records)) / 10
+        self.records["sensor_resistances"] = rng.lognormal(10, 2, (len(self.records), 4))
+        self.records["sensor_resistances"][777, 2] = np.nan
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "run.dat")
+        self.write(self.records)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, records):
+        with open(self.path, "wb") as fd:
+            fd.write(HEADER_STRUCT.pack(4))
+            records.tofile(fd)
+
+    def test_levels(self):
+        with open_dat(self.path) as reader:
+            pyramid = MinMaxPyramid.build(reader, first_bucket=64, factor=4, min_buckets=100, chunk_rows=1000)
+        self.assertEqual(pyramid.bucket_sizes, [64, 256, 1024])
+        values = self.records["sensor_resistances"]
+        for level, bucket_size in zip(pyramid.levels, pyramid.bucket_sizes):
+            self.assertEqual(len(level), -(-len(values) // bucket_size))
+            for index in (0, 12, len(level) - 1):
+                bucket = values[index * bucket_size:(index + 1) * bucket_size]
+                np.testing.assert_array_equal(level["min"][index], np.nanmin(bucket, axis=0))
+                np.testing.assert_array_equal(level["max"][index], np.nanmax(bucket, axis=0))
+                self.assertEqual(level["time"][index], self.records["time_next"][index * bucket_size])
+
+    def test_view(self):
+        with open_dat(self.path) as reader:
+            pyramid = MinMaxPyramid.build(reader, min_buckets=100)
+            times, values = pyramid.get_view(reader, reader.get_time_slice(100, 300), max_points=4000)
+            np.testing.assert_array_equal(times, self.records["time_next"][1000:3000])
+            np.testing.assert_array_equal(values, self.records["sensor_resistances"][1000:3000])
+
+            times, values = pyramid.get_view(reader, slice(None), max_points=4000)
+            self.assertLessEqual(len(times), 4000)
+            self.assertEqual(values.shape, (len(times), 4))
+            np.testing.assert_array_equal(values.min(axis=0), np.nanmin(self.records["sensor_resistances"], axis=0))
+            np.testing.assert_array_equal(values.max(axis=0), np.nanmax(self.records["sensor_resistances"], axis=0))
+
+    def test_v2_file_is_read_by_chunks(self):
+        rng = np.random.default_rng(1)
+        ticks = make_ticks(12, 3000, rng, stage_length=90)
+        sensor_resistances = [tuple(rng.uniform(1e3, 1e9, 12)) for _ in ticks]
+        v2_path = os.path.join(self.folder.name, "run_v2.dat")
+        # chunks are not made of whole buckets
+        write_v2(v2_path, ticks, sensor_resistances, chunk_ticks=50)
+        progress = []
+        with open_dat(v2_path) as reader:
+            expected = np.array(reader.sensor_resistances)
+            pyramid = MinMaxPyramid.build(reader, first_bucket=16, min_buckets=10,
+                                          progress=lambda done, total: progress.append((done, total)))
+            self.assertEqual(progress[-1], (3000, 3000))
+            self.assertEqual(len(progress), 60)
+            for level, bucket_size in zip(pyramid.levels, pyramid.bucket_sizes):
+                self.assertEqual(len(level), -(-3000 // bucket_size))
+                for index in (0, len(level) // 2, len(level) - 1):
+                    bucket = expected[index * bucket_size:(index + 1) * bucket_size]
+                    np.testing.assert_array_equal(level["min"][index], bucket.min(axis=0))
+                    np.testing.assert_array_equal(level["max"][index], bucket.max(axis=0))
+            rows = reader.get_time_slice(10, 20)
+            times, values = pyramid.get_view(reader, rows, max_points=4000)
+            np.testing.assert_array_equal(values, expected[rows])
+
+    def test_cache(self):
+        with open_dat(self.path) as reader:
+            pyramid = MinMaxPyramid.open_cached(self.path, reader)
+            cached = MinMaxPyramid.open_cached(self.path, reader)
+        self.assertIsInstance(cached.levels[0], np.memmap)
+        self.assertEqual(cached.bucket_sizes, pyramid.bucket_sizes)
+        for level, cached_level in zip(pyramid.levels, cached.levels):
+            np.testing.assert_array_equal(level, cached_level)
+
+        # the run was continued
+        self.write(np.concatenate((self.records, self.records[:5000])))
+        with open_dat(self.path) as reader:
+            rebuilt = MinMaxPyramid.open_cached(self.path, reader)
+        self.assertNotIsInstance(rebuilt.levels[0], np.memmap)
+        self.assertEqual(len(rebuilt.levels[0]), -(-105000 // rebuilt.bucket_sizes[0]))
+        self.assertTrue(os.path.exists(self.path + PYRAMID_META_SUFFIX))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import functools
+import operator
+import numpy as np
+from sensor_system import MS_ABC, MS4, MS12, MS_Uni
+
+
+def decode_answer_by_loop(ms, recieved):
+    us = np.empty(ms.sensors_number, dtype=np.float32)
+    rs = np.empty(ms.sensors_number, dtype=np.float32)
+    for i in range(ms.sensors_number):
+        start_index = 3 + i * 6
+        rs[i] = ms._back_convert_r(int.from_bytes(recieved[start_index:start_index + 2], "little", signed=False))
+        us[i] = ms._back_convert_u(int.from_bytes(recieved[start_index + 2:start_index + 5], "little", signed=False))
+    return us, rs
+
+
+def form_message_by_reduce(ms, values, request_type, sensor_types_list):
+    if request_type == MS_ABC.REQUEST_U:
+        send_key, convert_func = ms.SEND_U, ms._convert_u
+    else:
+        send_key, convert_func = ms.SEND_R, ms._convert_r
+    send_key = ms._form_send_key(send_key, sensor_types_list)
+    padding = bytes(8) if ms.sensors_number == 12 else b""
+    return ms.BEGIN_KEY + send_key + functools.reduce(operator.add, (convert_func(number) for number in values)) + padding + ms.END_KEY
+
+
+def random_answer(sensors_number, rng):
+    return MS12.BEGIN_KEY + rng.integers(0, 256, sensors_number * 6, dtype=np.uint8).tobytes() + MS12.END_KEY
+
+
+class TestAnswerDecoding(unittest.TestCase):
+    def test_decoding_matches_loop(self):
+        rng = np.random.default_rng(0)
+        for ms_class in (MS4, MS12):
+            for converter in (100, 37.5):
+                ms = ms_class(heater_resistance_converter=converter)
+                for _ in range(50):
+                    recieved = random_answer(ms.sensors_number, rng)
+                    us, rs = ms.decode_answer(recieved)
+                    us_loop, rs_loop = decode_answer_by_loop(ms, recieved)
+                    self.assertEqual(us.dtype, np.float32)
+                    self.assertEqual(rs.dtype, np.float32)
+                    np.testing.assert_array_equal(us, us_loop)
+                    np.testing.assert_array_equal(rs, rs_loop)
+
+    def test_decoding_extremes(self):
+        ms = MS4()
+        recieved = ms.BEGIN_KEY + bytes((0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00)) * 4 + ms.END_KEY
+        us, rs = ms.decode_answer(recieved)
+        np.testing.assert_array_equal(rs, np.float32(655.35))
+        np.testing.assert_array_equal(us, np.float32((2 ** 24 - 1) / 2 ** 24 * 5))
+
+
+class TestMessageForming(unittest.TestCase):
+    def test_forming_matches_reduce(self):
+        rng = np.random.default_rng(1)
+        for ms_class in (MS4, MS12):
+            for converter in (100, 37.5):
+                ms = ms_class(heater_resistance_converter=converter)
+                for sensor_types_list in ([], [MS_ABC.SEND_CSS_1_4], [MS_ABC.SEND_CSS_5_8, MS_ABC.SEND_CSS_9_12]):
+                    for _ in range(20):
+                        us = tuple(rng.uniform(0, 6, ms.sensors_number))
+                        rs = tuple(rng.uniform(0, 600, ms.sensors_number))
+                        self.assertEqual(bytes(ms._form_message(us, MS_ABC.REQUEST_U, sensor_types_list)),
+                                         form_message_by_reduce(ms, us, MS_ABC.REQUEST_U, sensor_types_list))
+                        self.assertEqual(bytes(ms._form_message(rs, MS_ABC.REQUEST_R, sensor_types_list)),
+                                         form_message_by_reduce(ms, rs, MS_ABC.REQUEST_R, sensor_types_list))
+
+    def test_forming_errors(self):
+        ms = MS4()
+        with self.assertRaises(MS_ABC.MSException):
+            ms._form_message((1, 2, 3), MS_ABC.REQUEST_U, [])
+        with self.assertRaises(MS_ABC.MSException):
+            ms._form_message((1, 2, 3, 4), 5, [])
+        with self.assertRaises(Exception):
+            ms._form_message((1, -2, 3, 4), MS_ABC.REQUEST_U, [])
+        with self.assertRaises(OverflowError):
+            ms._form_message((1, 2, 3, 1000), MS_ABC.REQUEST_R, [])
+
+
+class TestBatchMessageForming(unittest.TestCase):
+    def test_rows_match_form_request(self):
+        rng = np.random.default_rng(2)
+        for sensor_number, sensor_types_lists in (
+            (4, ([], [MS_ABC.SEND_CSS_1_4])),
+            (12, ([], [MS_ABC.SEND_CSS_1_4], [MS_ABC.SEND_CSS_5_8, MS_ABC.SEND_CSS_9_12])),
+        ):
+            ms = MS_Uni(sensor_number, None, 37.5)
+            for sensor_types_list in sensor_types_lists:
+                for request_type, values in ((MS_ABC.REQUEST_U, rng.uniform(0, 6, (30, sensor_number))),
+                                             (MS_ABC.REQUEST_R, rng.uniform(0, 600, (30, sensor_number)))):
+                    frames = ms.form_requests(values, request_type, sensor_types_list)
+                    self.assertEqual(frames.shape, (30, len(ms.form_request(values[0], request_type, sensor_types_list))))
+                    for row, frame in zip(values, frames):
+                        self.assertEqual(frame.tobytes(), ms.form_request(row, request_type, sensor_types_list))
+
+    def test_forming_errors(self):
+        ms = MS_Uni(4, None, 100)
+        self.assertEqual(ms.form_requests(np.empty((0, 4))).shape[0], 0)
+        with self.assertRaises(Exception):
+            ms.form_requests([[1, -2, 3, 4]])
+        with self.assertRaises(OverflowError):
+            ms.form_requests([[1, 2, 3, 1000]], MS_ABC.REQUEST_R)
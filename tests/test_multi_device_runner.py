@@ -0,0 +1,163 @@
+import functools
+import sys
+import threading
+import unittest
+from queue import Empty
+
+import numpy as np
+
+from measurement_utils.vectorized_converters import TemperatureToVoltageConverter, VoltageToResistanceConverter
+from operation_utils.multi_device_runner import MultiDeviceRunner
+from operation_utils.program_generator import ProgramGenerator
+from operation_utils.queues_holder import QueuesHolder
+from operation_utils.setpoint_schedule import SetpointSchedule
+from operation_utils.tick_scheduler import CatchUpPolicy
+from sensor_system import MS_ABC
+from sensor_system_utils.device_manager import MSDeviceManager
+from sensor_system_utils.pty_emulator import MSPtyEmulator
+
+SENSOR_NUMBER = 12
+PROGRAM = {
+    "settings": {"frequency": 20},
+    "program": [
+        {"type": "simple", "time": 0.25, "temperature": 300, "gas_state": 1},
+        {"type": "simple", "time": 0.25, "temperature": 400, "gas_state": 2},
+    ],
+}
+
+
+class CountingSignal:
+    def __init__(self):
+        self.count = 0
+
+    def emit(self, *args):
+        self.count += 1
+
+
+def get_setpoint_converter(kind):
+    calibration = (np.array([0.0, 250.0, 500.0, 750.0, 1000.0]), np.array([0.0, 1.25, 2.5, 3.75, 5.0]))
+    return TemperatureToVoltageConverter([calibration] * SENSOR_NUMBER)
+
+
+def drain(queue) -> list:
+    items = []
+    while True:
+        try:
+            items.append(queue.get_nowait())
+        except Empty:
+            return items
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "pseudo-terminals are used")
+class TestMultiDeviceRunner(unittest.TestCase):
+    def run_devices(self, ports, stop_signal, setpoint_schedules=None, pipelined=False, multirange=False,
+                    critical_values=({}, {})):
+        manager = MSDeviceManager()
+        queues_holder = QueuesHolder()
+        queue = queues_holder.add_new_queue()
+        runner = MultiDeviceRunner(
+            (ProgramGenerator(PROGRAM),),
+            [functools.partial(manager.lease, port, SENSOR_NUMBER, 100) for port in ports],
+            lambda: [0] * SENSOR_NUMBER,
+            get_setpoint_converter,
+            None,
+            multirange,
+            CountingSignal(),
+            lambda: True,
+            queues_holder,
+            stop_signal,
+            CountingSignal(),
+            SENSOR_NUMBER,
+            *critical_values,
+            pipelined=pipelined,
+            setpoint_schedules=setpoint_schedules,
+        )
+        runner.start()
+        runner.join()
+        manager.close_all()
+        return runner, drain(queue)
+
+    def test_devices_run_same_program(self):
+        emulators = [MSPtyEmulator(SENSOR_NUMBER, seed=idx) for idx in range(8)]
+        for emulator in emulators:
+            emulator.start()
+        try:
+            stop_signal = CountingSignal()
+            runner, ticks = self.run_devices([emulator.port for emulator in emulators], stop_signal)
+        finally:
+            for emulator in emulators:
+                emulator.stop()
+        self.assertTrue(runner.isStopped())
+        self.assertEqual(stop_signal.count, 1)
+        self.assertEqual(len(ticks), 8 * 10)
+        for device_index in range(8):
+            device_ticks = [tick for tick in ticks if tick.device_index == device_index]
+            self.assertEqual([tick.stage_num for tick in device_ticks], [0] * 5 + [1] * 5)
+        # Shared clock origin: the same tick is scheduled at the same moment on every device
+        for time_next in {tick.time_next for tick in ticks}:
+            self.assertEqual(len({tick.time_next_plus_t9 for tick in ticks if tick.time_next == time_next}), 1)
+
+    def test_precomputed_setpoint_schedule(self):
+        schedule = SetpointSchedule.prepare(
+            ProgramGenerator(PROGRAM).compile(), get_setpoint_converter("V"), MS_ABC.REQUEST_U, SENSOR_NUMBER
+        )
+        emulators = [MSPtyEmulator(SENSOR_NUMBER, seed=idx) for idx in range(2)]
+        for emulator in emulators:
+            emulator.start()
+        try:
+            runner, ticks = self.run_devices([emulator.port for emulator in emulators], CountingSignal(), (schedule,))
+        finally:
+            for emulator in emulators:
+                emulator.stop()
+        self.assertEqual(len(ticks), 2 * 10)
+        # ten ticks and clearing of state after the program
+        self.assertEqual([emulator.counters["requests"] for emulator in emulators], [10 + 1, 10 + 1])
+        for tick in ticks:
+            np.testing.assert_array_equal(tick.converted, get_setpoint_converter("V").convert(tick.temperatures))
+
+    def test_range_switch_inside_batch(self):
+        # every tick is above the top critical voltage, range is switched after each of the first two ticks
+        top = {mode: [-np.inf] * SENSOR_NUMBER for mode in (1, 2, 3)}
+        bottom = {mode: [-np.inf] * SENSOR_NUMBER for mode in (1, 2, 3)}
+        with MSPtyEmulator(SENSOR_NUMBER) as emulator:
+            runner, ticks = self.run_devices([emulator.port], CountingSignal(), multirange=True, critical_values=(top, bottom))
+        self.assertEqual(emulator.counters["range_requests"], 2)
+        # all ticks are drained as one batch after the switches
+        self.assertEqual([tick.sensor_states for tick in ticks],
+                         [(1,) * SENSOR_NUMBER, (2,) * SENSOR_NUMBER] + [(3,) * SENSOR_NUMBER] * 8)
+        converter = VoltageToResistanceConverter(
+            np.full((SENSOR_NUMBER, 3), 1.0), np.full((SENSOR_NUMBER, 3), 0.5),
+            np.tile([1e3, 1e5, 1e7], (SENSOR_NUMBER, 1)), np.ones((SENSOR_NUMBER, 3), dtype=bool),
+        )
+        resistances = converter.convert(np.array([tick.us for tick in ticks]), np.array([tick.sensor_states for tick in ticks]))
+        for tick, tick_resistances in zip(ticks, resistances):
+            np.testing.assert_array_equal(tick_resistances, converter.convert(tick.us, tick.sensor_states))
+
+    def test_devices_share_stretch_shift(self):
+        runner = MultiDeviceRunner(
+            (ProgramGenerator(PROGRAM),), [None, None], None, get_setpoint_converter, None, False, CountingSignal(),
+            None, QueuesHolder(), CountingSignal(), CountingSignal(), SENSOR_NUMBER, {}, {},
+            catch_up_policy=CatchUpPolicy.STRETCH,
+        )
+        self.assertIs(runner.runners[0].scheduler.shift, runner.runners[1].scheduler.shift)
+        runner.schedule_shift.stretch(10 ** 8)
+        runner.set_clock_origin()
+        self.assertEqual(runner.runners[1].scheduler.shift.ns, 0)
+
+    def test_unavailable_device_stops_all(self):
+        with MSPtyEmulator(SENSOR_NUMBER) as emulator:
+            stop_signal = CountingSignal()
+            runner, ticks = self.run_devices([emulator.port, "/dev/nonexistent_port"], stop_signal)
+        self.assertEqual(ticks, [])
+        self.assertEqual(stop_signal.count, 1)
+
+    def test_pipeline_is_closed_when_start_is_aborted(self):
+        threads_number = threading.active_count()
+        with MSPtyEmulator(SENSOR_NUMBER) as emulator:
+            runner, ticks = self.run_devices([emulator.port, "/dev/nonexistent_port"], CountingSignal(), pipelined=True)
+        self.assertEqual(ticks, [])
+        self.assertEqual(threading.active_count(), threads_number)
+
+
+if __name__ == "__main__":
+    unittest.main()
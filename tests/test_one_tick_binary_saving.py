@@ -1,9 +1,64 @@
+import io
+import tempfile
 import unittest
 import struct
 import numpy as np
+from dat_utils.writer import DatWriter, FlushPolicy
 from program_dataclasses.operation_classes import MSOneTickClass
 
 
+def make_ticks(sensors_number: int, count: int, rng: np.random.Generator, stage_length: int = 10) -> list:
+    return [
+        MSOneTickClass(
+            us=rng.uniform(0, 5, sensors_number).astype(np.float32),
+            rs=rng.uniform(10, 20, sensors_number).astype(np.float32),
+            time_next_plus_t9=1729875532.4046245 + idx * 0.1,
+            time_next=idx * 0.1,
+            temperatures=tuple(rng.uniform(100, 500, sensors_number)),
+            gas_state=int(rng.integers(0, 8)),
+            stage_num=idx // stage_length,
+            stage_type=2,
+            sensor_states=list(rng.integers(1, 4, sensors_number)),
+            converted=tuple(rng.uniform(0, 5, sensors_number)),
+        )
+        for idx in range(count)
+    ]
+
+
+def pack_by_struct(ticks: list, sensor_resistances: list) -> bytes:
+    sensors_number = len(ticks[0].rs)
+    bin_write_struct = struct.Struct(
+        "<f" + sensors_number * 4 * "f" + "BIH" + sensors_number * "B"
+    )
+    return struct.pack("<B", sensors_number) + b"".join(
+        bin_write_struct.pack(
+            one_tick_data.time_next,
+            *one_tick_data.us,
+            *one_tick_data.rs,
+            *resistances,
+            *one_tick_data.temperatures,
+            one_tick_data.gas_state,
+            one_tick_data.stage_num,
+            one_tick_data.stage_type,
+            *one_tick_data.sensor_states,
+        )
+        for one_tick_data, resistances in zip(ticks, sensor_resistances)
+    )
+
+
+class CountingBytesIO(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+    def fileno(self):
+        raise io.UnsupportedOperation
+
+
 class TestOneTickBinaryConverting(unittest.TestCase):
     def test_converting(self):
         sensors_number = 4
@@ -41,3 +96,47 @@ class TestOneTickBinaryConverting(unittest.TestCase):
             one_tick_data.stage_type,
             *one_tick_data.sensor_states,
         )
+
+
+class TestDatWriter(unittest.TestCase):
+    def test_same_bytes_as_struct(self):
+        rng = np.random.default_rng(0)
+        for sensors_number in (4, 12):
+            ticks = make_ticks(sensors_number, 250, rng)
+            sensor_resistances = [tuple(rng.uniform(1e3, 1e9, sensors_number)) for _ in ticks]
+            fd = io.BytesIO()
+            writer = DatWriter(fd, FlushPolicy(max_bytes=4096, fsync_on_stage_change=False))
+            for start in range(0, len(ticks), 7):
+                writer.write_ticks(ticks[start:start + 7], sensor_resistances[start:start + 7])
+            writer.flush()
+            self.assertEqual(fd.getvalue(), pack_by_struct(ticks, sensor_resistances))
+
+    def test_flush_policy(self):
+        rng = np.random.default_rng(1)
+        ticks = make_ticks(12, 30, rng, stage_length=20)
+        sensor_resistances = [(1.0,) * 12] * len(ticks)
+        fd = CountingBytesIO()
+        writer = DatWriter(fd, FlushPolicy(max_bytes=1 << 20, max_delay=3600, fsync_on_stage_change=False))
+        writer.write_ticks(ticks[:10], sensor_resistances[:10])
+        self.assertEqual(fd.writes, 1)  # header only, records are buffered
+        writer.write_ticks(ticks[10:30], sensor_resistances[10:30])
+        self.assertEqual(fd.writes, 1)
+        writer.flush()
+        self.assertEqual(fd.writes, 2)  # all buffered records by one call
+        self.assertEqual(fd.getvalue(), pack_by_struct(ticks, sensor_resistances))
+
+        fd = CountingBytesIO()
+        writer = DatWriter(fd, FlushPolicy(max_bytes=1 << 20, max_delay=0))
+        writer.write_ticks(ticks[:5], sensor_resistances[:5])
+        self.assertEqual(fd.writes, 2)
+
+    def test_flush_on_stage_change(self):
+        rng = np.random.default_rng(2)
+        ticks = make_ticks(4, 15, rng, stage_length=10)
+        sensor_resistances = [(1.0,) * 4] * len(ticks)
+        with tempfile.TemporaryFile() as fd:
+            writer = DatWriter(fd, FlushPolicy(max_bytes=1 << 20, max_delay=3600))
+            writer.write_ticks(ticks[:10], sensor_resistances[:10])
+            self.assertEqual(fd.tell(), 1)
+            writer.write_ticks(ticks[10:], sensor_resistances[10:])
+            self.assertEqual(fd.tell(), len(pack_by_struct(ticks, sensor_resistances)))
@@ -0,0 +1,107 @@
+import os
+import unittest
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+try:
+    import pyqtgraph as pg
+    from operation_utils.operation_plot_widget import OperationalPlotWidget
+except ImportError:
+    pg = None
+
+from operation_utils.redraw_throttle import RedrawThrottle
+
+
+class FakeOneView:
+    """Records plotted data instead of drawing, its view always follows new ticks"""
+
+    def __init__(self):
+        self.plotted = []
+        self.flags = None
+        self.update_time = 0.0
+        self.plot_item = self
+
+    def getViewBox(self):
+        return self
+
+    def autoRangeEnabled(self):
+        return True, True
+
+    def plot_data(self, xs, ys):
+        self.plotted.append((np.array(xs), np.array(ys)))
+
+    def set_visible_lines_by_flags(self, flags):
+        self.flags = flags
+
+    def clear(self):
+        self.plotted.clear()
+
+
+@unittest.skipIf(pg is None, "PySide2 and pyqtgraph are needed")
+class TestOperationalPlotWidget(unittest.TestCase):
+    def setUp(self):
+        self.app = pg.mkQApp()
+        self.widget = OperationalPlotWidget(number_of_dots=4, history_budget=2 ** 20, fast=True)
+        self.views = self.widget.sensor_resistances_one_view, self.widget.heater_resistances_one_view = (
+            FakeOneView(), FakeOneView())
+        self.now = [0.0]
+        self.widget.throttle = RedrawThrottle(clock=lambda: self.now[0])
+        self.ticks = 0
+
+    def tearDown(self):
+        self.widget.history.close()
+
+    def hold(self, number):
+        for _ in range(number):
+            self.widget.hold_answer((np.full(12, 10.0 ** self.ticks), np.full(12, float(self.ticks)),
+                                     float(self.ticks), None))
+            self.ticks += 1
+
+    def test_throttled_redraws(self):
+        sensor_view, heater_view = self.views
+        self.hold(3)
+        self.widget.plot_answer()
+        self.assertEqual(len(sensor_view.plotted), 1)
+        xs, ys = sensor_view.plotted[-1]
+        np.testing.assert_array_equal(xs, [0, 1, 2])
+        # log10 is taken when the answer is held
+        np.testing.assert_array_equal(ys[0], [0, 1, 2])
+
+        self.widget.throttle.paint_time = 1.0
+        self.now[0] = 0.5
+        self.hold(3)
+        self.widget.plot_answer()
+        self.assertEqual(len(sensor_view.plotted), 1)
+        self.assertEqual(self.widget.new_samples, 3)
+
+        self.now[0] = 2.5
+        self.widget.plot_answer()
+        self.assertEqual(len(heater_view.plotted), 2)
+        np.testing.assert_array_equal(heater_view.plotted[-1][0], [2, 3, 4, 5])
+        # nothing new, nothing to redraw
+        self.now[0] = 10
+        self.widget.plot_answer()
+        self.assertEqual(len(heater_view.plotted), 2)
+
+        self.now[0] = 10.5
+        self.hold(1)
+        self.widget.plot_answer(force=True)
+        self.assertEqual(len(heater_view.plotted), 3)
+
+    def test_shown_lines_get_current_data(self):
+        sensor_view, _ = self.views
+        self.hold(2)
+        self.widget.plot_answer()
+        self.widget.throttle.paint_time = 1.0
+        # buffer is overwritten while redraws are skipped
+        self.hold(5)
+        self.widget.plot_answer()
+        self.widget.set_visible_lines_by_flags((True,) * 12)
+        self.assertEqual(sensor_view.flags, (True,) * 12)
+        xs, _ = sensor_view.plotted[-1]
+        np.testing.assert_array_equal(xs, [3, 4, 5, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+import unittest
+
+import numpy as np
+
+from sensor_system import MS_ABC, MS_Uni
+from sensor_system_utils.pipeline import PipelinedMS
+from sensor_system_utils.pty_emulator import MSPtyEmulator
+
+SENSOR_NUMBER = 12
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "pseudo-terminals are used")
+class TestPipelinedMS(unittest.TestCase):
+    def setUp(self):
+        self.emulator = MSPtyEmulator(SENSOR_NUMBER)
+        self.emulator.start()
+        # range switching is answered with a wrong key
+        self.emulator.answer_range = lambda frame: MS_ABC.BEGIN_KEY + bytes(1) + MS_ABC.END_KEY
+        self.ms = MS_Uni(SENSOR_NUMBER, self.emulator.port, 100)
+        self.pipeline = PipelinedMS(self.ms)
+
+    def tearDown(self):
+        self.pipeline.close()
+        self.ms.close()
+        self.emulator.stop()
+
+    def test_range_error_is_raised_for_the_next_request(self):
+        before = self.pipeline.submit((0,) * SENSOR_NUMBER)
+        self.pipeline.send_measurement_range([2] * SENSOR_NUMBER)
+        after = self.pipeline.submit((0,) * SENSOR_NUMBER)
+        with self.pipeline.answers_condition:
+            self.assertTrue(self.pipeline.answers_condition.wait_for(lambda: after in self.pipeline.answers, 5))
+        # request sent before the switching is not blamed for its error
+        us, rs = self.pipeline.result(before, timeout=5)
+        self.assertEqual(us.shape, (SENSOR_NUMBER,))
+        with self.assertRaisesRegex(MS_ABC.MSException, "SEND_M"):
+            self.pipeline.result(after, timeout=5)
+
+    def test_answer_is_kept_when_range_error_is_raised(self):
+        before = self.pipeline.submit((0,) * SENSOR_NUMBER)
+        self.pipeline.result(before, timeout=5)
+        self.pipeline.send_measurement_range([2] * SENSOR_NUMBER)
+        after = self.pipeline.submit((0,) * SENSOR_NUMBER)
+        with self.assertRaisesRegex(MS_ABC.MSException, "SEND_M"):
+            self.pipeline.result(after, timeout=5)
+        us, rs = self.pipeline.result(after, timeout=5)
+        np.testing.assert_array_equal(np.isfinite(rs), True)
+
+
+if __name__ == "__main__":
+    unittest.main()
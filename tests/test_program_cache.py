@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+import pathlib
+
+import numpy as np
+import yaml
+
+from operation_utils.program_cache import ProgramCache
+from operation_utils.program_generator import ProgramGenerator
+
+
+def program_text(temperature: float, repeat: int = 20) -> str:
+    return yaml.dump({
+        "settings": {"frequency": 10},
+        "program": [
+            {"type": "simple", "time": 2, "temperature": temperature, "gas_state": 1},
+            {"type": "cyclic", "repeat": repeat, "gas_states": [{"state": 2, "number": 1}],
+             "temperatures": {"time": [0, 5, 10], "temperature": [200, 400, 200]}},
+        ],
+    })
+
+
+class TestProgramCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def test_compiled_once(self):
+        cache = ProgramCache(self.folder.name)
+        text = program_text(300)
+        first = cache.get_program_generator(text)
+        path = cache.get_path(text)
+        self.assertTrue(path.exists())
+        second = cache.get_program_generator(text)
+        self.assertIsInstance(second.compile().timeline, np.memmap)
+        expected = list(ProgramGenerator(yaml.load(text, yaml.Loader)).compile())
+        self.assertEqual(list(first.compile()), expected)
+        self.assertEqual(list(second.compile()), expected)
+        self.assertNotEqual(cache.get_path(program_text(301)), path)
+
+    def test_broken_file_is_recompiled(self):
+        cache = ProgramCache(self.folder.name)
+        text = program_text(300)
+        cache.get_path(text).write_bytes(b"not a numpy file")
+        generator = cache.get_program_generator(text)
+        self.assertEqual(len(generator.compile()), 20 + 20 * 100)
+        self.assertIsInstance(np.load(cache.get_path(text), mmap_mode="r"), np.memmap)
+
+    def test_lru_eviction(self):
+        cache = ProgramCache(self.folder.name, size_budget=2 * 1024 * 1024)
+        texts = [program_text(300 + idx, repeat=80) for idx in range(4)]
+        for text in texts:
+            cache.get_program_generator(text)
+        cache.get_program_generator(texts[0])
+        cache.get_program_generator(program_text(400, repeat=80))
+        cached = set(pathlib.Path(self.folder.name).glob("program_*.npy"))
+        self.assertIn(cache.get_path(texts[0]), cached)
+        self.assertNotIn(cache.get_path(texts[1]), cached)
+        self.assertLessEqual(sum(path.stat().st_size for path in cached), cache.size_budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
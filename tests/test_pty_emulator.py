@@ -0,0 +1,50 @@
+import sys
+import unittest
+
+import numpy as np
+
+from sensor_system import MS_ABC, MS_Uni
+from sensor_system_utils.pty_emulator import MSPtyEmulator
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "pseudo-terminals are used")
+class TestPtyEmulator(unittest.TestCase):
+    def test_requests(self):
+        for sensor_number in (4, 12):
+            with MSPtyEmulator(sensor_number, seed=0) as emulator:
+                ms = MS_Uni(sensor_number, emulator.port, 100)
+                try:
+                    us, rs = ms.full_request([0] * sensor_number)
+                    self.assertEqual(us.shape, (sensor_number,))
+                    np.testing.assert_allclose(rs, emulator.model.heater_r0, atol=0.02)
+                    us, rs = ms.full_request([30] * sensor_number, request_type=MS_ABC.REQUEST_R)
+                    self.assertTrue(np.all(rs > emulator.model.heater_r0))
+                    self.assertTrue(np.all((us >= 0) & (us <= 5)))
+                finally:
+                    ms.close()
+                self.assertEqual(emulator.counters["requests"], 2)
+
+    def test_measurement_range(self):
+        with MSPtyEmulator(12, seed=0) as emulator:
+            ms = MS_Uni(12, emulator.port, 100)
+            try:
+                ms.send_measurement_range([1, 2, 3] * 4)
+                ms.full_request([0] * 12)
+            finally:
+                ms.close()
+            np.testing.assert_array_equal(emulator.model.modes, [1, 2, 3] * 4)
+
+    def test_resync_after_garbage(self):
+        with MSPtyEmulator(12, garbage_probability=0.5, seed=1) as emulator:
+            ms = MS_Uni(12, emulator.port, 100)
+            try:
+                for _ in range(20):
+                    ms.full_request([0] * 12)
+                self.assertEqual(ms.get_link_counters()["resync_count"], emulator.counters["garbage"])
+            finally:
+                ms.close()
+        self.assertGreater(emulator.counters["garbage"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import threading
+import time
+import unittest
+from queue import Queue
+
+from operation_utils.queue_consumer import QueueConsumer
+
+
+class TestQueueConsumer(unittest.TestCase):
+    def test_batches_and_stop(self):
+        queue = Queue()
+        batches = []
+        stopped = threading.Event()
+        consumer = QueueConsumer(queue, batches.append, on_stop=stopped.set)
+        for item in range(5):
+            queue.put(item)
+        consumer.start()
+        for item in range(5, 10):
+            queue.put(item)
+        consumer.stop()
+        consumer.join()
+        self.assertTrue(stopped.is_set())
+        self.assertEqual([item for batch in batches for item in batch], list(range(10)))
+
+    def test_wakes_up_on_put(self):
+        queue = Queue()
+        received = threading.Event()
+        consumer = QueueConsumer(queue, lambda batch: received.set(), idle_timeout=10)
+        consumer.start()
+        start = time.perf_counter()
+        queue.put(1)
+        self.assertTrue(received.wait(1))
+        self.assertLess(time.perf_counter() - start, 0.01)
+        start = time.perf_counter()
+        consumer.stop()
+        consumer.join()
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+    def test_restart(self):
+        queue = Queue()
+        batches = []
+        idle = threading.Event()
+        consumer = QueueConsumer(queue, batches.append, on_idle=idle.set, idle_timeout=0.01)
+        consumer.stop()  # not running, nothing is put to the queue
+        self.assertTrue(queue.empty())
+        for run in range(2):
+            consumer.start()
+            queue.put(run)
+            self.assertTrue(idle.wait(1))
+            consumer.stop()
+            consumer.join()
+        self.assertEqual(batches, [[0], [1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
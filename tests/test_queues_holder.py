@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+
+from operation_utils.queues_holder import QueuePolicy, QueuesHolder
+
+
+def drain(queue) -> list:
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+class TestQueuesHolder(unittest.TestCase):
+    def test_policies(self):
+        holder = QueuesHolder()
+        writer_queue = holder.add_new_queue()
+        plot_queue = holder.add_new_queue(3, QueuePolicy.DROP_OLDEST, "plot")
+        labels_queue = holder.add_new_queue(policy=QueuePolicy.LATEST, name="labels")
+        for item in range(10):
+            holder.put(item)
+        self.assertEqual(drain(writer_queue), list(range(10)))
+        self.assertEqual(drain(plot_queue), [7, 8, 9])
+        self.assertEqual(drain(labels_queue), [9])
+        statistics = {item["name"]: item for item in holder.get_statistics()}
+        self.assertEqual(statistics["plot"]["dropped"], 7)
+        self.assertEqual(statistics["plot"]["max_depth"], 3)
+        self.assertEqual(statistics["labels"]["dropped"], 9)
+        self.assertEqual(statistics[""]["max_depth"], 10)
+        self.assertEqual(statistics[""]["depth"], 0)
+
+    def test_block_waits_for_consumer(self):
+        holder = QueuesHolder()
+        queue = holder.add_new_queue(2, QueuePolicy.BLOCK, "writer")
+        producer = threading.Thread(target=lambda: [holder.put(item) for item in range(5)])
+        producer.start()
+        time.sleep(0.05)
+        self.assertTrue(producer.is_alive())
+        received = [queue.get(timeout=1) for _ in range(5)]
+        producer.join(1)
+        self.assertEqual(received, list(range(5)))
+
+    def test_registration_while_put_blocks(self):
+        holder = QueuesHolder()
+        blocked_queue = holder.add_new_queue(1, QueuePolicy.BLOCK, "slow")
+        holder.put(0)
+        producer = threading.Thread(target=holder.put, args=(1,), daemon=True)
+        producer.start()
+        time.sleep(0.05)
+        new_queue = holder.add_new_queue(name="new")
+        holder.delete_queue(new_queue)
+        self.assertEqual(len(holder.queues), 1)
+        blocked_queue.get_nowait()
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
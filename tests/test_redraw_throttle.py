@@ -0,0 +1,24 @@
+import unittest
+
+from operation_utils.redraw_throttle import RedrawThrottle
+
+
+class TestRedrawThrottle(unittest.TestCase):
+    def test_waits_for_frame_times(self):
+        now = [0.0]
+        throttle = RedrawThrottle(factor=2.0, clock=lambda: now[0])
+        self.assertTrue(throttle.is_due())
+        throttle.update_time, throttle.paint_time = 0.1, 0.4
+        self.assertEqual(throttle.frame_time, 0.5)
+        now[0] = 0.9
+        self.assertFalse(throttle.is_due())
+        self.assertTrue(throttle.is_due(force=True))
+        # forced redraw starts the interval again
+        now[0] = 1.5
+        self.assertFalse(throttle.is_due())
+        now[0] = 2.0
+        self.assertTrue(throttle.is_due())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+from operation_utils.ring_buffer import RingBuffer
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_append(self):
+        buffer = RingBuffer(5, 2)
+        samples = np.array([np.arange(13), -np.arange(13)], dtype=float)
+        for index in range(13):
+            buffer.append(samples[:, index])
+            view = buffer.get_view()
+            np.testing.assert_array_equal(view, samples[:, max(index - 4, 0):index + 1])
+            self.assertTrue(np.shares_memory(view, buffer.data))
+        buffer.clear()
+        self.assertEqual(buffer.get_view().shape, (2, 0))
+
+    def test_extend(self):
+        samples = np.array([np.arange(40), np.arange(40) * 2], dtype=float)
+        buffer = RingBuffer(7, 2)
+        written = 0
+        for batch in (1, 3, 5, 2, 7, 9, 1, 11):
+            buffer.extend(samples[:, written:written + batch])
+            written += batch
+            self.assertEqual(len(buffer), min(written, 7))
+            np.testing.assert_array_equal(buffer.get_view(), samples[:, max(written - 7, 0):written])
+        buffer.append(samples[:, written])
+        np.testing.assert_array_equal(buffer.get_view(), samples[:, written - 6:written + 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import csv
+import itertools
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from dat_utils.records import get_record_struct, read_header
+from dat_utils.text_export import export_text, form_header, format_float, render_fixed
+from measurement_utils.vectorized_converters import OUT_OF_RANGE_RESISTANCE
+from tests.test_dat_container import write_v2
+from tests.test_one_tick_binary_saving import make_ticks, pack_by_struct
+
+
+def filter_by_array(list_to_filter, flags):
+    return tuple(element for element, flag in zip(list_to_filter, flags) if flag)
+
+
+def convert_by_struct(source, target, chosen_sensors, chosen_parameters):
+    """Record by record conversion of ConverterWidget before it was vectorized"""
+    with open(source, "rb") as fd, open(target, "w") as fd_out:
+        sensors_number = read_header(fd)
+        bin_write_struct = get_record_struct(sensors_number)
+        csvwriter = csv.writer(fd_out, delimiter="\t")
+        chosen_sensors = chosen_sensors[:sensors_number]
+        header_comment, header = form_header(chosen_sensors, chosen_parameters)
+        csvwriter.writerow(header_comment)
+        csvwriter.writerow(header)
+        for chunk in iter(lambda: fd.read(bin_write_struct.size), b""):
+            values = bin_write_struct.unpack(chunk)
+            possible = (values[0:1],
+                        filter_by_array(values[1:1 + sensors_number], chosen_sensors),
+                        filter_by_array(values[1 + sensors_number: 1 + 2 * sensors_number], chosen_sensors),
+                        filter_by_array(values[1 + 2 * sensors_number: 1 + 3 * sensors_number], chosen_sensors),
+                        filter_by_array(values[1 + 3 * sensors_number: 1 + 4 * sensors_number], chosen_sensors),
+                        values[1 + 4 * sensors_number: 1 + 4 * sensors_number + 1],
+                        values[1 + 1 + 4 * sensors_number: 1 + 2 + 4 * sensors_number],
+                        values[1 + 2 + 4 * sensors_number: 1 + 3 + 4 * sensors_number],
+                        filter_by_array(values[1 + 3 + 4 * sensors_number: 1 + 3 + 5 * sensors_number], chosen_sensors),
+                        )
+            row_to_write = map(format_float, tuple(itertools.chain(*(val for ch, val in zip(chosen_parameters, possible) if ch))))
+            csvwriter.writerow(row_to_write)
+
+
+class TestTextExport(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.ticks = make_ticks(12, 300, rng, stage_length=90)
+        self.sensor_resistances = [tuple(rng.uniform(1e3, 1e9, 12)) for _ in self.ticks]
+        self.sensor_resistances[5] = (float("nan"), float("inf"), -0.0) + self.sensor_resistances[5][3:]
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "run.dat")
+        with open(self.path, "wb") as fd:
+            fd.write(pack_by_struct(self.ticks, self.sensor_resistances))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def read_text(self, name):
+        with open(os.path.join(self.folder.name, name), "rb") as fd:
+            return fd.read()
+
+    def test_same_text_as_struct_conversion(self):
+        selections = (
+            ((True,) * 12, (True,) * 9),
+            ((False, True, True) + (False,) * 9, (True, False, True, True, False, True, False, True, True)),
+            ((False,) * 12, (True,) + (False,) * 8),
+        )
+        for chosen_sensors, chosen in selections:
+            convert_by_struct(self.path, os.path.join(self.folder.name, "expected.txt"), chosen_sensors, chosen)
+            self.assertEqual(export_text(self.path, None, chosen_sensors, chosen, block_ticks=64), len(self.ticks))
+            self.assertEqual(self.read_text("run.txt"), self.read_text("expected.txt"))
+
+    def test_out_of_range_values_in_block(self):
+        # sentinel of out of range resistance and normal values in every block
+        for idx in range(0, len(self.ticks), 3):
+            self.sensor_resistances[idx] = (OUT_OF_RANGE_RESISTANCE, -1e15) + self.sensor_resistances[idx][2:]
+        with open(self.path, "wb") as fd:
+            fd.write(pack_by_struct(self.ticks, self.sensor_resistances))
+        convert_by_struct(self.path, os.path.join(self.folder.name, "expected.txt"), (True,) * 12, (True,) * 9)
+        export_text(self.path, None, (True,) * 12, (True,) * 9, block_ticks=64)
+        self.assertEqual(self.read_text("run.txt"), self.read_text("expected.txt"))
+
+    def test_v2_file(self):
+        convert_by_struct(self.path, os.path.join(self.folder.name, "expected.txt"), (True,) * 12, (True,) * 9)
+        write_v2(self.path, self.ticks, self.sensor_resistances, chunk_ticks=64)
+        export_text(self.path)
+        self.assertEqual(self.read_text("run.txt"), self.read_text("expected.txt"))
+
+
+class TestRenderFixed(unittest.TestCase):
+    def test_same_as_format(self):
+        rng = np.random.default_rng(1)
+        values = np.concatenate([
+            rng.uniform(-10 ** power, 10 ** power, 2000) for power in range(-5, 14)
+        ] + [np.arange(-64, 64) / 32, np.arange(-64, 64) / 20000, [0.0, -0.0, 99999.99995]]).astype(np.float32)
+        values = values.astype(np.float64).reshape(-1, 1)
+        text = render_fixed(values, 4, 10).ravel()
+        rendered = text[text != 0].tobytes().decode("ascii").split("\t")[1:]
+        self.assertEqual(rendered, [f"{value:10.4f}" for value in values.ravel().tolist()])
+
+        values = np.array([[1.5, np.nan, OUT_OF_RANGE_RESISTANCE], [-np.inf, -2.25, 3e38]], dtype=np.float32).astype(np.float64)
+        text = render_fixed(values, 4, 10).ravel()
+        self.assertEqual(text[text != 0].tobytes().decode("ascii"),
+                         "".join(f"\t{value:10.4f}" for value in values.ravel().tolist()))
+
+        values = np.array([[0, 7, 255, 4294967295]], dtype=np.float64)
+        text = render_fixed(values, 0, 4).ravel()
+        self.assertEqual(text[text != 0].tobytes().decode("ascii"), "\t   0\t   7\t 255\t4294967295")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from operation_utils.tick_scheduler import CatchUpPolicy, ClockOrigin, ScheduleShift, TickScheduler
+
+STEP = 0.1
+
+
+class FakeClock:
+    """Monotonic clock in ns which moves only by sleeping or by stall()"""
+
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def __call__(self) -> int:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += max(int(seconds * 1e9), 1000)
+
+    def stall(self, seconds: float):
+        self.now += int(seconds * 1e9)
+
+
+def make_scheduler(policy: CatchUpPolicy):
+    clock = FakeClock()
+    scheduler = TickScheduler(STEP, policy, clock=clock, sleep_func=clock.sleep)
+    scheduler.start(ClockOrigin(0.0, clock()))
+    return scheduler, clock
+
+
+class TestTickScheduler(unittest.TestCase):
+    def test_on_time(self):
+        scheduler, clock = make_scheduler(CatchUpPolicy.COMPRESS)
+        for tick in range(10):
+            self.assertTrue(scheduler.wait(tick * STEP))
+            self.assertGreaterEqual(clock.now, round(tick * STEP * 1e9))
+        statistics = scheduler.get_statistics()
+        self.assertEqual(statistics["ticks"], 10)
+        self.assertEqual(statistics["missed"], 0)
+        self.assertLess(statistics["max_lateness"], 1e-4)
+        # one long sleep per tick and the spin for the rest
+        self.assertLess(max(clock.sleeps), STEP)
+        self.assertEqual(sum(count for *_, count in scheduler.histogram.get_bins()), 10)
+
+    def test_compress(self):
+        scheduler, clock = make_scheduler(CatchUpPolicy.COMPRESS)
+        clock.stall(0.35)
+        sent = [scheduler.wait(tick * STEP) for tick in range(6)]
+        self.assertEqual(sent, [True] * 6)
+        self.assertEqual(scheduler.missed, 3)
+        self.assertAlmostEqual(scheduler.planned_time(5 * STEP), 5 * STEP)
+
+    def test_skip(self):
+        scheduler, clock = make_scheduler(CatchUpPolicy.SKIP)
+        clock.stall(0.35)
+        sent = [scheduler.wait(tick * STEP) for tick in range(6)]
+        self.assertEqual(sent, [False, False, False, True, True, True])
+        self.assertEqual(scheduler.get_statistics()["skipped"], 3)
+
+    def test_stretch(self):
+        scheduler, clock = make_scheduler(CatchUpPolicy.STRETCH)
+        clock.stall(0.35)
+        self.assertTrue(scheduler.wait(0))
+        self.assertEqual(scheduler.missed, 1)
+        self.assertTrue(scheduler.wait(STEP))
+        self.assertAlmostEqual(clock.now / 1e9, 0.35 + STEP, places=4)
+        self.assertAlmostEqual(scheduler.planned_time(STEP), 0.35 + STEP)
+
+    def test_shared_stretch_keeps_devices_aligned(self):
+        clock = FakeClock()
+        shift = ScheduleShift()
+        schedulers = [TickScheduler(STEP, CatchUpPolicy.STRETCH, clock=clock, sleep_func=clock.sleep, shift=shift)
+                      for _ in range(2)]
+        for scheduler in schedulers:
+            scheduler.start(ClockOrigin(0.0, clock()))
+        late, other = schedulers
+        self.assertTrue(other.wait(0))
+        self.assertTrue(late.wait(0))
+        self.assertTrue(other.wait(STEP))
+        # only the first device is stalled before its second tick
+        clock.stall(0.35)
+        self.assertTrue(late.wait(STEP))
+        self.assertEqual((late.missed, other.missed), (1, 0))
+        self.assertTrue(other.wait(2 * STEP))
+        other_sent = clock.now
+        self.assertTrue(late.wait(2 * STEP))
+        self.assertEqual(clock.now, other_sent)
+        self.assertEqual(other.missed, 0)
+        self.assertEqual(late.planned_time(2 * STEP), other.planned_time(2 * STEP))
+
+
+if __name__ == "__main__":
+    unittest.main()
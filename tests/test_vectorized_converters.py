@@ -0,0 +1,169 @@
+import unittest
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+from measurement_utils.vectorized_converters import (
+    FAST_PATH_MAX_TICKS,
+    ResistanceToTemperatureConverter,
+    TemperatureToResistanceConverter,
+    TemperatureToVoltageConverter,
+    VoltageToResistanceConverter,
+)
+
+SENSORS_NUMBER = 12
+MODES_NUMBER = 3
+
+
+def voltage_to_resistance_by_closure(rs_u1, rs_u2, r4):
+    # formula of SensorPositionWidget before vectorization
+    vertical_asimptote = 2.5 + 4.068 * (2.5 - rs_u2)
+
+    def f(u):
+        if u < vertical_asimptote:
+            return (rs_u1 - rs_u2) * r4 / ((2.5 + 2.5 * 4.068 - u) / 4.068 - rs_u2) - r4
+        else:
+            return 1e14
+
+    return f
+
+
+def random_coefficients(rng):
+    coefficients = []
+    for sensor in range(SENSORS_NUMBER):
+        sensor_coefficients = {}
+        for mode, r4 in zip(range(1, MODES_NUMBER + 1), (1e4, 1e6, 1e8)):
+            if (sensor + mode) % 5 == 0:
+                sensor_coefficients[mode] = None
+            else:
+                rs_u2 = rng.uniform(2.0, 3.0)
+                sensor_coefficients[mode] = (rs_u2 + rng.uniform(0.5, 2.0), rs_u2, r4)
+        coefficients.append(sensor_coefficients)
+    return coefficients
+
+
+def get_closures(coefficients):
+    return [
+        {
+            mode: (lambda u: u) if mode_coefficients is None else voltage_to_resistance_by_closure(*mode_coefficients)
+            for mode, mode_coefficients in sensor_coefficients.items()
+        }
+        for sensor_coefficients in coefficients
+    ]
+
+
+class TestVoltageToResistanceConverter(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.coefficients = random_coefficients(rng)
+        self.closures = get_closures(self.coefficients)
+        self.converter = VoltageToResistanceConverter.from_coefficients(self.coefficients, MODES_NUMBER)
+        self.us = rng.uniform(0, 5, (200, SENSORS_NUMBER)).astype(np.float32)
+        self.modes = rng.integers(1, MODES_NUMBER + 1, (200, SENSORS_NUMBER))
+
+    def test_multirange_same_as_closures(self):
+        expected = [
+            [closures[mode](float(u)) for closures, u, mode in zip(self.closures, tick_us, tick_modes)]
+            for tick_us, tick_modes in zip(self.us, self.modes)
+        ]
+        np.testing.assert_array_equal(self.converter.convert(self.us, self.modes), expected)
+        np.testing.assert_array_equal(self.converter.convert(self.us[7], self.modes[7]), expected[7])
+        # values over the asymptote and identity of not calibrated modes are covered
+        self.assertIn(1e14, np.array(expected))
+
+    def test_few_ticks_same_as_batch(self):
+        expected = self.converter.convert(self.us, self.modes)
+        for ticks in range(1, FAST_PATH_MAX_TICKS + 2):
+            np.testing.assert_array_equal(self.converter.convert(self.us[:ticks], self.modes[:ticks]), expected[:ticks])
+        np.testing.assert_array_equal(self.converter.convert(self.us[:1]), self.converter.convert(self.us)[:1])
+
+    def test_single_range_same_as_closures(self):
+        expected = [[closures[1](float(u)) for closures, u in zip(self.closures, tick_us)] for tick_us in self.us]
+        np.testing.assert_array_equal(self.converter.convert(self.us), expected)
+
+    def test_less_sensors_than_calibrated(self):
+        expected = [closures[2](float(u)) for closures, u in zip(self.closures, self.us[0, :4])]
+        np.testing.assert_array_equal(self.converter.convert(self.us[0, :4], np.full(4, 2)), expected)
+
+
+class TestResistanceToTemperatureConverter(unittest.TestCase):
+    def test_same_as_closures(self):
+        coefficients = [None if sensor % 4 == 0 else (5.0 + sensor, 0.03 * sensor) for sensor in range(SENSORS_NUMBER)]
+        converter = ResistanceToTemperatureConverter.from_coefficients(coefficients)
+        rs = np.random.default_rng(2).uniform(10, 30, (50, SENSORS_NUMBER)).astype(np.float32)
+        expected = [
+            [0 if sensor_coefficients is None else (float(r) - sensor_coefficients[0]) / sensor_coefficients[1]
+             for sensor_coefficients, r in zip(coefficients, tick_rs)]
+            for tick_rs in rs
+        ]
+        np.testing.assert_array_equal(converter.convert(rs), expected)
+
+
+
+def random_voltage_calibrations(rng):
+    # calibration data is noisy and not evenly spaced, so the spline has a lot of curvature
+    calibrations = []
+    for sensor in range(SENSORS_NUMBER):
+        if sensor % 5 == 3:
+            calibrations.append(None)
+            continue
+        temperatures = np.sort(rng.uniform(20, 20 + 600, 300 + sensor * 20))
+        voltages = 0.5 + temperatures / 200 + 1e-3 * (temperatures / 200) ** 2 + rng.normal(0, 5e-3, temperatures.size)
+        calibrations.append((temperatures, voltages))
+    return calibrations
+
+
+class TestTemperatureToVoltageConverter(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.calibrations = random_voltage_calibrations(rng)
+        self.converter = TemperatureToVoltageConverter(self.calibrations)
+        self.temperatures = np.column_stack([
+            np.zeros(2000) if calibration is None else
+            rng.uniform(calibration[0][0], calibration[0][-1], 2000)
+            for calibration in self.calibrations
+        ])
+
+    def test_accuracy_against_interp1d(self):
+        expected = np.column_stack([
+            np.zeros(len(self.temperatures)) if calibration is None else
+            interp1d(*calibration, kind="cubic")(temperatures)
+            for calibration, temperatures in zip(self.calibrations, self.temperatures.T)
+        ])
+        # only rounding differs from interp1d
+        np.testing.assert_allclose(self.converter.convert(self.temperatures), expected, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(self.converter.convert(self.temperatures[5]), expected[5], rtol=0, atol=1e-9)
+
+    def test_calibration_edges(self):
+        edges = np.array([[calibration[0][0] if calibration else 0.0 for calibration in self.calibrations],
+                          [calibration[0][-1] if calibration else 0.0 for calibration in self.calibrations]])
+        expected = [[calibration[1][0] if calibration else 0.0 for calibration in self.calibrations],
+                    [calibration[1][-1] if calibration else 0.0 for calibration in self.calibrations]]
+        np.testing.assert_allclose(self.converter.convert(edges), expected, rtol=0, atol=1e-9)
+
+    def test_out_of_calibration_range(self):
+        temperatures = self.temperatures[0].copy()
+        temperatures[1] = 1000
+        with self.assertRaises(ValueError):
+            self.converter.convert(temperatures)
+        # not calibrated sensor accepts any temperature
+        temperatures = self.temperatures[0].copy()
+        temperatures[3] = 1000
+        self.assertEqual(self.converter.convert(temperatures)[3], 0)
+
+
+class TestTemperatureToResistanceConverter(unittest.TestCase):
+    def test_same_as_closures(self):
+        coefficients = [None if sensor % 4 == 1 else (5.0 + sensor, 0.03 * sensor) for sensor in range(SENSORS_NUMBER)]
+        converter = TemperatureToResistanceConverter.from_coefficients(coefficients)
+        temperatures = np.random.default_rng(4).uniform(100, 500, (50, SENSORS_NUMBER))
+        expected = [
+            [0 if sensor_coefficients is None else sensor_coefficients[0] + sensor_coefficients[1] * t
+             for sensor_coefficients, t in zip(coefficients, tick_temperatures)]
+            for tick_temperatures in temperatures
+        ]
+        np.testing.assert_array_equal(converter.convert(temperatures), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
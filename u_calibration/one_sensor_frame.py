@@ -1,5 +1,6 @@
 import logging
 import platform
+import traceback
 import typing
 import functools
 
@@ -7,6 +8,7 @@ import numpy as np
 from PySide2 import QtGui, QtWidgets, QtCore
 from superqt import QRangeSlider
 from scipy.optimize import curve_fit
+from sensor_system_utils.device_manager import DeviceUnavailableException
 from u_calibration.plot_widget import PlotWidget
 
 if typing.TYPE_CHECKING:
@@ -207,24 +209,23 @@ class OneSensorFrame(QtWidgets.QWidget):
         return functools.partial(self.measure_u, index)
 
     def measure_u(self, index: int):
-        ms = self.settings_widget.get_new_ms()
-        if ms is not None:
-            if self.settings_widget.get_multirange():
-                _, _, r4_range_dict = self.settings_widget.get_r4_data()
-                try:
+        try:
+            with self.settings_widget.lease_ms() as ms:
+                if ms is None:
+                    return
+                if self.settings_widget.get_multirange():
+                    _, _, r4_range_dict = self.settings_widget.get_r4_data()
                     ms.send_measurement_range(
                         (r4_range_dict[self.r4_widget.currentText()],) * 12
                     )
-
-                    us_answers = self.get_us_from_ms(ms)
-                    average_u = self.calculate_average_u(us_answers)
-                    self.record_u(index, average_u)
-                except:
-                    ms.close()
-            else:
                 us_answers = self.get_us_from_ms(ms)
                 average_u = self.calculate_average_u(us_answers)
                 self.record_u(index, average_u)
+        except DeviceUnavailableException as e:
+            QtWidgets.QMessageBox.warning(self, "Measure U", str(e))
+        except Exception:
+            # error has passed through the lease, so the broken device is already dropped
+            logger.error(traceback.format_exc())
 
     def get_us_from_ms(self, ms):
         return [ms.full_request((0,) * 12)[0] for _ in range(15)]